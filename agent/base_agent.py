@@ -4,34 +4,65 @@ from langchain.agents import ConversationalAgent
 
 # agent/base_agent.py
 from langchain.agents import AgentExecutor
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
 from langchain_core.language_models import LLM
 from langchain_aws import ChatBedrock
 
 from existing.response_generator import get_agent_prompt
 from existing.db_service import find_employee_by_contact, get_employee_devices
+from memory.session_memory import BackgroundSummaryBufferMemory
+from cachetools import TTLCache
+from config import BEDROCK_SUMMARY_MODEL_ID, MEMORY_MAX_TOKENS, SESSION_TTL, MAX_SESSIONS
 import logging
+import threading
 
 logger = logging.getLogger('me_agent_orchestrator')
 
+# Rough characters per token for English chat; only used to decide when history gets summarized
+CHARS_PER_TOKEN = 4
+
+class SummaryChatBedrock(ChatBedrock):
+    """ChatBedrock that estimates token counts locally, so memory pruning needs no tokenizer package"""
+    
+    def get_num_tokens(self, text):
+        return len(text) // CHARS_PER_TOKEN + 1
+    
+    def get_num_tokens_from_messages(self, messages):
+        return sum(self.get_num_tokens(str(message.content)) for message in messages)
+
+def create_summary_llm(aws_region, client=None):
+    """Cheaper Bedrock model used to summarize older conversation turns"""
+    return SummaryChatBedrock(
+        client=client,
+        model_id=BEDROCK_SUMMARY_MODEL_ID,
+        region_name=aws_region,
+        model_kwargs={"temperature": 0, "max_tokens": 500}
+    )
+
 class MeAIBaseAgent:
     """Base agent class for ME.ai agents using LangChain"""
     
-    def __init__(self, agent_type, aws_region="us-east-1", model_id="anthropic.claude-3-sonnet-20240229-v1:0"):
+    def __init__(self, agent_type, aws_region="us-east-1", model_id="anthropic.claude-3-sonnet-20240229-v1:0", client=None,
+                 llm=None, summary_llm=None):
         self.agent_type = agent_type
         self.model_id = model_id
         self.aws_region = aws_region
-        self.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-        self.llm = self._initialize_llm()
+        # Shared bedrock-runtime client; None lets each ChatBedrock create its own
+        self.client = client
+        self.summary_llm = summary_llm or create_summary_llm(aws_region, client)
+        # Chat history is kept per session; the agent, tools and models are shared by every session
+        self.session_memories = TTLCache(maxsize=MAX_SESSIONS, ttl=SESSION_TTL)
+        self._memories_lock = threading.Lock()
+        # Agents built by one orchestrator share its model wrappers; they differ only in prompt and tools
+        self.llm = llm or self._initialize_llm()
         self.tools = self._get_tools()
         self.agent = self._create_agent()
-        self.agent_executor = self._create_agent_executor()
     
     def _initialize_llm(self):
         """Initialize the LLM (using AWS Bedrock)"""
         try:
             return ChatBedrock(
+                client=self.client,
                 model_id=self.model_id,
                 region_name=self.aws_region,
                 model_kwargs={"temperature": 0.7, "max_tokens": 1000}
@@ -100,12 +131,34 @@ Question: {input}
             prompt=prompt
         )
     
-    def _create_agent_executor(self):
-        """Create the agent executor"""
+    def _new_memory(self):
+        """Chat history memory for one conversation"""
+        # Older turns are folded into a summary after each reply so the prompt stops growing with the conversation
+        return BackgroundSummaryBufferMemory(
+            llm=self.summary_llm,
+            max_token_limit=MEMORY_MAX_TOKENS,
+            memory_key="chat_history",
+            return_messages=True
+        )
+    
+    def _get_session_memory(self, session_id):
+        """Get or create the chat history memory for a session; calls without a session get a fresh one"""
+        if session_id is None:
+            return self._new_memory()
+        with self._memories_lock:
+            memory = self.session_memories.get(session_id)
+            if memory is None:
+                memory = self._new_memory()
+            # Re-insert so the TTL counts from the last access
+            self.session_memories[session_id] = memory
+            return memory
+    
+    def _create_agent_executor(self, agent, memory):
+        """Create an agent executor around a session's memory"""
         return AgentExecutor.from_agent_and_tools(
-            agent=self.agent,
+            agent=agent,
             tools=self.tools,
-            memory=self.memory,
+            memory=memory,
             verbose=True,
             handle_parsing_errors=True,
             max_iterations=5
@@ -123,18 +176,13 @@ Question: {input}
                     tools=self.tools,
                     prompt=prompt
                 )
-                agent_executor = AgentExecutor.from_agent_and_tools(
-                    agent=agent,
-                    tools=self.tools,
-                    memory=self.memory,
-                    verbose=True,
-                    handle_parsing_errors=True,
-                    max_iterations=5
-                )
-                response = agent_executor.run(input=user_input)
             else:
-                # Use the existing agent executor
-                response = self.agent_executor.run(input=user_input)
+                # Use the shared agent
+                agent = self.agent
+            
+            # Executors are cheap; each turn gets one bound to its own session's history
+            memory = self._get_session_memory(getattr(session, 'session_id', None))
+            response = self._create_agent_executor(agent, memory).run(input=user_input)
             
             return response
         except Exception as e:
@@ -9,8 +9,9 @@ logger = logging.getLogger('me_agent_orchestrator')
 class HardwareAgent(MeAIBaseAgent):
     """Agent specializing in hardware issues"""
     
-    def __init__(self, aws_region="us-east-1", model_id="anthropic.claude-3-sonnet-20240229-v1:0"):
-        super().__init__("Hardware", aws_region, model_id)
+    def __init__(self, aws_region="us-east-1", model_id="anthropic.claude-3-sonnet-20240229-v1:0", client=None,
+                 llm=None, summary_llm=None):
+        super().__init__("Hardware", aws_region, model_id, client, llm, summary_llm)
     
     def _get_tools(self):
         """Get hardware-specific tools"""
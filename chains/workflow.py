@@ -1,6 +1,7 @@
 # chains/workflow.py
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
+import itertools
 import logging
 import json
 from typing import Dict, Any, List, Optional
@@ -51,12 +52,10 @@ REASONING: [Why this is the appropriate next step]
     
     def _create_issue_classification_chain(self):
         """Create a chain for classifying issues more precisely"""
+        # Static instructions first and the conversation last, so the prompt prefix is cacheable
         issue_template = """
 You are an IT issue classifier. Based on the conversation and user description, classify the specific issue.
 
-CONVERSATION:
-{conversation}
-
 Top-level issue categories:
 1. Hardware
 2. Software
@@ -69,6 +68,9 @@ CATEGORY: [The most appropriate category from above]
 SUBCATEGORY: [More specific subcategory]
 PRIORITY: [High/Medium/Low]
 REASONING: [Why you classified it this way]
+
+CONVERSATION:
+{conversation}
 """
         
         issue_prompt = PromptTemplate(
@@ -129,7 +131,8 @@ RECOMMENDED ACTIONS:
             
             # Format conversation history
             conversation_history = ""
-            for msg in messages[-6:]:  # Only use the last 6 messages to keep context manageable
+            # Only use the last 6 messages to keep context manageable; session messages are a deque, which can't be sliced
+            for msg in itertools.islice(messages, max(0, len(messages) - 6), None):
                 role = msg.get('role', '').capitalize()
                 content = msg.get('content', '')
                 conversation_history += f"{role}: {content}\n\n"
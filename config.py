@@ -15,16 +15,34 @@ DEEPSEEK_API_KEY = os.environ.get('DEEPSEEK_API_KEY', 'sk-643f3d962fef49949b7a71
 DEEPSEEK_API_URL = os.environ.get('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1/chat/completions')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
+# Bedrock latency tier for model calls: 'standard' or 'optimized' (only some models/regions support it)
+BEDROCK_LATENCY_MODE = os.environ.get('BEDROCK_PERF_CFG', 'standard')
+# Cheaper model that condenses older conversation turns into a running summary
+BEDROCK_SUMMARY_MODEL_ID = os.environ.get('BEDROCK_SUMMARY_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+# Agent chat history beyond this many tokens is summarized instead of replayed in every prompt
+MEMORY_MAX_TOKENS = int(os.environ.get('MEMORY_MAX_TOKENS', 800))
 
 
 # Qwen configuration (if used)
 QWEN_API_KEY = os.environ.get('QWEN_API_KEY', 'sk-ce99dbfb59df4f8c94d6f78aba7d6221')
 QWEN_API_URL = os.environ.get('QWEN_API_URL', 'https://dashscope-intl.aliyuncs.com/compatible-mode/v1')
+# Maximum in-flight AI API calls per process; tune against the provider's RPM cap
+MEAI_MAX_CONCURRENT = int(os.environ.get('MEAI_MAX_CONCURRENT', 8))
+# Client-side AI API request/token per-minute budgets (0 disables throttling)
+MEAI_RPM = int(os.environ.get('MEAI_RPM', 0))
+MEAI_TPM = int(os.environ.get('MEAI_TPM', 0))
 
 # Database service configuration
 MEAI_DB_SERVICE = os.environ.get('MEAI_DB_SERVICE', 'http://127.0.0.1:5000/api')
 DB_USERNAME = os.environ.get('DB_USERNAME', 'testadmin')
 DB_PASSWORD = os.environ.get('DB_PASSWORD', 'testpass')
+# Optional Redis URL for sharing DB service tokens across worker processes
+REDIS_URL = os.environ.get('REDIS_URL')
+DB_TOKEN_TTL = int(os.environ.get('DB_TOKEN_TTL', 3300))
+
+# Idle sessions are evicted after SESSION_TTL seconds; at most MAX_SESSIONS are kept in memory
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 3600))
+MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 10000))
 
 # Logging configuration
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
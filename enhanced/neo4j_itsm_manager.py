@@ -1,13 +1,153 @@
 # neo4j_itsm_manager.py
+import functools
 import logging
-from typing import Dict, Any, List, Optional
-from neo4j import GraphDatabase
+from typing import Dict, Any, List, Optional, Iterator
+from neo4j import GraphDatabase, Query
+
+try:
+    import ahocorasick
+except ImportError:  # Optional; classification falls back to a single substring pass
+    ahocorasick = None
 
 logger = logging.getLogger('neo4j_itsm_manager')
 
+# Map common issue keywords to ontology concepts
+ISSUE_CATEGORY_KEYWORDS = {
+    "Hardware": ("laptop", "desktop", "printer", "device", "hardware", "keyboard",
+                 "mouse", "monitor", "screen", "battery", "power", "usb", "disk"),
+    "Software": ("software", "application", "program", "app", "windows", "office",
+                 "excel", "word", "outlook", "browser", "update", "install",
+                 "license", "version", "freeze", "crash"),
+    "Network": ("network", "wifi", "internet", "connection", "lan", "vpn",
+                "ethernet", "dns", "ip", "wireless", "connect", "access point"),
+    "Password": ("password", "login", "security", "authentication", "access",
+                 "account", "credentials", "reset", "locked", "mfa", "permission")
+}
+
+# Reverse lookup from keyword to its category
+_KEYWORD_CATEGORY = {kw: category for category, keywords in ISSUE_CATEGORY_KEYWORDS.items() for kw in keywords}
+
+def _build_keyword_automaton():
+    """Compile every category keyword into one Aho-Corasick automaton, if available"""
+    if ahocorasick is None:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for kw in _KEYWORD_CATEGORY:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+# Classification is a pure function of the normalized text, so repeat queries skip the keyword scan
+@functools.lru_cache(maxsize=1024)
+def _classify_issue(issue_lower):
+    """Return (category, agent_category, primary_keywords, confidence) for lowercased issue text"""
+    # Find every matching keyword in a single scan of the text
+    if _KEYWORD_AUTOMATON is not None:
+        matched = {kw for _, kw in _KEYWORD_AUTOMATON.iter(issue_lower)}
+    else:
+        matched = {kw for kw in _KEYWORD_CATEGORY if kw in issue_lower}
+    
+    # Count distinct keyword matches per category
+    counts = dict.fromkeys(ISSUE_CATEGORY_KEYWORDS, 0)
+    for kw in matched:
+        counts[_KEYWORD_CATEGORY[kw]] += 1
+    
+    # A category wins only if it strictly outscores all others
+    top_count = max(counts.values())
+    leaders = [category for category, count in counts.items() if count == top_count]
+    
+    category = "General"
+    primary_keywords = ()
+    
+    if top_count > 0 and len(leaders) == 1:
+        category = leaders[0]
+        primary_keywords = tuple(kw for kw in ISSUE_CATEGORY_KEYWORDS[category] if kw in matched)
+    
+    # If issue is network-related, treat as a subtype of hardware for agent selection
+    agent_category = "Hardware" if category == "Network" else category
+    
+    return category, agent_category, primary_keywords, top_count / 5  # Simple confidence score
+
 class ITSMOntologyManager:
     """Manager for interacting with the ITSM ontology in Neo4j"""
     
+    # Schema indexes the ontology queries rely on
+    # solution_effectiveness lets ORDER BY s.effectiveness DESC LIMIT 5 run as a streaming top-K
+    _INDEXES = (
+        "CREATE INDEX solution_effectiveness IF NOT EXISTS FOR (s:Solution) ON (s.effectiveness)",
+    )
+    
+    # Cypher statements are built once at class load so every call sends identical
+    # text and hits the same server-side plan cache entry
+    _Q_STEPS_SPECIFIC = """
+    MATCH (c:Class)
+    WHERE (c.name CONTAINS $issueType OR c.label CONTAINS $issueType)
+    AND (c.name CONTAINS $deviceType OR c.label CONTAINS $deviceType)
+    MATCH (c)-[:HAS]->(step:TroubleshootingStep)
+    RETURN step.name as step_name, step.description as step_description, step.order as step_order
+    ORDER BY step.order
+    """
+    
+    _Q_STEPS_GENERAL = """
+    MATCH (c:Class)
+    WHERE (c.name CONTAINS $issueType OR c.label CONTAINS $issueType)
+    MATCH (c)-[:HAS]->(step:TroubleshootingStep)
+    RETURN step.name as step_name, step.description as step_description, step.order as step_order
+    ORDER BY step.order
+    """
+    
+    # An empty $keywords list disables the keyword filter
+    _Q_POTENTIAL_SOLUTIONS = """
+    MATCH (i:Class)-[:MAY_INDICATE]->(p:Problem)
+    WHERE (i.name CONTAINS $issueType OR i.label CONTAINS $issueType)
+    MATCH (p)-[:RESOLVED_BY]->(s:Solution)
+    WHERE size($keywords) = 0 OR any(kw IN $keywords WHERE s.description CONTAINS kw)
+    RETURN p.name as problem_name, p.description as problem_description,
+           s.name as solution_name, s.description as solution_description,
+           s.effectiveness as solution_effectiveness
+    ORDER BY s.effectiveness DESC
+    LIMIT 5
+    """
+    
+    _Q_SERVICE_DEPS = """
+    MATCH (s:Class {name: $serviceName})-[:DEPENDS_ON]->(dep:Class)
+    RETURN dep.name as dependency_name, dep.label as dependency_label, 
+           dep.description as dependency_description
+    """
+    
+    _Q_INCIDENT_MGMT = """
+    MATCH path = (im:Class {uri: "http://ontology.it/itsmo/v1#IncidentManagement"})-[*1..2]-(related:Class)
+    RETURN related.name as name, related.label as label, related.description as description
+    """
+    
+    _Q_CONCEPTS_BY_ISSUE = """
+    MATCH (c:Class)
+    WHERE any(ct IN $classTypes WHERE c.name CONTAINS ct OR c.label CONTAINS ct)
+    AND (size($keywords) = 0 OR any(kw IN $keywords WHERE c.name CONTAINS kw OR c.label CONTAINS kw OR c.description CONTAINS kw))
+    MATCH path = (c)-[r*0..2]-(related:Class)
+    RETURN c.name as source_name, c.label as source_label, c.description as source_description,
+           type(r[0]) as relationship_type,
+           related.name as related_name, related.label as related_label, related.description as related_description
+    LIMIT 20
+    """
+    
+    # Server-side timeout (seconds) applied to every ontology query
+    _QUERY_TIMEOUT = 10
+    
+    # Placeholder value that matches no ontology node, used when warming the plan cache
+    _WARMUP_VALUE = "__meai_plan_cache_warmup__"
+    
+    # Map issue types to ontology classes
+    _ISSUE_CLASS_TYPES = {
+        "Hardware": ["Hardware", "Device", "ConfigurationItem", "Asset"],
+        "Software": ["Software", "Application", "Program", "ConfigurationItem"],
+        "Password": ["Authentication", "Access", "Security", "Account"],
+        "Network": ["Network", "Connectivity", "Communication"]
+    }
+    
     def __init__(self, uri, username, password):
         self.uri = uri
         self.username = username
@@ -20,9 +160,40 @@ class ITSMOntologyManager:
         try:
             self.driver = GraphDatabase.driver(self.uri, auth=(self.username, self.password))
             logger.info("Connected to Neo4j database")
+            self._ensure_indexes()
+            self._warm_query_cache()
         except Exception as e:
             logger.error(f"Error connecting to Neo4j: {str(e)}")
     
+    def _ensure_indexes(self):
+        """Create the schema indexes used by the ontology queries if they are missing"""
+        try:
+            with self.driver.session() as session:
+                for statement in self._INDEXES:
+                    session.run(statement).consume()
+            logger.info("Verified Neo4j ontology indexes")
+        except Exception as e:
+            logger.warning(f"Could not create Neo4j ontology indexes: {str(e)}")
+    
+    def _warm_query_cache(self):
+        """Run each hot query once so Neo4j has parsed and planned it before the first user request"""
+        warmup = self._WARMUP_VALUE
+        hot_queries = (
+            (self._Q_STEPS_SPECIFIC, {"issueType": warmup, "deviceType": warmup}),
+            (self._Q_STEPS_GENERAL, {"issueType": warmup}),
+            (self._Q_POTENTIAL_SOLUTIONS, {"issueType": warmup, "keywords": []}),
+            (self._Q_SERVICE_DEPS, {"serviceName": warmup}),
+            (self._Q_CONCEPTS_BY_ISSUE, {"classTypes": [warmup], "keywords": []}),
+        )
+        
+        try:
+            with self.driver.session() as session:
+                for text, params in hot_queries:
+                    session.run(Query(text, timeout=self._QUERY_TIMEOUT), params).consume()
+            logger.info("Warmed Neo4j query plan cache")
+        except Exception as e:
+            logger.warning(f"Could not warm Neo4j query plan cache: {str(e)}")
+    
     def close(self):
         """Close the Neo4j connection"""
         if self.driver:
@@ -30,111 +201,82 @@ class ITSMOntologyManager:
     
     def query_ontology(self, query, params=None):
         """Run a Cypher query against the ontology"""
+        return list(self.iter_ontology(query, params))
+    
+    def iter_ontology(self, query, params=None) -> Iterator[Dict[str, Any]]:
+        """Run a Cypher query and yield result rows as they arrive over Bolt"""
         if not self.driver:
             logger.error("No Neo4j connection available")
-            return []
+            return
         
         try:
+            # The session stays open until the caller has consumed the generator
             with self.driver.session() as session:
-                result = session.run(query, params or {})
-                return [record.data() for record in result]
+                # Constant query text lets the server reuse its cached plan and only rebind parameters
+                result = session.run(Query(query, timeout=self._QUERY_TIMEOUT), params or {})
+                for record in result:
+                    yield record.data()
         except Exception as e:
             logger.error(f"Error querying Neo4j: {str(e)}")
-            return []
+    
+    def iter_ontology_pages(self, query, params=None, page_size=100) -> Iterator[Dict[str, Any]]:
+        """Stream a large result set page by page; the query must end with SKIP $skip LIMIT $limit"""
+        skip = 0
+        while True:
+            page_params = dict(params or {}, skip=skip, limit=page_size)
+            row_count = 0
+            for row in self.iter_ontology(query, page_params):
+                row_count += 1
+                yield row
+            
+            # A short page means we've reached the end of the results
+            if row_count < page_size:
+                return
+            skip += page_size
     
     def query_troubleshooting_steps(self, issue_type, device_type=None):
         """Query troubleshooting steps for a specific issue type and device"""
         # First try to get specific troubleshooting for the combination
         if device_type:
-            query = """
-            MATCH (c:Class)
-            WHERE (c.name CONTAINS $issueType OR c.label CONTAINS $issueType)
-            AND (c.name CONTAINS $deviceType OR c.label CONTAINS $deviceType)
-            MATCH (c)-[:HAS]->(step:TroubleshootingStep)
-            RETURN step.name as step_name, step.description as step_description, step.order as step_order
-            ORDER BY step.order
-            """
-            
-            result = self.query_ontology(query, {"issueType": issue_type, "deviceType": device_type})
+            result = self.query_ontology(self._Q_STEPS_SPECIFIC, {"issueType": issue_type, "deviceType": device_type})
             
             # If we found specific steps, return them
             if result:
                 return result
         
         # Fall back to general troubleshooting for the issue type
-        query = """
-        MATCH (c:Class)
-        WHERE (c.name CONTAINS $issueType OR c.label CONTAINS $issueType)
-        MATCH (c)-[:HAS]->(step:TroubleshootingStep)
-        RETURN step.name as step_name, step.description as step_description, step.order as step_order
-        ORDER BY step.order
-        """
-        
-        return self.query_ontology(query, {"issueType": issue_type})
+        return self.query_ontology(self._Q_STEPS_GENERAL, {"issueType": issue_type})
     
     def query_potential_solutions(self, issue_type, keywords=None):
         """Query potential solutions for an issue type"""
-        # Start with base query
-        query = """
-        MATCH (i:Class)-[:MAY_INDICATE]->(p:Problem)
-        WHERE (i.name CONTAINS $issueType OR i.label CONTAINS $issueType)
-        MATCH (p)-[:RESOLVED_BY]->(s:Solution)
-        """
-        
-        params = {"issueType": issue_type}
-        
-        # Add keyword filters if provided
-        if keywords:
-            keyword_conditions = []
-            for i, kw in enumerate(keywords):
-                if kw:  # Skip empty keywords
-                    param_name = f"kw{i}"
-                    keyword_conditions.append(f"s.description CONTAINS ${param_name}")
-                    params[param_name] = kw
-            
-            if keyword_conditions:
-                query += "WHERE " + " OR ".join(keyword_conditions)
-        
-        # Complete the query
-        query += """
-        RETURN p.name as problem_name, p.description as problem_description,
-               s.name as solution_name, s.description as solution_description,
-               s.effectiveness as solution_effectiveness
-        ORDER BY s.effectiveness DESC
-        LIMIT 5
-        """
+        # Skip empty keywords
+        keyword_list = [kw for kw in (keywords or []) if kw]
         
-        return self.query_ontology(query, params)
+        return self.query_ontology(self._Q_POTENTIAL_SOLUTIONS, {"issueType": issue_type, "keywords": keyword_list})
     
     def query_service_dependencies(self, service_name):
         """Query dependencies for a service"""
-        query = """
-        MATCH (s:Class {name: $serviceName})-[:DEPENDS_ON]->(dep:Class)
-        RETURN dep.name as dependency_name, dep.label as dependency_label, 
-               dep.description as dependency_description
-        """
-        
-        return self.query_ontology(query, {"serviceName": service_name})
+        return self.query_ontology(self._Q_SERVICE_DEPS, {"serviceName": service_name})
     
     def format_ontology_for_prompt(self, concepts):
-        """Format ontology concepts for inclusion in prompt"""
+        """Format ontology concepts (a list or a streamed iterator of result dicts) for inclusion in prompt"""
         if not concepts:
             return ""
         
         ontology_prompt = "ITSM ONTOLOGY CONCEPTS:\n"
+        has_concepts = False
         
         for concept in concepts:
-            if all(k in concept for k in ['source_name', 'related_name']):
+            has_concepts = True
+            if 'source_name' in concept and 'related_name' in concept:
                 # Format graph relationship
-                source_name = concept.get('source_name', '')
-                source_label = concept.get('source_label', source_name)
-                source_desc = concept.get('source_description', '')
+                source_label = concept.get('source_label') or concept['source_name']
+                source_desc = concept.get('source_description')
                 
-                rel_type = concept.get('relationship_type', 'relates to')
+                rel_type = concept.get('relationship_type')
                 
-                related_name = concept.get('related_name', '')
-                related_label = concept.get('related_label', related_name)
-                related_desc = concept.get('related_description', '')
+                related_label = concept.get('related_label') or concept['related_name']
+                related_desc = concept.get('related_description')
                 
                 ontology_prompt += f"- {source_label}"
                 if rel_type:
@@ -151,9 +293,8 @@ class ITSMOntologyManager:
             
             elif 'name' in concept or 'label' in concept:
                 # Format single concept
-                name = concept.get('name', '')
-                label = concept.get('label', name)
-                description = concept.get('description', '')
+                label = concept.get('label') or concept.get('name')
+                description = concept.get('description')
                 
                 ontology_prompt += f"- {label}"
                 if description:
@@ -162,29 +303,29 @@ class ITSMOntologyManager:
             
             elif 'problem_name' in concept and 'solution_name' in concept:
                 # Format problem/solution
-                problem = concept.get('problem_name', '')
-                problem_desc = concept.get('problem_description', '')
-                solution = concept.get('solution_name', '')
-                solution_desc = concept.get('solution_description', '')
+                problem_desc = concept.get('problem_description')
+                solution_desc = concept.get('solution_description')
                 
-                ontology_prompt += f"- Problem: {problem}\n"
+                ontology_prompt += f"- Problem: {concept['problem_name']}\n"
                 if problem_desc:
                     ontology_prompt += f"  * Description: {problem_desc}\n"
                 
-                ontology_prompt += f"  * Solution: {solution}\n"
+                ontology_prompt += f"  * Solution: {concept['solution_name']}\n"
                 if solution_desc:
                     ontology_prompt += f"    - {solution_desc}\n"
             
             elif 'step_name' in concept:
                 # Format troubleshooting step
-                step_name = concept.get('step_name', '')
-                step_desc = concept.get('step_description', '')
-                step_order = concept.get('step_order', 0)
+                step_desc = concept.get('step_description')
                 
-                ontology_prompt += f"- Step {step_order}: {step_name}\n"
+                ontology_prompt += f"- Step {concept.get('step_order')}: {concept['step_name']}\n"
                 if step_desc:
                     ontology_prompt += f"  * {step_desc}\n"
         
+        # An empty iterator is still truthy, so check we actually formatted something
+        if not has_concepts:
+            return ""
+        
         return ontology_prompt
     
     def get_standardized_troubleshooting_steps(self, issue_type, device_type=None):
@@ -251,127 +392,32 @@ class ITSMOntologyManager:
     
     def get_issue_classification(self, issue_description):
         """Classify an issue based on ontology concepts"""
-        # Map common issue keywords to ontology concepts
-        hardware_keywords = ["laptop", "desktop", "printer", "device", "hardware", "keyboard", 
-                            "mouse", "monitor", "screen", "battery", "power", "usb", "disk"]
-        
-        software_keywords = ["software", "application", "program", "app", "windows", "office", 
-                            "excel", "word", "outlook", "browser", "update", "install",
-                            "license", "version", "freeze", "crash"]
-        
-        network_keywords = ["network", "wifi", "internet", "connection", "lan", "vpn", 
-                            "ethernet", "dns", "ip", "wireless", "connect", "access point"]
-        
-        security_keywords = ["password", "login", "security", "authentication", "access", 
-                            "account", "credentials", "reset", "locked", "mfa", "permission"]
-        
-        # Simple text matching for classification
-        issue_lower = issue_description.lower()
-        
-        # Count keyword matches
-        hw_count = sum(1 for kw in hardware_keywords if kw in issue_lower)
-        sw_count = sum(1 for kw in software_keywords if kw in issue_lower)
-        net_count = sum(1 for kw in network_keywords if kw in issue_lower)
-        sec_count = sum(1 for kw in security_keywords if kw in issue_lower)
-        
-        # Determine main category and query the ontology
-        category = "General"
-        primary_keywords = []
-        
-        if sec_count > max(hw_count, sw_count, net_count):
-            category = "Password"
-            primary_keywords = [kw for kw in security_keywords if kw in issue_lower]
-        elif hw_count > max(sw_count, net_count, sec_count):
-            category = "Hardware"
-            primary_keywords = [kw for kw in hardware_keywords if kw in issue_lower]
-        elif sw_count > max(hw_count, net_count, sec_count):
-            category = "Software" 
-            primary_keywords = [kw for kw in software_keywords if kw in issue_lower]
-        elif net_count > max(hw_count, sw_count, sec_count):
-            category = "Network"
-            primary_keywords = [kw for kw in network_keywords if kw in issue_lower]
-        
-        # If issue is network-related, treat as a subtype of hardware for agent selection
-        agent_category = "Hardware" if category == "Network" else category
+        category, agent_category, primary_keywords, confidence = _classify_issue(issue_description.strip().lower())
         
         return {
             "category": category,
             "agent_category": agent_category,
-            "primary_keywords": primary_keywords,
-            "confidence": max(hw_count, sw_count, net_count, sec_count) / 5  # Simple confidence score
+            "primary_keywords": list(primary_keywords),
+            "confidence": confidence
         }
     
     def query_incident_management_process(self):
         """Query incident management process from ontology"""
-        query = """
-        MATCH path = (im:Class {uri: "http://ontology.it/itsmo/v1#IncidentManagement"})-[*1..2]-(related:Class)
-        RETURN related.name as name, related.label as label, related.description as description
-        """
-        
-        return self.query_ontology(query)
+        return self.query_ontology(self._Q_INCIDENT_MGMT)
     
     def query_concepts_by_issue(self, issue_type, keywords=None):
         """Query concepts related to a specific issue type"""
-        # Map issue types to ontology classes
-        type_mapping = {
-            "Hardware": ["Hardware", "Device", "ConfigurationItem", "Asset"],
-            "Software": ["Software", "Application", "Program", "ConfigurationItem"],
-            "Password": ["Authentication", "Access", "Security", "Account"],
-            "Network": ["Network", "Connectivity", "Communication"]
-        }
-        
-        class_types = type_mapping.get(issue_type, [issue_type])
+        class_types = self._ISSUE_CLASS_TYPES.get(issue_type, [issue_type])
         
         # Convert keywords to a list if it's a string
         if isinstance(keywords, str):
             keywords = keywords.split()
         
-        # Build the query
-        params = {}
-        
-        # Base query to search for matching classes
-        query = """
-        MATCH (c:Class)
-        WHERE 
-        """
-        
-        # Add class type conditions
-        class_conditions = []
-        for i, ct in enumerate(class_types):
-            param_name = f"class{i}"
-            class_conditions.append(f"c.name CONTAINS ${param_name} OR c.label CONTAINS ${param_name}")
-            params[param_name] = ct
-        
-        query += "(" + " OR ".join(class_conditions) + ")"
-        
-        # Add keyword conditions if provided
-        if keywords:
-            query += " AND ("
-            keyword_conditions = []
-            for i, kw in enumerate(keywords):
-                if kw:  # Skip empty keywords
-                    param_name = f"kw{i}"
-                    keyword_conditions.append(f"c.name CONTAINS ${param_name} OR c.label CONTAINS ${param_name} OR c.description CONTAINS ${param_name}")
-                    params[param_name] = kw
-            
-            if keyword_conditions:
-                query += " OR ".join(keyword_conditions)
-            else:
-                query += "1=1"  # Always true if no valid keywords
-            
-            query += ")"
-        
-        # Complete query to get related concepts
-        query += """
-        MATCH path = (c)-[r*0..2]-(related:Class)
-        RETURN c.name as source_name, c.label as source_label, c.description as source_description,
-               type(r[0]) as relationship_type,
-               related.name as related_name, related.label as related_label, related.description as related_description
-        LIMIT 20
-        """
+        # Skip empty keywords
+        keyword_list = [kw for kw in (keywords or []) if kw]
         
         try:
-            return self.query_ontology(query, params)
+            return self.query_ontology(self._Q_CONCEPTS_BY_ISSUE, {"classTypes": class_types, "keywords": keyword_list})
         except Exception as e:
             logger.error(f"Error querying concepts by issue: {str(e)}")
             return []
\ No newline at end of file
@@ -1,11 +1,99 @@
 # rag_knowledge_base_bedrock.py
 import logging
+import asyncio
+import hashlib
+import threading
 import boto3
 import json
+from botocore.config import Config
 from typing import Dict, Any, List, Optional, Tuple
 
+from existing.loop_local import get_loop_local, pop_loop_local
+
+try:
+    import aioboto3
+except ImportError:  # Async client is optional; aquery falls back to a worker thread
+    aioboto3 = None
+
 logger = logging.getLogger('rag_knowledge_base')
 
+# Connection pool and retry settings shared by all Bedrock clients
+BEDROCK_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    retries={"max_attempts": 3, "mode": "standard"},
+    connect_timeout=2,
+    read_timeout=15,
+    tcp_keepalive=True
+)
+
+# Bedrock clients shared across RAGKnowledgeBase instances, keyed by (region, access key hash)
+_bedrock_clients = {}
+_bedrock_clients_lock = threading.Lock()
+
+def _get_bedrock_clients(aws_region, aws_access_key=None, aws_secret_key=None):
+    """Return the (runtime, agent runtime) client pair for a region and credentials, creating it once"""
+    access_key_hash = hashlib.sha256((aws_access_key or '').encode()).hexdigest()
+    cache_key = (aws_region, access_key_hash)
+    
+    with _bedrock_clients_lock:
+        clients = _bedrock_clients.get(cache_key)
+        if clients is None:
+            # Create AWS session
+            session = boto3.Session(
+                region_name=aws_region,
+                aws_access_key_id=aws_access_key,
+                aws_secret_access_key=aws_secret_key
+            )
+            
+            clients = (
+                # Bedrock Runtime client (for embeddings if needed)
+                session.client('bedrock-runtime', config=BEDROCK_CLIENT_CONFIG),
+                # Bedrock Agent Runtime client (for knowledge base queries)
+                session.client('bedrock-agent-runtime', config=BEDROCK_CLIENT_CONFIG)
+            )
+            _bedrock_clients[cache_key] = clients
+    
+    return clients
+
+async def _anew_bedrock_kb_client(aws_region, aws_access_key=None, aws_secret_key=None):
+    """Open an async Bedrock Agent Runtime client; it stays open until close_bedrock_clients"""
+    session = aioboto3.Session(
+        region_name=aws_region,
+        aws_access_key_id=aws_access_key,
+        aws_secret_access_key=aws_secret_key
+    )
+    return await session.client('bedrock-agent-runtime', config=BEDROCK_CLIENT_CONFIG).__aenter__()
+
+async def _aget_bedrock_kb_client(aws_region, aws_access_key=None, aws_secret_key=None):
+    """Return the running loop's async Bedrock Agent Runtime client for a region and credentials, creating it once"""
+    access_key_hash = hashlib.sha256((aws_access_key or '').encode()).hexdigest()
+    cache_key = (aws_region, access_key_hash)
+    
+    # Concurrent first queries on a loop await the same creation task instead of opening a client each
+    tasks = get_loop_local("bedrock_kb_clients", dict)
+    task = tasks.get(cache_key)
+    if task is None:
+        task = tasks[cache_key] = asyncio.ensure_future(
+            _anew_bedrock_kb_client(aws_region, aws_access_key, aws_secret_key)
+        )
+    try:
+        return await task
+    except Exception:
+        # Let the next query try again rather than replaying the failure
+        if tasks.get(cache_key) is task:
+            del tasks[cache_key]
+        raise
+
+async def close_bedrock_clients():
+    """Close the running loop's async Bedrock clients"""
+    tasks = pop_loop_local("bedrock_kb_clients") or {}
+    for task in tasks.values():
+        try:
+            client = await task
+            await client.close()
+        except Exception as e:
+            logger.error(f"Error closing async Bedrock client: {str(e)}")
+
 class RAGKnowledgeBase:
     """Retrieval-Augmented Generation Knowledge Base using AWS Bedrock Knowledge Base"""
     
@@ -25,23 +113,56 @@ class RAGKnowledgeBase:
     def _initialize_clients(self):
         """Initialize AWS Bedrock clients"""
         try:
-            # Create AWS session
-            session = boto3.Session(
-                region_name=self.aws_region,
-                aws_access_key_id=self.aws_access_key,
-                aws_secret_access_key=self.aws_secret_key
+            self.bedrock_client, self.bedrock_kb_client = _get_bedrock_clients(
+                self.aws_region,
+                self.aws_access_key,
+                self.aws_secret_key
             )
             
-            # Initialize Bedrock Runtime client (for embeddings if needed)
-            self.bedrock_client = session.client('bedrock-runtime')
-            
-            # Initialize Bedrock Agent Runtime client (for knowledge base queries)
-            self.bedrock_kb_client = session.client('bedrock-agent-runtime')
-            
             logger.info(f"Successfully initialized AWS Bedrock clients in region {self.aws_region}")
         except Exception as e:
             logger.error(f"Error initializing AWS Bedrock clients: {str(e)}")
     
+    def _retrieve_params(self, question, k):
+        """Build the keyword arguments for a Bedrock Knowledge Base retrieve call"""
+        return {
+            "knowledgeBaseId": self.knowledge_base_id,
+            "retrievalQuery": {
+                'text': question
+            },
+            "retrievalConfiguration": {
+                'vectorSearchConfiguration': {
+                    'numberOfResults': k
+                }
+            }
+        }
+    
+    def _parse_retrieval_results(self, response):
+        """Convert a Bedrock retrieve response into document dicts"""
+        retrieval_results = response.get('retrievalResults', [])
+        
+        documents = []
+        for result in retrieval_results:
+            # Extract content and metadata
+            content = result.get('content', {}).get('text', '')
+            
+            # Get metadata (location, title, etc.)
+            metadata = {}
+            location = result.get('location', {})
+            if location:
+                metadata['source'] = location.get('s3Location', {}).get('uri', '')
+            
+            # Get score (confidence)
+            score = result.get('score', 0)
+            
+            documents.append({
+                "content": content,
+                "metadata": metadata,
+                "score": score
+            })
+        
+        return documents
+    
     def query(self, question, k=3):
         """Query the knowledge base for relevant documents"""
         if not self.bedrock_kb_client:
@@ -50,40 +171,28 @@ class RAGKnowledgeBase:
         
         try:
             # Call Bedrock Knowledge Base API
-            response = self.bedrock_kb_client.retrieve(
-                knowledgeBaseId=self.knowledge_base_id,
-                retrievalQuery={
-                    'text': question
-                },
-                retrievalConfiguration={
-                    'vectorSearchConfiguration': {
-                        'numberOfResults': k
-                    }
-                }
-            )
+            response = self.bedrock_kb_client.retrieve(**self._retrieve_params(question, k))
             
             # Process results
-            retrieval_results = response.get('retrievalResults', [])
+            documents = self._parse_retrieval_results(response)
             
-            documents = []
-            for result in retrieval_results:
-                # Extract content and metadata
-                content = result.get('content', {}).get('text', '')
-                
-                # Get metadata (location, title, etc.)
-                metadata = {}
-                location = result.get('location', {})
-                if location:
-                    metadata['source'] = location.get('s3Location', {}).get('uri', '')
-                
-                # Get score (confidence)
-                score = result.get('score', 0)
-                
-                documents.append({
-                    "content": content,
-                    "metadata": metadata,
-                    "score": score
-                })
+            logger.info(f"Retrieved {len(documents)} documents from Bedrock Knowledge Base")
+            return documents
+        except Exception as e:
+            logger.error(f"Error querying Bedrock Knowledge Base: {str(e)}")
+            return []
+    
+    async def aquery(self, question, k=3):
+        """Asynchronously query the knowledge base for relevant documents"""
+        if aioboto3 is None:
+            # No async client installed, run the blocking call off the event loop
+            return await asyncio.to_thread(self.query, question, k)
+        
+        try:
+            client = await _aget_bedrock_kb_client(self.aws_region, self.aws_access_key, self.aws_secret_key)
+            response = await client.retrieve(**self._retrieve_params(question, k))
+            
+            documents = self._parse_retrieval_results(response)
             
             logger.info(f"Retrieved {len(documents)} documents from Bedrock Knowledge Base")
             return documents
@@ -91,6 +200,10 @@ class RAGKnowledgeBase:
             logger.error(f"Error querying Bedrock Knowledge Base: {str(e)}")
             return []
     
+    async def aquery_many(self, questions: List[str], k=3) -> List[List[Dict[str, Any]]]:
+        """Query the knowledge base for several questions concurrently"""
+        return await asyncio.gather(*[self.aquery(q, k) for q in questions])
+    
     def format_documents_for_prompt(self, documents):
         """Format retrieved documents for inclusion in prompt"""
         if not documents:
@@ -1,10 +1,135 @@
 # semantic_profile_manager.py
 import logging
-import requests
+import asyncio
+import re
+import threading
+import orjson
 from typing import Dict, Any, Optional, List
 
+from cachetools import LRUCache, TTLCache
+
+from existing.db_service import (
+    aiohttp, create_http_session, get_async_session, shared_db_token, DB_SERVICE_TIMEOUT, JSON_HEADERS
+)
+
 logger = logging.getLogger('semantic_profile_manager')
 
+# Processed profile sections that feed the prompt, in output order
+_PROFILE_SECTIONS = ("demographics", "preferences", "goals", "behavioral")
+
+# Profile flags checked in order; the first truthy one sets the tech level
+_TECH_ORDER = (
+    ('tech_advanced', 'advanced'),
+    ('tech_specialized_a', 'specialized'),
+    ('tech_specialized_b', 'specialized'),
+    ('tech_specialized_c', 'specialized'),
+    ('tech_intermediate', 'intermediate'),
+    ('tech_basic', 'basic'),
+)
+
+# Communication style keywords; when several appear, the label listed first in _COMM_PRIORITY wins
+_COMM_MAP = {
+    'concise': 'concise', 'brief': 'concise',
+    'detailed': 'detailed', 'thorough': 'detailed',
+    'formal': 'formal',
+    'casual': 'casual', 'informal': 'casual',
+    'simple': 'simple', 'plain': 'simple',
+    'technical': 'technical',
+}
+_COMM_PRIORITY = {label: rank for rank, label in enumerate(('concise', 'detailed', 'formal', 'casual', 'simple', 'technical'))}
+# Longest keywords first so "informal" is not read as "formal"
+_COMM_RE = re.compile('|'.join(sorted(_COMM_MAP, key=len, reverse=True)))
+
+# Profile fields per section, stored in the profile as <prefix><field>
+_DEMOGRAPHIC_FIELDS = ('age', 'gender', 'occupation', 'education', 'location', 'language')
+_PREFERENCE_FIELDS = ('terms', 'products', 'services', 'communication_style', 'expectation')
+_GOAL_FIELDS = ('pain', 'need', 'driver', 'aim')
+_BEHAVIORAL_FIELDS = ('actions', 'habits', 'activity', 'interactions')
+# Preference keys already rendered elsewhere in the profile prompt section
+_PREFERENCE_PROMPT_SKIP = frozenset({'communication_style'})
+
+# (profile key, processed section, section key) for every extracted field, in output order
+_PROFILE_FIELDS = tuple(
+    (prefix + field, section, field)
+    for section, prefix, fields in (
+        ("demographics", 'demog_', _DEMOGRAPHIC_FIELDS),
+        ("preferences", 'pref_', _PREFERENCE_FIELDS),
+        ("goals", 'goal_', _GOAL_FIELDS),
+        ("behavioral", 'behv_', _BEHAVIORAL_FIELDS),
+    )
+    for field in fields
+)
+
+def _extract(profile, prefix, fields) -> Dict[str, str]:
+    """Collect the non-empty prefixed profile fields, keyed without the prefix"""
+    return {field: profile[prefix + field] for field in fields if profile.get(prefix + field)}
+
+# Static instruction blocks for get_tailored_instructions
+TECH_BLOCKS = {
+    "advanced": (
+        "  * You can use technical terminology and provide detailed technical explanations\n"
+        "  * Focus on efficiency and advanced solutions\n"
+        "  * Assume familiarity with IT concepts and tools\n"
+    ),
+    "specialized": (
+        "  * Use appropriate technical terminology for their domain\n"
+        "  * Provide specialized insights when relevant to their field\n"
+        "  * Balance technical detail with clear explanations\n"
+    ),
+    "intermediate": (
+        "  * Balance technical details with clear explanations\n"
+        "  * Explain important concepts without oversimplifying\n"
+        "  * Provide context for technical terms\n"
+    ),
+    "basic": (
+        "  * Avoid technical jargon and provide simple step-by-step instructions\n"
+        "  * Use analogies and examples to explain concepts\n"
+        "  * Focus on visual guidance and clear indicators of progress\n"
+    ),
+}
+
+COMM_BLOCKS = {
+    "concise": (
+        "  * Be brief and to the point\n"
+        "  * Prioritize actionable information\n"
+        "  * Use bullet points and short paragraphs\n"
+    ),
+    "detailed": (
+        "  * Provide thorough explanations with appropriate details\n"
+        "  * Include contextual information and background\n"
+        "  * Explain the reasoning behind recommendations\n"
+    ),
+    "formal": (
+        "  * Use formal, professional language and structure\n"
+        "  * Maintain a respectful and business-like tone\n"
+        "  * Avoid casual expressions and slang\n"
+    ),
+    "casual": (
+        "  * Use a more conversational, approachable tone\n"
+        "  * Include friendly rapport-building elements\n"
+        "  * Balance warmth with professionalism\n"
+    ),
+    "simple": (
+        "  * Use plain language and simple explanations\n"
+        "  * Avoid complex sentence structures\n"
+        "  * Focus on clarity above all\n"
+    ),
+}
+
+AGE_BLOCK = (
+    "- Age considerations:\n"
+    "  * Provide clearer visual instructions\n"
+    "  * Allow more time for technical concepts\n"
+    "  * Avoid assuming familiarity with newer technologies\n"
+)
+
+LANGUAGE_BLOCK = (
+    "- Language considerations:\n"
+    "  * Use straightforward language\n"
+    "  * Avoid idioms and complex expressions\n"
+    "  * Use simple sentence structures\n"
+)
+
 class SemanticProfileManager:
     """Manager for retrieving and processing semantic user profiles"""
     
@@ -13,24 +138,64 @@ class SemanticProfileManager:
         self.db_username = db_username
         self.db_password = db_password
         self.token = None
+        self._token_lock = threading.Lock()
+        # Pooled keep-alive session; carries this manager's Authorization header and re-logs in on a 401
+        self.session = create_http_session(refresh_token=self._refresh_db_token)
+        # Profiles found by email/phone, reused across a conversation
+        self._profile_cache = TTLCache(maxsize=4096, ttl=300)
+        self._profile_cache_lock = threading.Lock()
+        # Per-turn prompt assembly memos: processed data per profile object, prompt text per processed values
+        self._processed_cache = LRUCache(maxsize=1024)
+        self._prompt_cache = LRUCache(maxsize=1024)
+        self._memo_lock = threading.Lock()
         self._get_db_token()
     
     def _get_db_token(self):
         """Get a token for the DB service"""
+        if self.token:
+            return self.token
+        with self._token_lock:
+            # Another caller may have logged in while we waited for the lock
+            if self.token:
+                return self.token
+            return self._use_token(shared_db_token(self.db_service_url, self.db_username, self._login))
+    
+    def _refresh_db_token(self, stale_token=None):
+        """Log in again after a 401; callers racing on the same stale token share one login"""
+        with self._token_lock:
+            if stale_token is not None and self.token and self.token != stale_token:
+                return self.token
+            stale_token = stale_token or self.token
+            self.token = None
+            self.session.headers.pop('Authorization', None)
+            return self._use_token(
+                shared_db_token(self.db_service_url, self.db_username, self._login, stale_token=stale_token)
+            )
+    
+    def _use_token(self, token):
+        """Make token this manager's current DB service token"""
+        self.token = token
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+        return token
+    
+    def _login(self):
+        """Log in to the DB service and return the new token"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.db_service_url}/login",
-                json={
+                data=orjson.dumps({
                     "username": self.db_username,
                     "password": self.db_password
-                }
+                }),
+                headers=JSON_HEADERS,
+                timeout=DB_SERVICE_TIMEOUT
             )
             
             if response.status_code == 200:
-                data = response.json()
-                self.token = data.get('token')
+                data = orjson.loads(response.content)
                 logger.info(f"Successfully obtained DB service token")
-                return self.token
+                return data.get('token')
             else:
                 logger.error(f"Failed to get DB service token: {response.text}")
                 return None
@@ -38,26 +203,49 @@ class SemanticProfileManager:
             logger.error(f"Error getting DB service token: {str(e)}")
             return None
     
+    def _cached_profile(self, key) -> Optional[Dict[str, Any]]:
+        """Look up a profile in the TTL cache"""
+        with self._profile_cache_lock:
+            return self._profile_cache.get(key)
+    
+    def _cache_profile(self, key, profile) -> Dict[str, Any]:
+        """Store a found profile in the TTL cache and pass it through"""
+        with self._profile_cache_lock:
+            self._profile_cache[key] = profile
+        return profile
+    
+    def invalidate(self, key=None):
+        """Drop a cached profile, e.g. ("email", "a@b.com"), or all cached profiles when key is None"""
+        with self._profile_cache_lock:
+            if key is None:
+                self._profile_cache.clear()
+            else:
+                self._profile_cache.pop(key, None)
+    
     def get_profile_by_email(self, email) -> Optional[Dict[str, Any]]:
         """Get semantic profile by email"""
         try:
+            cached = self._cached_profile(("email", email.lower()))
+            if cached is not None:
+                return cached
+            
             if not self.token:
                 self._get_db_token()
                 if not self.token:
                     return None
             
             # Query the profile endpoint
-            response = requests.get(
+            response = self.session.get(
                 f"{self.db_service_url}/profiles/search",
-                headers={"Authorization": f"Bearer {self.token}"},
-                params={"email": email}
+                params={"email": email},
+                timeout=DB_SERVICE_TIMEOUT
             )
             
             if response.status_code == 200:
-                profiles = response.json()
+                profiles = orjson.loads(response.content)
                 if profiles and len(profiles) > 0:
                     logger.info(f"Found semantic profile for email: {email}")
-                    return profiles[0]
+                    return self._cache_profile(("email", email.lower()), profiles[0])
             
             logger.warning(f"No semantic profile found for email: {email}")
             return None
@@ -69,23 +257,27 @@ class SemanticProfileManager:
     def get_profile_by_phone(self, phone) -> Optional[Dict[str, Any]]:
         """Get semantic profile by phone number"""
         try:
+            cached = self._cached_profile(("phone", phone))
+            if cached is not None:
+                return cached
+            
             if not self.token:
                 self._get_db_token()
                 if not self.token:
                     return None
             
             # Query the profile endpoint
-            response = requests.get(
+            response = self.session.get(
                 f"{self.db_service_url}/profiles/search",
-                headers={"Authorization": f"Bearer {self.token}"},
-                params={"phone": phone}
+                params={"phone": phone},
+                timeout=DB_SERVICE_TIMEOUT
             )
             
             if response.status_code == 200:
-                profiles = response.json()
+                profiles = orjson.loads(response.content)
                 if profiles and len(profiles) > 0:
                     logger.info(f"Found semantic profile for phone: {phone}")
-                    return profiles[0]
+                    return self._cache_profile(("phone", phone), profiles[0])
             
             logger.warning(f"No semantic profile found for phone: {phone}")
             return None
@@ -94,6 +286,106 @@ class SemanticProfileManager:
             logger.error(f"Error retrieving semantic profile by phone: {str(e)}")
             return None
     
+    def get_profiles_by_emails(self, emails) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get semantic profiles for many emails with one batch request, keyed by email"""
+        results = {}
+        pending = {}
+        for email in emails:
+            cached = self._cached_profile(("email", email.lower()))
+            if cached is not None:
+                results[email] = cached
+            else:
+                pending[email.lower()] = email
+        
+        if not pending:
+            return results
+        
+        try:
+            if not self._get_db_token():
+                return results
+            
+            response = self.session.post(
+                f"{self.db_service_url}/profiles/batch_search",
+                data=orjson.dumps({"emails": list(pending)}),
+                headers=JSON_HEADERS,
+                timeout=DB_SERVICE_TIMEOUT
+            )
+            
+            if response.status_code == 404:
+                # Batch endpoint not deployed; look each email up on its own
+                logger.warning("Profile batch search unavailable, looking up emails individually")
+                for email in pending.values():
+                    results[email] = self.get_profile_by_email(email)
+                return results
+            
+            if response.status_code != 200:
+                logger.error(f"Error batch retrieving semantic profiles: {response.text}")
+                return results
+            
+            # Matching profiles come back keyed by the submitted lowercased email
+            found = orjson.loads(response.content)
+            for lowered, email in pending.items():
+                profiles = found.get(lowered)
+                results[email] = self._cache_profile(("email", lowered), profiles[0]) if profiles else None
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error batch retrieving semantic profiles: {str(e)}")
+            return results
+    
+    async def _asearch_profile(self, field, value) -> Optional[Dict[str, Any]]:
+        """Query the profile search endpoint on the shared aiohttp session"""
+        key = (field, value.lower() if field == "email" else value)
+        cached = self._cached_profile(key)
+        if cached is not None:
+            return cached
+        
+        if not self.token:
+            await asyncio.to_thread(self._get_db_token)
+            if not self.token:
+                return None
+        
+        for attempt in range(2):
+            token = self.token
+            async with get_async_session().get(
+                f"{self.db_service_url}/profiles/search",
+                params={field: value},
+                headers={"Authorization": f"Bearer {token}"}
+            ) as response:
+                if response.status != 401 or attempt:
+                    if response.status == 200:
+                        profiles = await response.json(loads=orjson.loads)
+                        if profiles and len(profiles) > 0:
+                            logger.info(f"Found semantic profile for {field}: {value}")
+                            return self._cache_profile(key, profiles[0])
+                    break
+            if not await asyncio.to_thread(self._refresh_db_token, token):
+                break
+        
+        logger.warning(f"No semantic profile found for {field}: {value}")
+        return None
+    
+    async def aget_profile_by_email(self, email) -> Optional[Dict[str, Any]]:
+        """Async variant of get_profile_by_email"""
+        if aiohttp is None:
+            return await asyncio.to_thread(self.get_profile_by_email, email)
+        try:
+            return await self._asearch_profile("email", email)
+        except Exception as e:
+            logger.error(f"Error retrieving semantic profile by email: {str(e)}")
+            return None
+    
+    async def aget_profile_by_phone(self, phone) -> Optional[Dict[str, Any]]:
+        """Async variant of get_profile_by_phone"""
+        if aiohttp is None:
+            return await asyncio.to_thread(self.get_profile_by_phone, phone)
+        try:
+            return await self._asearch_profile("phone", phone)
+        except Exception as e:
+            logger.error(f"Error retrieving semantic profile by phone: {str(e)}")
+            return None
+    
     def process_profile_data(self, profile_data) -> Dict[str, Any]:
         """Process and normalize semantic profile data"""
         if not profile_data:
@@ -105,33 +397,55 @@ class SemanticProfileManager:
                 "goals": {}
             }
         
+        # The entry holds the profile itself so its id cannot be reused while cached
+        with self._memo_lock:
+            entry = self._processed_cache.get(id(profile_data))
+        if entry is not None and entry[0] is profile_data:
+            return entry[1]
+        
+        # One pass over the field table fills every section
+        sections = {section: {} for section in _PROFILE_SECTIONS}
+        for profile_key, section, key in _PROFILE_FIELDS:
+            value = profile_data.get(profile_key)
+            if value:
+                sections[section][key] = value
+        
         processed_data = {
             "tech_level": self.get_tech_proficiency_level(profile_data),
             "communication_style": self.get_communication_style(profile_data),
-            "demographics": self.extract_demographics(profile_data),
-            "preferences": self.extract_preferences(profile_data),
-            "goals": self.extract_goals(profile_data),
-            "behavioral": self.extract_behavioral_patterns(profile_data)
+            **sections
         }
         
+        with self._memo_lock:
+            self._processed_cache[id(profile_data)] = (profile_data, processed_data)
         return processed_data
     
+    def _memoized_prompt(self, kind, processed_data, build) -> str:
+        """Return build(processed_data), shared by all profiles with the same processed values"""
+        try:
+            key = (kind, processed_data['tech_level'], processed_data['communication_style'],
+                   *(tuple(processed_data[section].items()) for section in _PROFILE_SECTIONS))
+            with self._memo_lock:
+                text = self._prompt_cache.get(key)
+        except TypeError:
+            # Unhashable profile values; build without memoizing
+            return build(processed_data)
+        
+        if text is None:
+            text = build(processed_data)
+            with self._memo_lock:
+                self._prompt_cache[key] = text
+        return text
+    
     def get_tech_proficiency_level(self, profile) -> str:
         """Extract technical proficiency level from profile"""
         if not profile:
             return "intermediate"  # Default level
         
-        # Check tech proficiency fields
-        if profile.get('tech_advanced'):
-            return "advanced"
-        elif profile.get('tech_specialized_a') or profile.get('tech_specialized_b') or profile.get('tech_specialized_c'):
-            return "specialized"
-        elif profile.get('tech_intermediate'):
-            return "intermediate"
-        elif profile.get('tech_basic'):
-            return "basic"
-        else:
-            return "intermediate"  # Default if no specific level found
+        for field, level in _TECH_ORDER:
+            if profile.get(field):
+                return level
+        return "intermediate"  # Default if no specific level found
     
     def get_communication_style(self, profile) -> str:
         """Extract communication style from profile"""
@@ -141,74 +455,24 @@ class SemanticProfileManager:
         style = profile.get('pref_communication_style', '').lower()
         
         # Map communication style preferences
-        if 'concise' in style or 'brief' in style:
-            return "concise"
-        elif 'detailed' in style or 'thorough' in style:
-            return "detailed"
-        elif 'formal' in style:
-            return "formal"
-        elif 'casual' in style or 'informal' in style:
-            return "casual"
-        elif 'simple' in style or 'plain' in style:
-            return "simple"
-        elif 'technical' in style:
-            return "technical"
-        else:
-            return "neutral"
+        labels = {_COMM_MAP[keyword] for keyword in _COMM_RE.findall(style)}
+        return min(labels, key=_COMM_PRIORITY.__getitem__) if labels else "neutral"
     
     def extract_demographics(self, profile) -> Dict[str, str]:
         """Extract demographic information from profile"""
-        demographics = {}
-        
-        demo_fields = ['demog_age', 'demog_gender', 'demog_occupation', 
-                       'demog_education', 'demog_location', 'demog_language']
-        
-        for field in demo_fields:
-            if field in profile and profile[field]:
-                key = field.replace('demog_', '')
-                demographics[key] = profile[field]
-        
-        return demographics
+        return _extract(profile, 'demog_', _DEMOGRAPHIC_FIELDS)
     
     def extract_preferences(self, profile) -> Dict[str, str]:
         """Extract user preferences from profile"""
-        preferences = {}
-        
-        pref_fields = ['pref_terms', 'pref_products', 'pref_services', 
-                        'pref_communication_style', 'pref_expectation']
-        
-        for field in pref_fields:
-            if field in profile and profile[field]:
-                key = field.replace('pref_', '')
-                preferences[key] = profile[field]
-        
-        return preferences
+        return _extract(profile, 'pref_', _PREFERENCE_FIELDS)
     
     def extract_goals(self, profile) -> Dict[str, str]:
         """Extract user goals and motivations from profile"""
-        goals = {}
-        
-        goal_fields = ['goal_pain', 'goal_need', 'goal_driver', 'goal_aim']
-        
-        for field in goal_fields:
-            if field in profile and profile[field]:
-                key = field.replace('goal_', '')
-                goals[key] = profile[field]
-        
-        return goals
+        return _extract(profile, 'goal_', _GOAL_FIELDS)
     
     def extract_behavioral_patterns(self, profile) -> Dict[str, str]:
         """Extract behavioral patterns from profile"""
-        behavioral = {}
-        
-        behav_fields = ['behv_actions', 'behv_habits', 'behv_activity', 'behv_interactions']
-        
-        for field in behav_fields:
-            if field in profile and profile[field]:
-                key = field.replace('behv_', '')
-                behavioral[key] = profile[field]
-        
-        return behavioral
+        return _extract(profile, 'behv_', _BEHAVIORAL_FIELDS)
     
     def create_profile_prompt_section(self, profile) -> str:
         """Create a section for the prompt that includes relevant profile information"""
@@ -216,45 +480,42 @@ class SemanticProfileManager:
             return ""
         
         processed_data = self.process_profile_data(profile)
-        
-        prompt_section = "USER SEMANTIC PROFILE:\n"
-        
-        # Add tech level
-        prompt_section += f"- Technical Proficiency: {processed_data['tech_level']}\n"
-        
-        # Add communication style
-        prompt_section += f"- Communication Style: {processed_data['communication_style']}\n"
+        return self._memoized_prompt("profile", processed_data, self._build_profile_prompt_section)
+    
+    def _build_profile_prompt_section(self, processed_data) -> str:
+        """Render the profile prompt section from processed profile data"""
+        parts = [
+            "USER SEMANTIC PROFILE:\n",
+            f"- Technical Proficiency: {processed_data['tech_level']}\n",
+            f"- Communication Style: {processed_data['communication_style']}\n"
+        ]
         
         # Add demographics if available
         demographics = processed_data['demographics']
         if demographics:
-            prompt_section += "- Demographics:\n"
-            for key, value in demographics.items():
-                prompt_section += f"  * {key.capitalize()}: {value}\n"
+            parts.append("- Demographics:\n")
+            parts.extend(f"  * {key.capitalize()}: {value}\n" for key, value in demographics.items())
         
         # Add preferences if available
         preferences = processed_data['preferences']
         if preferences:
-            prompt_section += "- Preferences:\n"
-            for key, value in preferences.items():
-                if key != 'communication_style':  # Already included above
-                    prompt_section += f"  * {key.capitalize()}: {value}\n"
+            parts.append("- Preferences:\n")
+            parts.extend(f"  * {key.capitalize()}: {value}\n" for key, value in preferences.items()
+                         if key not in _PREFERENCE_PROMPT_SKIP)
         
         # Add goals if available
         goals = processed_data['goals']
         if goals:
-            prompt_section += "- Goals and Motivations:\n"
-            for key, value in goals.items():
-                prompt_section += f"  * {key.capitalize()}: {value}\n"
+            parts.append("- Goals and Motivations:\n")
+            parts.extend(f"  * {key.capitalize()}: {value}\n" for key, value in goals.items())
         
         # Add behavioral patterns if relevant
         behavioral = processed_data['behavioral']
         if behavioral:
-            prompt_section += "- Behavioral Patterns:\n"
-            for key, value in behavioral.items():
-                prompt_section += f"  * {key.capitalize()}: {value}\n"
+            parts.append("- Behavioral Patterns:\n")
+            parts.extend(f"  * {key.capitalize()}: {value}\n" for key, value in behavioral.items())
         
-        return prompt_section
+        return "".join(parts)
     
     def get_tailored_instructions(self, profile) -> str:
         """Generate tailored instructions based on profile"""
@@ -262,52 +523,17 @@ class SemanticProfileManager:
             return ""
         
         processed_data = self.process_profile_data(profile)
-        tech_level = processed_data['tech_level']
-        comm_style = processed_data['communication_style']
-        
-        instructions = "RESPONSE CUSTOMIZATION:\n"
-        
-        # Technical level instructions
-        instructions += "- Based on technical proficiency:\n"
-        if tech_level == "advanced":
-            instructions += "  * You can use technical terminology and provide detailed technical explanations\n"
-            instructions += "  * Focus on efficiency and advanced solutions\n"
-            instructions += "  * Assume familiarity with IT concepts and tools\n"
-        elif tech_level == "specialized":
-            instructions += "  * Use appropriate technical terminology for their domain\n"
-            instructions += "  * Provide specialized insights when relevant to their field\n"
-            instructions += "  * Balance technical detail with clear explanations\n"
-        elif tech_level == "intermediate":
-            instructions += "  * Balance technical details with clear explanations\n"
-            instructions += "  * Explain important concepts without oversimplifying\n"
-            instructions += "  * Provide context for technical terms\n"
-        elif tech_level == "basic":
-            instructions += "  * Avoid technical jargon and provide simple step-by-step instructions\n"
-            instructions += "  * Use analogies and examples to explain concepts\n"
-            instructions += "  * Focus on visual guidance and clear indicators of progress\n"
-        
-        # Communication style instructions
-        instructions += "- Based on communication preferences:\n"
-        if comm_style == "concise":
-            instructions += "  * Be brief and to the point\n"
-            instructions += "  * Prioritize actionable information\n"
-            instructions += "  * Use bullet points and short paragraphs\n"
-        elif comm_style == "detailed":
-            instructions += "  * Provide thorough explanations with appropriate details\n"
-            instructions += "  * Include contextual information and background\n"
-            instructions += "  * Explain the reasoning behind recommendations\n"
-        elif comm_style == "formal":
-            instructions += "  * Use formal, professional language and structure\n"
-            instructions += "  * Maintain a respectful and business-like tone\n"
-            instructions += "  * Avoid casual expressions and slang\n"
-        elif comm_style == "casual":
-            instructions += "  * Use a more conversational, approachable tone\n"
-            instructions += "  * Include friendly rapport-building elements\n"
-            instructions += "  * Balance warmth with professionalism\n"
-        elif comm_style == "simple":
-            instructions += "  * Use plain language and simple explanations\n"
-            instructions += "  * Avoid complex sentence structures\n"
-            instructions += "  * Focus on clarity above all\n"
+        return self._memoized_prompt("instructions", processed_data, self._build_tailored_instructions)
+    
+    def _build_tailored_instructions(self, processed_data) -> str:
+        """Render the tailored instructions from processed profile data"""
+        parts = [
+            "RESPONSE CUSTOMIZATION:\n",
+            "- Based on technical proficiency:\n",
+            TECH_BLOCKS.get(processed_data['tech_level'], ""),
+            "- Based on communication preferences:\n",
+            COMM_BLOCKS.get(processed_data['communication_style'], "")
+        ]
         
         # Add demographic-specific instructions
         demographics = processed_data['demographics']
@@ -315,15 +541,9 @@ class SemanticProfileManager:
             if 'age' in demographics:
                 age = demographics['age'].lower()
                 if "senior" in age or "65+" in age:
-                    instructions += "- Age considerations:\n"
-                    instructions += "  * Provide clearer visual instructions\n"
-                    instructions += "  * Allow more time for technical concepts\n"
-                    instructions += "  * Avoid assuming familiarity with newer technologies\n"
+                    parts.append(AGE_BLOCK)
             
             if 'language' in demographics and demographics['language'].lower() != "english":
-                instructions += "- Language considerations:\n"
-                instructions += "  * Use straightforward language\n"
-                instructions += "  * Avoid idioms and complex expressions\n"
-                instructions += "  * Use simple sentence structures\n"
+                parts.append(LANGUAGE_BLOCK)
         
-        return instructions
\ No newline at end of file
+        return "".join(parts)
\ No newline at end of file
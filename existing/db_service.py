@@ -2,38 +2,280 @@
 import logging
 import requests
 import os
+import asyncio
+import itertools
+import threading
+import time
+import uuid
+import orjson
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import MEAI_DB_SERVICE, DB_USERNAME, DB_PASSWORD, REDIS_URL, DB_TOKEN_TTL
+from .loop_local import get_loop_local, pop_loop_local
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
 
 logger = logging.getLogger('me_agent_orchestrator')
 
-# Global token cache
+# (connect, read) timeout in seconds for every DB service call
+DB_SERVICE_TIMEOUT = (3.05, 10)
+
+# orjson for DB service payloads: decode response bytes directly, send pre-serialized bodies
+_parse = orjson.loads
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Employee search results larger than this are streamed with ijson so matching can stop at the first exact match
+STREAM_EMPLOYEES_MIN_BYTES = 64 * 1024
+
+# Seconds the local employee index (used when /employees/search is unavailable) stays fresh
+EMPLOYEE_INDEX_TTL = 60
+
+# DB service endpoints, resolved once from config
+LOGIN_URL = f"{MEAI_DB_SERVICE}/login"
+EMPLOYEES_URL = f"{MEAI_DB_SERVICE}/employees"
+EMPLOYEE_SEARCH_URL = f"{MEAI_DB_SERVICE}/employees/search"
+EMPLOYEE_BATCH_SEARCH_URL = f"{MEAI_DB_SERVICE}/employees/batch_search"
+DEVICES_URL = f"{MEAI_DB_SERVICE}/devices"
+AGENTS_URL = f"{MEAI_DB_SERVICE}/agents"
+CONVERSATIONS_URL = f"{MEAI_DB_SERVICE}/conversations"
+CONVERSATIONS_BATCH_URL = f"{MEAI_DB_SERVICE}/conversations/batch"
+
+def _bearer_token(request):
+    """Token carried in a request's Authorization header, if any"""
+    auth = request.headers.get('Authorization', '')
+    return auth[len('Bearer '):] if auth.startswith('Bearer ') else None
+
+def _unauthorized_retry_hook(session, refresh_token):
+    """Response hook that refreshes an expired token and replays the request once"""
+    def hook(response, *args, **kwargs):
+        request = response.request
+        if (response.status_code != 401 or getattr(request, '_token_retried', False)
+                or request.url.endswith('/login')):
+            return response
+        token = refresh_token(_bearer_token(request))
+        if not token:
+            return response
+        retry = request.copy()
+        retry._token_retried = True
+        retry.headers['Authorization'] = f"Bearer {token}"
+        response.close()
+        return session.send(retry, **kwargs)
+    return hook
+
+def create_http_session(refresh_token=None):
+    """Create a requests session with a keep-alive connection pool and retries for the DB service"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=50,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if refresh_token is not None:
+        # refresh_token(stale_token) -> new token or None; called on a 401
+        session.hooks['response'].append(_unauthorized_retry_hook(session, refresh_token))
+    return session
+
+# Shared pooled session for all DB service calls (the lambda defers lookup until refresh is defined)
+_session = create_http_session(refresh_token=lambda stale: refresh_db_service_token(stale))
+
+# Global token cache, filled under _token_lock so concurrent callers log in once
 db_service_token = None
+_token_lock = threading.Lock()
+# Authorization header for the aiohttp session, rebuilt once per login
+_auth_headers = {}
+
+# Short-lived caches for the identity lookups repeated on every message; only hits are stored
+_employee_cache = TTLCache(maxsize=10000, ttl=300)
+# Device lists by employee ID, stored only after a successful fetch (an empty list included)
+_device_cache = TTLCache(maxsize=10000, ttl=300)
+_agent_cache = TTLCache(maxsize=256, ttl=60)
+_cache_lock = threading.Lock()
+
+# Async lookups currently in flight, by (event loop, cache key); concurrent misses share one request
+_inflight = {}
+
+def _employee_cache_key(contact_type, contact_value):
+    """Cache key for an employee lookup; emails match case-insensitively"""
+    return (contact_type, contact_value.lower() if contact_type == 'email' else contact_value)
+
+def _cache_get(cache, key):
+    """Thread-safe lookup in one of the TTL caches"""
+    with _cache_lock:
+        return cache.get(key)
+
+def _cache_put(cache, key, value):
+    """Store a successful lookup in a TTL cache and pass it through"""
+    if value is not None:
+        with _cache_lock:
+            cache[key] = value
+    return value
+
+async def _single_flight(key, fetch):
+    """Await the lookup already running for key on this loop, or start fetch() and share it"""
+    flight_key = (asyncio.get_running_loop(), key)
+    future = _inflight.get(flight_key)
+    if future is None:
+        future = asyncio.ensure_future(fetch())
+        _inflight[flight_key] = future
+        future.add_done_callback(lambda _: _inflight.pop(flight_key, None))
+    # Shielded so one cancelled caller does not cancel the lookup for everyone else
+    return await asyncio.shield(future)
+
+def invalidate(key=None):
+    """Drop one cached employee lookup, keyed (contact_type, contact_value), or every cached lookup when key is None"""
+    if key is not None:
+        invalidate_employee(*key)
+        return
+    with _cache_lock:
+        _employee_cache.clear()
+        _device_cache.clear()
+        _agent_cache.clear()
+
+def invalidate_employee(contact_type, contact_value):
+    """Drop the cached employee lookup for one email address or phone number, and its devices"""
+    key = _employee_cache_key(contact_type, contact_value)
+    with _cache_lock:
+        employee = _employee_cache.pop(key, None)
+        if employee:
+            _device_cache.pop(employee.get('employee_id'), None)
+
+def invalidate_agent(specialization):
+    """Drop the cached agent lookup for one specialization"""
+    with _cache_lock:
+        _agent_cache.pop(specialization, None)
+
+# Redis client shared by all workers for DB service tokens; stays None when REDIS_URL is unset
+_token_store = None
+
+def _get_token_store():
+    """Redis client for sharing DB service tokens across worker processes, or None when not configured"""
+    global _token_store
+    if _token_store is None and redis is not None and REDIS_URL:
+        _token_store = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    return _token_store
+
+# A login retries up to 3 times at DB_SERVICE_TIMEOUT each, so the login lock must outlive all of them
+DB_TOKEN_LOCK_TTL = 60
+# Seconds a worker waits for another worker's login before logging in itself; callers hold _token_lock meanwhile
+DB_TOKEN_WAIT = 1.0
+
+# Deletes the login lock only while it still holds this worker's value
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def shared_db_token(base_url, username, login, stale_token=None):
+    """Get a DB service token shared by every worker for (base_url, username).
+    Calls login() only when no valid token is stored; stale_token is never handed back."""
+    store = _get_token_store()
+    if store is None:
+        return login()
+    
+    key = f"meai:db_token:{username}@{base_url}"
+    lock_key = f"{key}:lock"
+    lock_value = uuid.uuid4().hex
+    try:
+        # One worker logs in while the others wait briefly for the token it stores
+        deadline = time.monotonic() + DB_TOKEN_WAIT
+        while True:
+            token = store.get(key)
+            if token and token != stale_token:
+                return token
+            
+            if store.set(lock_key, lock_value, nx=True, ex=DB_TOKEN_LOCK_TTL):
+                try:
+                    token = login()
+                    if token:
+                        store.setex(key, DB_TOKEN_TTL, token)
+                    return token
+                finally:
+                    # A failed release must not replace the token we just logged in for
+                    try:
+                        store.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, lock_value)
+                    except Exception as e:
+                        logger.error(f"Error releasing DB service login lock: {str(e)}")
+            
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        logger.warning("Timed out waiting for a shared DB service token, logging in directly")
+    except Exception as e:
+        logger.error(f"Token store unavailable, logging in directly: {str(e)}")
+    return login()
+
+def _use_db_service_token(token):
+    """Make token the module's current DB service token"""
+    global db_service_token
+    db_service_token = token
+    if token:
+        # Later calls pick the token up from the session headers
+        _session.headers['Authorization'] = _auth_headers['Authorization'] = f"Bearer {token}"
+    return token
 
 def get_db_service_token():
     """Get a token for communicating with the ME.ai DB Service"""
-    global db_service_token
-    
     # If we already have a token, return it
     if db_service_token:
         return db_service_token
     
+    with _token_lock:
+        # Another caller may have logged in while we waited for the lock
+        if db_service_token:
+            return db_service_token
+        return _use_db_service_token(shared_db_token(MEAI_DB_SERVICE, DB_USERNAME, _login_db_service))
+
+def refresh_db_service_token(stale_token=None):
+    """Log in again after a 401; callers racing on the same stale token share one login"""
+    global db_service_token
+    with _token_lock:
+        if stale_token is not None and db_service_token and db_service_token != stale_token:
+            return db_service_token
+        stale_token = stale_token or db_service_token
+        db_service_token = None
+        _session.headers.pop('Authorization', None)
+        _auth_headers.pop('Authorization', None)
+        return _use_db_service_token(
+            shared_db_token(MEAI_DB_SERVICE, DB_USERNAME, _login_db_service, stale_token=stale_token)
+        )
+
+def _login_db_service():
+    """Log in to the DB service and return the new token"""
     try:
-        # Use local development server
-        db_service_url = "http://127.0.0.1:5000/api"
-        
         # Login to DB service
-        response = requests.post(
-            f"{db_service_url}/login",
-            json={
-                "username": "testadmin", 
-                "password": "testpass"
-            }
+        response = _session.post(
+            LOGIN_URL,
+            data=orjson.dumps({
+                "username": DB_USERNAME, 
+                "password": DB_PASSWORD
+            }),
+            headers=JSON_HEADERS,
+            timeout=DB_SERVICE_TIMEOUT
         )
         
         if response.status_code == 200:
-            data = response.json()
-            db_service_token = data.get('token')
+            data = _parse(response.content)
             logger.info(f"Successfully obtained DB service token")
-            return db_service_token
+            return data.get('token')
         else:
             logger.error(f"Failed to get DB service token: {response.text}")
             return None
@@ -41,7 +283,242 @@ def get_db_service_token():
         logger.error(f"Error getting DB service token: {str(e)}")
         return None
 
+# Translate table that strips everything but digits and '+' from ASCII phone numbers
+_PHONE_KEEP = frozenset('0123456789+')
+_PHONE_DELETE = str.maketrans('', '', ''.join(chr(i) for i in range(128) if chr(i) not in _PHONE_KEEP))
+
+def normalize_phone(phone):
+    """Reduce a phone number to its digits and '+'"""
+    if phone.isascii():
+        return phone.translate(_PHONE_DELETE)
+    # Callers may send non-ASCII separators (no-break spaces, Unicode hyphens) the table does not cover
+    return ''.join(c for c in phone if c.isdigit() or c == '+')
+
+def _match_employee_by_phone(employees, contact_value):
+    """Pick the employee whose phone matches, preferring exact over partial matches"""
+    if isinstance(employees, list):
+        logger.info(f"Found {len(employees)} employees in database")
+    
+    # Better normalize phone for comparison (handle international formats)
+    normalized_search = normalize_phone(contact_value)
+    search_last_digits = normalized_search[-8:] if len(normalized_search) >= 8 else normalized_search
+    
+    # For international numbers that start with +, also try without the + as some systems strip it
+    alternative_search = normalized_search.replace('+', '') if normalized_search.startswith('+') else None
+    
+    # Single pass: return the first exact match, remembering the first partial match as a fallback
+    partial_match = None
+    for employee in employees:
+        phone = employee.get('phone')
+        if not phone:
+            continue
+        normalized_employee_phone = normalize_phone(phone)
+        if (normalized_employee_phone == normalized_search or 
+            (alternative_search and normalized_employee_phone.replace('+', '') == alternative_search)):
+            logger.info(f"Exact phone match for employee: {employee.get('name')}")
+            return employee
+        
+        # Partial match: number is contained or the last 8 digits match
+        if partial_match is None:
+            emp_last_digits = normalized_employee_phone[-8:] if len(normalized_employee_phone) >= 8 else normalized_employee_phone
+            if (normalized_search in normalized_employee_phone or 
+                normalized_employee_phone in normalized_search or
+                emp_last_digits == search_last_digits):
+                partial_match = employee
+    
+    if partial_match is not None:
+        logger.info(f"Partial phone match for employee: {partial_match.get('name')}")
+        return partial_match
+            
+    logger.warning(f"No employee found with phone: {contact_value}")
+    return None
+
+def _match_employee_by_email(employees, contact_value):
+    """Pick the employee whose email matches case-insensitively, preferring exact over partial matches"""
+    search_email = contact_value.lower()
+    
+    # Single pass: exact (case insensitive) match wins, else the first partial match
+    partial_match = None
+    for employee in employees:
+        email = employee.get('email')
+        if not email:
+            continue
+        email = email.lower()
+        if email == search_email:
+            logger.info(f"Exact email match for employee: {employee.get('name')}")
+            return employee
+        if partial_match is None and search_email in email:
+            partial_match = employee
+    
+    if partial_match is not None:
+        logger.info(f"Partial email match for employee: {partial_match.get('name')}")
+        return partial_match
+    
+    logger.warning(f"No employee found with email: {contact_value}")
+    return None
+
+def _select_agent(agents, specialization):
+    """Pick the first active agent with the specialization, else the first active agent"""
+    # Find first active agent with matching specialization
+    for agent in agents:
+        if agent.get('status') == 'Active' and agent.get('specialization') == specialization:
+            logger.info(f"Found agent for specialization {specialization}: {agent.get('agent_name')}")
+            return agent
+            
+    # If no exact match, return first active agent
+    for agent in agents:
+        if agent.get('status') == 'Active':
+            logger.info(f"No specialized agent found, using: {agent.get('agent_name')}")
+            return agent
+            
+    logger.warning(f"No active agent found")
+    return None
+
+def _employee_search_params(contact_type, contact_value):
+    """Query parameters for the indexed /employees/search endpoint"""
+    if contact_type == 'phone':
+        normalized = normalize_phone(contact_value)
+        # The DB matches on an indexed last-8-digit suffix column
+        return {"phone": normalized, "phone_suffix": normalized.replace('+', '')[-8:]}
+    return {"email": contact_value.lower()}
+
+# Cleared when the DB service answers 404 on /employees/search; re-probed whenever the local index expires
+_employee_search_available = True
+
+def _search_employees(contact_type, contact_value):
+    """Ask the DB service for matching employees, noting when the search endpoint is unavailable"""
+    global _employee_search_available
+    response = _session.get(
+        EMPLOYEE_SEARCH_URL,
+        params=_employee_search_params(contact_type, contact_value),
+        timeout=DB_SERVICE_TIMEOUT,
+        stream=ijson is not None
+    )
+    if response.status_code == 404:
+        logger.warning("Employee search endpoint unavailable, using the local employee index")
+        _employee_search_available = False
+        response.close()
+    return response
+
+def _employee_records(response):
+    """Employees from a response body, streamed one record at a time when the body is large"""
+    if ijson is not None and int(response.headers.get('Content-Length') or 0) > STREAM_EMPLOYEES_MIN_BYTES:
+        response.raw.decode_content = True
+        return ijson.items(response.raw, 'item', use_float=True)
+    return _parse(response.content)
+
+class _EmployeeIndex:
+    """Phone and email lookup dicts over the full employee list, rebuilt every EMPLOYEE_INDEX_TTL seconds"""
+    
+    def __init__(self, ttl=EMPLOYEE_INDEX_TTL):
+        self.ttl = ttl
+        self.expires = 0
+        self.employees = []
+        self.phones = []
+        self.by_phone = {}
+        self.by_bare_phone = {}
+        self.by_suffix = {}
+        self.by_email = {}
+        self.etag = None
+        self._lock = threading.Lock()
+    
+    def _refresh(self):
+        """Refetch all employees and rebuild the lookup dicts of (position, employee); first employee wins on duplicate keys"""
+        response = _session.get(
+            EMPLOYEES_URL,
+            headers={'If-None-Match': self.etag} if self.etag else None,
+            timeout=DB_SERVICE_TIMEOUT
+        )
+        if response.status_code == 304:
+            # Unchanged since the last build; keep the dicts and extend their lifetime
+            self.expires = time.monotonic() + self.ttl
+            return True
+        if response.status_code != 200:
+            logger.error(f"Error retrieving employees: {response.text}")
+            return False
+        # The index needs every record, so there is nothing to gain from streaming here
+        employees = _parse(response.content)
+        
+        phones = []
+        by_phone, by_bare_phone, by_suffix, by_email = {}, {}, {}, {}
+        for position, employee in enumerate(employees):
+            phone = employee.get('phone')
+            normalized = normalize_phone(phone) if phone else None
+            phones.append((normalized, employee))
+            if normalized:
+                by_phone.setdefault(normalized, (position, employee))
+                by_bare_phone.setdefault(normalized.replace('+', ''), (position, employee))
+                by_suffix.setdefault(normalized[-8:], (position, employee))
+            email = employee.get('email')
+            if email:
+                by_email.setdefault(email.lower(), (position, employee))
+        
+        # Swap in whole dicts so concurrent readers never see a half-built index
+        self.employees, self.phones = employees, phones
+        self.by_phone, self.by_bare_phone = by_phone, by_bare_phone
+        self.by_suffix, self.by_email = by_suffix, by_email
+        self.etag = response.headers.get('ETag')
+        self.expires = time.monotonic() + self.ttl
+        logger.info(f"Indexed {len(employees)} employees")
+        return True
+    
+    def find(self, contact_type, contact_value):
+        """Look up an employee by phone or email, refreshing the index when it has expired"""
+        global _employee_search_available
+        if time.monotonic() > self.expires:
+            with self._lock:
+                if time.monotonic() > self.expires:
+                    if not self._refresh() and not self.employees:
+                        return None
+                    # Give the search endpoint another chance on the next lookup
+                    _employee_search_available = True
+        
+        if contact_type == 'phone':
+            return self._find_by_phone(contact_value)
+        
+        match = self.by_email.get(contact_value.lower())
+        if match is not None:
+            logger.info(f"Exact email match for employee: {match[1].get('name')}")
+            return match[1]
+        return _match_employee_by_email(self.employees, contact_value)
+    
+    def _find_by_phone(self, contact_value):
+        """Same result as _match_employee_by_phone over the full list: first exact match, else first partial match"""
+        normalized_search = normalize_phone(contact_value)
+        matches = [self.by_phone.get(normalized_search)]
+        if normalized_search.startswith('+'):
+            matches.append(self.by_bare_phone.get(normalized_search.replace('+', '')))
+        matches = [match for match in matches if match is not None]
+        if matches:
+            employee = min(matches, key=lambda match: match[0])[1]
+            logger.info(f"Exact phone match for employee: {employee.get('name')}")
+            return employee
+        
+        # Containment matches cannot be indexed, so scan the cached phones up to the first suffix match
+        phones = self.phones
+        position, employee = self.by_suffix.get(normalized_search[-8:], (len(phones), None))
+        for phone, candidate in itertools.islice(phones, position):
+            if phone and (normalized_search in phone or phone in normalized_search):
+                employee = candidate
+                break
+        if employee is not None:
+            logger.info(f"Partial phone match for employee: {employee.get('name')}")
+            return employee
+        
+        logger.warning(f"No employee found with phone: {contact_value}")
+        return None
+
+_employee_index = _EmployeeIndex()
+
 def find_employee_by_contact(contact_type, contact_value):
+    """Find an employee by contact info, served from the TTL cache when possible"""
+    key = _employee_cache_key(contact_type, contact_value)
+    employee = _cache_get(_employee_cache, key)
+    if employee is not None:
+        return employee
+    return _cache_put(_employee_cache, key, _fetch_employee_by_contact(contact_type, contact_value))
+
+def _fetch_employee_by_contact(contact_type, contact_value):
     """Find an employee by contact info with enhanced phone and email matching"""
     token = get_db_service_token()
     if not token:
@@ -49,54 +526,21 @@ def find_employee_by_contact(contact_type, contact_value):
         return None
     
     try:
-        # Use local development server
-        db_service_url = "http://127.0.0.1:5000/api"
-        
         if contact_type == 'phone':
             # Log the phone number search attempt
             logger.info(f"Searching for employee with phone: {contact_value}")
             
-            # Better normalize phone for comparison (handle international formats)
-            normalized_search = ''.join(c for c in contact_value if c.isdigit() or c == '+')
-            
-            # For international numbers that start with +, also try without the + as some systems strip it
-            alternative_search = normalized_search.replace('+', '') if normalized_search.startswith('+') else None
-            
-            # Get all employees
-            response = requests.get(
-                f"{db_service_url}/employees",
-                headers={"Authorization": f"Bearer {token}"}
-            )
+            # Another thread may re-enable the search endpoint at any time, so the flag is read once
+            if not _employee_search_available:
+                return _employee_index.find(contact_type, contact_value)
+            response = _search_employees(contact_type, contact_value)
+            if response.status_code == 404:
+                return _employee_index.find(contact_type, contact_value)
             
             if response.status_code == 200:
-                employees = response.json()
-                logger.info(f"Found {len(employees)} employees in database")
-                
-                # First try exact match with both forms
-                for employee in employees:
-                    if employee.get('phone'):
-                        normalized_employee_phone = ''.join(c for c in employee.get('phone') if c.isdigit() or c == '+')
-                        if (normalized_employee_phone == normalized_search or 
-                            (alternative_search and normalized_employee_phone.replace('+', '') == alternative_search)):
-                            logger.info(f"Exact phone match for employee: {employee.get('name')}")
-                            return employee
-                
-                # Then try partial match (number is contained or last digits match)
-                for employee in employees:
-                    if employee.get('phone'):
-                        normalized_employee_phone = ''.join(c for c in employee.get('phone') if c.isdigit() or c == '+')
-                        # Compare last 8 digits if both numbers are long enough
-                        emp_last_digits = normalized_employee_phone[-8:] if len(normalized_employee_phone) >= 8 else normalized_employee_phone
-                        search_last_digits = normalized_search[-8:] if len(normalized_search) >= 8 else normalized_search
-                        
-                        if (normalized_search in normalized_employee_phone or 
-                            normalized_employee_phone in normalized_search or
-                            emp_last_digits == search_last_digits):
-                            logger.info(f"Partial phone match for employee: {employee.get('name')}")
-                            return employee
-                            
-                logger.warning(f"No employee found with phone: {contact_value}")
-                return None
+                # Closing the response releases the connection if matching stopped mid-stream
+                with response:
+                    return _match_employee_by_phone(_employee_records(response), contact_value)
             else:
                 logger.error(f"Error retrieving employees: {response.text}")
                 return None
@@ -105,28 +549,16 @@ def find_employee_by_contact(contact_type, contact_value):
             # Improved email matching - case insensitive and partial match
             logger.info(f"Searching for employee with email: {contact_value}")
             
-            # Get all employees and filter by email
-            response = requests.get(
-                f"{db_service_url}/employees",
-                headers={"Authorization": f"Bearer {token}"}
-            )
+            if not _employee_search_available:
+                return _employee_index.find(contact_type, contact_value)
+            response = _search_employees(contact_type, contact_value)
+            if response.status_code == 404:
+                return _employee_index.find(contact_type, contact_value)
             
             if response.status_code == 200:
-                employees = response.json()
-                
-                # First try exact match (case insensitive)
-                for employee in employees:
-                    if employee.get('email') and contact_value.lower() == employee.get('email').lower():
-                        logger.info(f"Exact email match for employee: {employee.get('name')}")
-                        return employee
-                
-                # Then try partial match
-                for employee in employees:
-                    if employee.get('email') and contact_value.lower() in employee.get('email').lower():
-                        logger.info(f"Partial email match for employee: {employee.get('name')}")
-                        return employee
-                
-                logger.warning(f"No employee found with email: {contact_value}")
+                # Closing the response releases the connection if matching stopped mid-stream
+                with response:
+                    return _match_employee_by_email(_employee_records(response), contact_value)
             else:
                 logger.error(f"Error retrieving employees: {response.text}")
             
@@ -134,13 +566,13 @@ def find_employee_by_contact(contact_type, contact_value):
             
         elif contact_type == 'id':
             # Get specific employee by ID
-            response = requests.get(
-                f"{db_service_url}/employees/{contact_value}",
-                headers={"Authorization": f"Bearer {token}"}
+            response = _session.get(
+                f"{EMPLOYEES_URL}/{contact_value}",
+                timeout=DB_SERVICE_TIMEOUT
             )
             
             if response.status_code == 200:
-                employee = response.json()
+                employee = _parse(response.content)
                 logger.info(f"Found employee by ID: {employee.get('name')}")
                 return employee
             else:
@@ -154,29 +586,99 @@ def find_employee_by_contact(contact_type, contact_value):
         logger.error(f"Error finding employee: {str(e)}")
         return None
 
+def find_employees_by_contacts(pairs):
+    """Find employees for many (contact_type, contact_value) pairs with one batch request.
+    Returns a dict keyed by contact value; values without a match map to None."""
+    results = {}
+    # Normalized value -> every submitted value that normalizes to it, so none of them is dropped
+    phones, emails = {}, {}
+    for contact_type, contact_value in pairs:
+        employee = _cache_get(_employee_cache, _employee_cache_key(contact_type, contact_value))
+        if employee is not None:
+            results[contact_value] = employee
+        elif contact_type == 'phone':
+            phones.setdefault(normalize_phone(contact_value), []).append(contact_value)
+            results[contact_value] = None
+        elif contact_type == 'email':
+            emails.setdefault(contact_value.lower(), []).append(contact_value)
+            results[contact_value] = None
+        else:
+            results[contact_value] = find_employee_by_contact(contact_type, contact_value)
+    
+    if not phones and not emails:
+        return results
+    
+    token = get_db_service_token()
+    if not token:
+        logger.error("Failed to get token for DB service")
+        return results
+    
+    try:
+        response = _session.post(
+            EMPLOYEE_BATCH_SEARCH_URL,
+            data=orjson.dumps({"phones": list(phones), "emails": list(emails)}),
+            headers=JSON_HEADERS,
+            timeout=DB_SERVICE_TIMEOUT
+        )
+        
+        if response.status_code == 404:
+            # Batch endpoint not deployed; look each contact up on its own
+            logger.warning("Employee batch search unavailable, looking up contacts individually")
+            for contact_values in phones.values():
+                for contact_value in contact_values:
+                    results[contact_value] = find_employee_by_contact('phone', contact_value)
+            for contact_values in emails.values():
+                for contact_value in contact_values:
+                    results[contact_value] = find_employee_by_contact('email', contact_value)
+            return results
+        
+        if response.status_code != 200:
+            logger.error(f"Error batch retrieving employees: {response.text}")
+            return results
+        
+        # Candidates come back keyed by the submitted (normalized) value
+        data = _parse(response.content)
+        phone_matches = data.get('phones', {})
+        for normalized, contact_values in phones.items():
+            for contact_value in contact_values:
+                employee = _match_employee_by_phone(phone_matches.get(normalized) or [], contact_value)
+                results[contact_value] = _cache_put(_employee_cache, _employee_cache_key('phone', contact_value), employee)
+        email_matches = data.get('emails', {})
+        for lowered, contact_values in emails.items():
+            for contact_value in contact_values:
+                employee = _match_employee_by_email(email_matches.get(lowered) or [], contact_value)
+                results[contact_value] = _cache_put(_employee_cache, _employee_cache_key('email', contact_value), employee)
+        
+        return results
+    except Exception as e:
+        logger.error(f"Error batch finding employees: {str(e)}")
+        return results
+
 def get_employee_devices(employee_info):
     """Get devices for an employee"""
+    employee_id = employee_info.get('employee_id') if employee_info else None
+    devices = _cache_get(_device_cache, employee_id) if employee_id else None
+    if devices is not None:
+        return devices
+    
     token = get_db_service_token()
     if not token:
         logger.error("Failed to get token for DB service")
         return []
     
     try:
-        # Use local development server
-        db_service_url = "http://127.0.0.1:5000/api"
-        
         # Get devices by employee ID
         if employee_info and employee_info.get('employee_id'):
-            response = requests.get(
-                f"{db_service_url}/devices",
-                headers={"Authorization": f"Bearer {token}"},
-                params={"employee_id": employee_info.get('employee_id')}
+            response = _session.get(
+                DEVICES_URL,
+                params={"employee_id": employee_info.get('employee_id')},
+                timeout=DB_SERVICE_TIMEOUT
             )
             
             if response.status_code == 200:
-                devices = response.json()
+                devices = _parse(response.content)
                 logger.info(f"Found {len(devices)} devices for employee {employee_info.get('name')}")
-                return devices
+                return _cache_put(_device_cache, employee_id, devices)
             else:
                 logger.error(f"Error retrieving devices: {response.text}")
                 return []
@@ -188,7 +690,41 @@ def get_employee_devices(employee_info):
         logger.error(f"Error getting employee devices: {str(e)}")
         return []
 
+# Last /agents payload as (etag, agents), revalidated with If-None-Match
+_agents_snapshot = None
+
+def _conditional_headers(snapshot):
+    """If-None-Match header for a cached (etag, payload) snapshot, if it has an ETag"""
+    return {'If-None-Match': snapshot[0]} if snapshot and snapshot[0] else None
+
+def _get_agents():
+    """Get all agents, reusing the cached list when the DB service answers 304 Not Modified"""
+    global _agents_snapshot
+    snapshot = _agents_snapshot
+    response = _session.get(
+        AGENTS_URL,
+        headers=_conditional_headers(snapshot),
+        timeout=DB_SERVICE_TIMEOUT
+    )
+    
+    if response.status_code == 304:
+        return snapshot[1]
+    if response.status_code != 200:
+        logger.error(f"Error retrieving agents: {response.text}")
+        return None
+    
+    agents = _parse(response.content)
+    _agents_snapshot = (response.headers.get('ETag'), agents)
+    return agents
+
 def find_agent_by_specialization(specialization):
+    """Find an agent with the given specialization, served from the TTL cache when possible"""
+    agent = _cache_get(_agent_cache, specialization)
+    if agent is not None:
+        return agent
+    return _cache_put(_agent_cache, specialization, _fetch_agent_by_specialization(specialization))
+
+def _fetch_agent_by_specialization(specialization):
     """Find an agent with the given specialization"""
     token = get_db_service_token()
     if not token:
@@ -196,35 +732,8 @@ def find_agent_by_specialization(specialization):
         return None
         
     try:
-        # Use local development server
-        db_service_url = "http://127.0.0.1:5000/api"
-        
-        # Get all agents
-        response = requests.get(
-            f"{db_service_url}/agents",
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        
-        if response.status_code != 200:
-            logger.error(f"Error retrieving agents: {response.text}")
-            return None
-            
-        agents = response.json()
-        
-        # Find first active agent with matching specialization
-        for agent in agents:
-            if agent.get('status') == 'Active' and agent.get('specialization') == specialization:
-                logger.info(f"Found agent for specialization {specialization}: {agent.get('agent_name')}")
-                return agent
-                
-        # If no exact match, return first active agent
-        for agent in agents:
-            if agent.get('status') == 'Active':
-                logger.info(f"No specialized agent found, using: {agent.get('agent_name')}")
-                return agent
-                
-        logger.warning(f"No active agent found")
-        return None
+        agents = _get_agents()
+        return _select_agent(agents, specialization) if agents is not None else None
     except Exception as e:
         logger.error(f"Error finding agent: {str(e)}")
         return None
@@ -237,9 +746,6 @@ def log_conversation_to_db(conversation_id, user_id, agent_id, message_text, mes
         return None
         
     try:
-        # Use local development server
-        db_service_url = "http://127.0.0.1:5000/api"
-        
         conversation_data = {
             "user_id": user_id,
             "agent_id": agent_id,
@@ -248,57 +754,300 @@ def log_conversation_to_db(conversation_id, user_id, agent_id, message_text, mes
             "issue_status": issue_status
         }
         
-        response = requests.post(
-            f"{db_service_url}/conversations",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json"
-            },
-            json=conversation_data
+        response = _session.post(
+            CONVERSATIONS_URL,
+            data=orjson.dumps(conversation_data),
+            headers=JSON_HEADERS,
+            timeout=DB_SERVICE_TIMEOUT
         )
         
         if response.status_code == 201:
             logger.info(f"Successfully logged conversation message")
-            return response.json()
+            return _parse(response.content)
         else:
             logger.error(f"Failed to log conversation: {response.text}")
             return None
     except Exception as e:
         logger.error(f"Error logging conversation: {str(e)}")
         return None
+
+# Cleared once the DB service answers 404 for the conversation batch endpoint
+_conversation_batch_available = True
+
+def log_conversations_batch(records):
+    """Log many conversation messages with one request. Each record holds log_conversation_to_db's
+    arguments; falls back to one request per message when the batch endpoint is not deployed."""
+    global _conversation_batch_available
+    if not records:
+        return []
+    
+    if _conversation_batch_available:
+        token = get_db_service_token()
+        if not token:
+            logger.error("Failed to get token for conversation logging")
+            return None
         
-# Add this function to your db_service.py file
+        try:
+            response = _session.post(
+                CONVERSATIONS_BATCH_URL,
+                data=orjson.dumps({"messages": records}),
+                headers=JSON_HEADERS,
+                timeout=DB_SERVICE_TIMEOUT
+            )
+            
+            if response.status_code == 201:
+                logger.info(f"Successfully logged {len(records)} conversation messages")
+                return _parse(response.content)
+            if response.status_code != 404:
+                logger.error(f"Failed to log conversation batch: {response.text}")
+                return None
+            logger.warning("Conversation batch endpoint unavailable, logging messages individually")
+            _conversation_batch_available = False
+        except Exception as e:
+            logger.error(f"Error logging conversation batch: {str(e)}")
+            return None
+    
+    return [log_conversation_to_db(**record) for record in records]
 
-def get_employee_devices(employee_info):
-    """Get devices for an employee"""
-    token = get_db_service_token()
+def _new_async_session():
+    """Pooled aiohttp session for async DB service calls"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, limit_per_host=64, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(connect=DB_SERVICE_TIMEOUT[0], sock_read=DB_SERVICE_TIMEOUT[1]),
+        json_serialize=lambda obj: orjson.dumps(obj).decode()
+    )
+
+def get_async_session():
+    """Get the running loop's shared aiohttp session for async DB service calls, created on first use"""
+    # A session is bound to the loop that created it, so each loop (e.g. each asyncio.run) gets its own
+    session = get_loop_local("db_session", _new_async_session)
+    if session.closed:
+        pop_loop_local("db_session")
+        session = get_loop_local("db_session", _new_async_session)
+    return session
+
+async def close_async_session():
+    """Close the running loop's aiohttp session, e.g. on application shutdown"""
+    session = pop_loop_local("db_session")
+    if session is not None and not session.closed:
+        await session.close()
+
+async def awarm_db_service():
+    """Log in and open the shared aiohttp session ahead of the first request; returns the token or None"""
+    try:
+        if aiohttp is not None:
+            get_async_session()
+        return await aget_db_service_token()
+    except Exception as e:
+        logger.error(f"Error warming up DB service connection: {str(e)}")
+        return None
+
+async def aget_db_service_token():
+    """Async variant of get_db_service_token; logs in off-loop under the shared token lock"""
+    if db_service_token:
+        return db_service_token
+    return await asyncio.to_thread(get_db_service_token)
+
+async def _arequest(method, url, params=None, json=None, headers=None):
+    """Send a DB service request on the shared aiohttp session, re-logging in once on a 401.
+    Returns (status, body, response headers) where body is parsed JSON on success and text otherwise.
+    Requires aiohttp; callers fall back to the blocking functions via asyncio.to_thread when it is missing."""
+    for attempt in range(2):
+        token = db_service_token
+        async with get_async_session().request(
+            method,
+            url,
+            params=params,
+            json=json,
+            headers={**_auth_headers, **headers} if headers else _auth_headers
+        ) as response:
+            if response.status != 401 or attempt:
+                if 200 <= response.status < 300:
+                    return response.status, await response.json(loads=_parse), response.headers
+                return response.status, await response.text(), response.headers
+        if not await asyncio.to_thread(refresh_db_service_token, token):
+            return 401, "Unable to refresh DB service token", {}
+
+async def _aget_json(url, error_message, params=None):
+    """GET a DB service URL and return (ok, parsed JSON body)"""
+    status, body, _ = await _arequest("GET", url, params=params)
+    if status == 200:
+        return True, body
+    logger.error(f"{error_message}: {body}")
+    return False, None
+
+async def _asearch_employees(contact_type, contact_value):
+    """Async variant of _search_employees returning (status, employees)"""
+    global _employee_search_available
+    status, body, _ = await _arequest("GET", EMPLOYEE_SEARCH_URL, params=_employee_search_params(contact_type, contact_value))
+    if status == 200:
+        return status, body
+    if status == 404:
+        logger.warning("Employee search endpoint unavailable, using the local employee index")
+        _employee_search_available = False
+    else:
+        logger.error(f"Error retrieving employees: {body}")
+    return status, None
+
+async def afind_employee_by_contact(contact_type, contact_value):
+    """Async variant of find_employee_by_contact, safe to run under asyncio.gather"""
+    key = _employee_cache_key(contact_type, contact_value)
+    employee = _cache_get(_employee_cache, key)
+    if employee is not None:
+        return employee
+    return await _single_flight(('employee', key), lambda: _afetch_cached_employee(key, contact_type, contact_value))
+
+async def _afetch_cached_employee(key, contact_type, contact_value):
+    """Fetch an employee and store a hit under key"""
+    return _cache_put(_employee_cache, key, await _afetch_employee_by_contact(contact_type, contact_value))
+
+async def _afetch_employee_by_contact(contact_type, contact_value):
+    """Uncached async employee lookup"""
+    if aiohttp is None:
+        return await asyncio.to_thread(_fetch_employee_by_contact, contact_type, contact_value)
+    
+    token = await aget_db_service_token()
     if not token:
         logger.error("Failed to get token for DB service")
-        return []
+        return None
     
     try:
-        # Use local development server
-        db_service_url = "http://127.0.0.1:5000/api"
+        if contact_type == 'phone':
+            logger.info(f"Searching for employee with phone: {contact_value}")
+            if not _employee_search_available:
+                return await asyncio.to_thread(_employee_index.find, contact_type, contact_value)
+            status, employees = await _asearch_employees(contact_type, contact_value)
+            if status == 404:
+                return await asyncio.to_thread(_employee_index.find, contact_type, contact_value)
+            return _match_employee_by_phone(employees, contact_value) if status == 200 else None
         
-        # Get devices by employee ID
+        elif contact_type == 'email':
+            logger.info(f"Searching for employee with email: {contact_value}")
+            if not _employee_search_available:
+                return await asyncio.to_thread(_employee_index.find, contact_type, contact_value)
+            status, employees = await _asearch_employees(contact_type, contact_value)
+            if status == 404:
+                return await asyncio.to_thread(_employee_index.find, contact_type, contact_value)
+            return _match_employee_by_email(employees, contact_value) if status == 200 else None
+            
+        elif contact_type == 'id':
+            ok, employee = await _aget_json(f"{EMPLOYEES_URL}/{contact_value}", "Error retrieving employee by ID")
+            if ok:
+                logger.info(f"Found employee by ID: {employee.get('name')}")
+                return employee
+            return None
+        else:
+            logger.error(f"Unsupported contact type: {contact_type}")
+            return None
+            
+    except Exception as e:
+        logger.error(f"Error finding employee: {str(e)}")
+        return None
+
+async def aget_employee_devices(employee_info):
+    """Async variant of get_employee_devices"""
+    employee_id = employee_info.get('employee_id') if employee_info else None
+    devices = _cache_get(_device_cache, employee_id) if employee_id else None
+    if devices is not None:
+        return devices
+    if employee_id:
+        return await _single_flight(('devices', employee_id), lambda: _afetch_employee_devices(employee_info))
+    return await _afetch_employee_devices(employee_info)
+
+async def _afetch_employee_devices(employee_info):
+    """Uncached async device lookup; successful results are cached"""
+    if aiohttp is None:
+        return await asyncio.to_thread(get_employee_devices, employee_info)
+    
+    token = await aget_db_service_token()
+    if not token:
+        logger.error("Failed to get token for DB service")
+        return []
+    
+    try:
         if employee_info and employee_info.get('employee_id'):
-            response = requests.get(
-                f"{db_service_url}/devices",
-                headers={"Authorization": f"Bearer {token}"},
+            ok, devices = await _aget_json(
+                DEVICES_URL,
+                "Error retrieving devices",
                 params={"employee_id": employee_info.get('employee_id')}
             )
-            
-            if response.status_code == 200:
-                devices = response.json()
+            if ok:
                 logger.info(f"Found {len(devices)} devices for employee {employee_info.get('name')}")
-                return devices
-            else:
-                logger.error(f"Error retrieving devices: {response.text}")
-                return []
+                return _cache_put(_device_cache, employee_info.get('employee_id'), devices)
+            return []
         else:
             logger.warning("No employee ID provided to fetch devices")
             return []
             
     except Exception as e:
         logger.error(f"Error getting employee devices: {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+async def _aget_agents():
+    """Async variant of _get_agents"""
+    global _agents_snapshot
+    snapshot = _agents_snapshot
+    status, body, headers = await _arequest("GET", AGENTS_URL, headers=_conditional_headers(snapshot))
+    if status == 304:
+        return snapshot[1]
+    if status != 200:
+        logger.error(f"Error retrieving agents: {body}")
+        return None
+    _agents_snapshot = (headers.get('ETag'), body)
+    return body
+
+async def afind_agent_by_specialization(specialization):
+    """Async variant of find_agent_by_specialization"""
+    agent = _cache_get(_agent_cache, specialization)
+    if agent is not None:
+        return agent
+    return _cache_put(_agent_cache, specialization, await _afetch_agent_by_specialization(specialization))
+
+async def _afetch_agent_by_specialization(specialization):
+    """Uncached async agent lookup"""
+    if aiohttp is None:
+        return await asyncio.to_thread(_fetch_agent_by_specialization, specialization)
+    
+    token = await aget_db_service_token()
+    if not token:
+        logger.error("Failed to get token for DB service")
+        return None
+        
+    try:
+        agents = await _aget_agents()
+        return _select_agent(agents, specialization) if agents is not None else None
+    except Exception as e:
+        logger.error(f"Error finding agent: {str(e)}")
+        return None
+
+async def alog_conversation_to_db(conversation_id, user_id, agent_id, message_text, message_type, issue_status):
+    """Async variant of log_conversation_to_db"""
+    if aiohttp is None:
+        return await asyncio.to_thread(
+            log_conversation_to_db, conversation_id, user_id, agent_id, message_text, message_type, issue_status
+        )
+    
+    token = await aget_db_service_token()
+    if not token:
+        logger.error("Failed to get token for conversation logging")
+        return None
+        
+    try:
+        conversation_data = {
+            "user_id": user_id,
+            "agent_id": agent_id,
+            "message_text": message_text,
+            "message_type": message_type,
+            "issue_status": issue_status
+        }
+        
+        status, body, _ = await _arequest("POST", CONVERSATIONS_URL, json=conversation_data)
+        if status == 201:
+            logger.info(f"Successfully logged conversation message")
+            return body
+        else:
+            logger.error(f"Failed to log conversation: {body}")
+            return None
+    except Exception as e:
+        logger.error(f"Error logging conversation: {str(e)}")
+        return None
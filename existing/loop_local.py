@@ -0,0 +1,25 @@
+# loop_local.py
+import asyncio
+import threading
+
+# Objects bound to one event loop (aiohttp sessions, semaphores, locks), by loop and then by name
+_loop_objects = {}
+_loop_objects_lock = threading.Lock()
+
+def get_loop_local(name, factory):
+    """Return the running loop's object for name, creating it with factory() on first use"""
+    loop = asyncio.get_running_loop()
+    with _loop_objects_lock:
+        # Forget objects left behind by loops that have since closed, e.g. an earlier asyncio.run
+        for stale in [other for other in _loop_objects if other.is_closed()]:
+            del _loop_objects[stale]
+        objects = _loop_objects.setdefault(loop, {})
+        obj = objects.get(name)
+        if obj is None:
+            obj = objects[name] = factory()
+        return obj
+
+def pop_loop_local(name):
+    """Forget the running loop's object for name and return it, or None if there is none"""
+    with _loop_objects_lock:
+        return _loop_objects.get(asyncio.get_running_loop(), {}).pop(name, None)
@@ -1,68 +1,179 @@
 # response_generator.py
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import json
 import datetime
+import asyncio
+import re
+import functools
+import itertools
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+from config import MEAI_MAX_CONCURRENT, MEAI_RPM, MEAI_TPM
+from .loop_local import get_loop_local, pop_loop_local
 
 logger = logging.getLogger('me_agent_orchestrator')
 
+# Messages treated as a bare greeting rather than an issue description
+_GREETINGS = frozenset(('hi', 'hello', 'hey', 'hi there', 'hello there', 'greetings'))
+
+# Keyword lists for issue classification (already lowercase)
+_HARDWARE_KEYWORDS = (
+    'device', 'computer', 'laptop', 'desktop', 'slow', 'broken', 
+    'screen', 'keyboard', 'mouse', 'printer', 'hardware', 'wifi',
+    'network', 'internet', 'connection', 'battery', 'power', 'crash',
+    'frozen', 'blue screen', 'bsod', 'restart', 'boot', 'monitor',
+    'display', 'black screen', 'webcam', 'camera', 'microphone', 'audio',
+    'sound', 'speaker', 'usb', 'drive', 'disk', 'storage'
+)
+
+_PASSWORD_KEYWORDS = (
+    'password', 'login', 'forgot', 'reset', 'locked', 'account',
+    'access', 'credentials', "can't log in", 'authentication',
+    'username', 'locked out', 'security', 'signin', 'sign in',
+    'log in', 'cannot access', 'password expired', 'change password',
+    'identity', 'verification', 'two-factor', '2fa', 'mfa'
+)
+
+_SOFTWARE_KEYWORDS = (
+    'software', 'application', 'app', 'program', 'install',
+    'update', 'upgrade', 'microsoft', 'office', 'excel', 'word',
+    'outlook', 'email', 'browser', 'chrome', 'edge', 'firefox',
+    'safari', 'teams', 'slack', 'zoom', 'license', 'activation',
+    'windows', 'macos', 'os', 'operating system', 'error message'
+)
+
+_ISSUE_KEYWORDS = (
+    ("Hardware", _HARDWARE_KEYWORDS),
+    ("Password", _PASSWORD_KEYWORDS),
+    ("Software", _SOFTWARE_KEYWORDS)
+)
+
+# Keywords only match at the start of a word, so 'word' no longer hits "password"
+# or 'os' "lost", while inflections such as "crashing" or "updates" still count
+_KEYWORD_CATEGORY = {keyword: category for category, keywords in _ISSUE_KEYWORDS for keyword in keywords}
+_WORD_CHAR_RE = re.compile(r"\w")
+
+# Zero-width lookahead so overlapping keywords are all visited; longest alternative first
+_KEYWORD_RE = re.compile(
+    r"(?=\b(" + "|".join(map(re.escape, sorted(_KEYWORD_CATEGORY, key=len, reverse=True))) + r"))"
+)
+
+# Every keyword implied by a match, including shorter ones it contains (e.g. 'screen' in 'blue screen')
+_KEYWORDS_WITHIN = {
+    keyword: tuple(other for other in _KEYWORD_CATEGORY if re.search(r"\b" + re.escape(other), keyword))
+    for keyword in _KEYWORD_CATEGORY
+}
+
+# Long messages (pasted logs, stack traces) prefilter keywords with plain substring search,
+# which skips through text far faster than trying the alternation at every position
+LONG_MESSAGE_LENGTH = 256
+_KEYWORD_START_RES = {keyword: re.compile(r"\b" + re.escape(keyword)) for keyword in _KEYWORD_CATEGORY}
+
+def _build_keyword_automaton():
+    """Build one Aho-Corasick automaton mapping every keyword to itself"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in _KEYWORD_CATEGORY:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+_keyword_automaton = _build_keyword_automaton()
+
+def _iter_matched_keywords(message_lower):
+    """Yield keywords that start a word in the lowercased message, possibly more than once"""
+    if _keyword_automaton is not None:
+        for end, keyword in _keyword_automaton.iter(message_lower):
+            if end < len(keyword) or not _WORD_CHAR_RE.match(message_lower, end - len(keyword)):
+                yield keyword
+    elif len(message_lower) > LONG_MESSAGE_LENGTH:
+        for keyword, keyword_re in _KEYWORD_START_RES.items():
+            if keyword in message_lower and keyword_re.search(message_lower):
+                yield keyword
+    else:
+        for match in _KEYWORD_RE.finditer(message_lower):
+            yield from _KEYWORDS_WITHIN[match.group(1)]
+
+# Keywords are counted in the order their first occurrence ends in the text, and once a category
+# reaches this many distinct keywords the rest of the message is skipped; messages up to
+# EARLY_EXIT_MIN_LENGTH are always scored in full. Every backend applies the same rule, so the
+# result does not depend on whether pyahocorasick is installed
+CONFIDENT_KEYWORD_MATCHES = 3
+EARLY_EXIT_MIN_LENGTH = 64
+
+def _iter_keywords_in_text_order(message_lower):
+    """Yield each matched keyword once, ordered by where its first occurrence ends"""
+    if _keyword_automaton is not None:
+        # The automaton already reports matches by end position
+        seen = set()
+        for keyword in _iter_matched_keywords(message_lower):
+            if keyword not in seen:
+                seen.add(keyword)
+                yield keyword
+        return
+    # Keywords sharing an end position belong to the same category, so their relative order is irrelevant
+    first_ends = sorted(
+        (_KEYWORD_START_RES[keyword].search(message_lower).end(), keyword)
+        for keyword in set(_iter_matched_keywords(message_lower))
+    )
+    for _, keyword in first_ends:
+        yield keyword
+
+def _count_issue_keywords(message_lower):
+    """Count the distinct keywords of each category that occur in the lowercased message"""
+    counts = {category: 0 for category, _ in _ISSUE_KEYWORDS}
+    if len(message_lower) <= EARLY_EXIT_MIN_LENGTH:
+        for keyword in set(_iter_matched_keywords(message_lower)):
+            counts[_KEYWORD_CATEGORY[keyword]] += 1
+        return counts
+    
+    for keyword in _iter_keywords_in_text_order(message_lower):
+        category = _KEYWORD_CATEGORY[keyword]
+        counts[category] += 1
+        if counts[category] >= CONFIDENT_KEYWORD_MATCHES:
+            break
+    return counts
+
+# Messages longer than this are classified without being memoized
+CLASSIFY_CACHE_MAX_LENGTH = 512
+
 def classify_issue(message):
     """Classify issue type based on message content with improved detection"""
-    # Enhanced keyword lists for better classification
-    hardware_keywords = [
-        'device', 'computer', 'laptop', 'desktop', 'slow', 'broken', 
-        'screen', 'keyboard', 'mouse', 'printer', 'hardware', 'wifi',
-        'network', 'internet', 'connection', 'battery', 'power', 'crash',
-        'frozen', 'blue screen', 'bsod', 'restart', 'boot', 'monitor',
-        'display', 'black screen', 'webcam', 'camera', 'microphone', 'audio',
-        'sound', 'speaker', 'usb', 'drive', 'disk', 'storage'
-    ]
-                     
-    password_keywords = [
-        'password', 'login', 'forgot', 'reset', 'locked', 'account',
-        'access', 'credentials', "can't log in", 'authentication',
-        'username', 'locked out', 'security', 'signin', 'sign in',
-        'log in', 'cannot access', 'password expired', 'change password',
-        'identity', 'verification', 'two-factor', '2fa', 'mfa'
-    ]
-    
-    software_keywords = [
-        'software', 'application', 'app', 'program', 'install',
-        'update', 'upgrade', 'microsoft', 'office', 'excel', 'word',
-        'outlook', 'email', 'browser', 'chrome', 'edge', 'firefox',
-        'safari', 'teams', 'slack', 'zoom', 'license', 'activation',
-        'windows', 'macos', 'os', 'operating system', 'error message'
-    ]
-    
+    message_lower = message.strip().lower()
+    if len(message_lower) > CLASSIFY_CACHE_MAX_LENGTH:
+        return _classify_message(message_lower)
+    return _classify_message_cached(message_lower)
+
+def _classify_message(message_lower):
+    """Classify a stripped, lowercased message"""
     # If the message is too short or vague, default to a generic welcome without classification
-    if len(message.strip()) < 10 or message.lower() in ['hi', 'hello', 'hey', 'hi there', 'hello there', 'greetings']:
+    if len(message_lower) < 10 or message_lower in _GREETINGS:
         return "General"
     
-    # Count keyword matches with word boundary checks for better accuracy
-    hardware_count = 0
-    password_count = 0
-    software_count = 0
-    
-    message_lower = message.lower()
-    
-    for word in hardware_keywords:
-        if word.lower() in message_lower:
-            hardware_count += 1
-    
-    for word in password_keywords:
-        if word.lower() in message_lower:
-            password_count += 1
-            
-    for word in software_keywords:
-        if word.lower() in message_lower:
-            software_count += 1
+    # Count keyword matches
+    counts = _count_issue_keywords(message_lower)
+    hardware_count = counts["Hardware"]
+    password_count = counts["Password"]
+    software_count = counts["Software"]
     
     # Apply weights to categories
     password_count *= 1.2  # Give priority to password issues
     
-    # Add logging for debugging
-    logger.info(f"Issue classification scores - Hardware: {hardware_count}, Password: {password_count}, Software: {software_count}")
+    # Add logging for debugging (only on cache misses)
+    logger.debug(f"Issue classification scores - Hardware: {hardware_count}, Password: {password_count}, Software: {software_count}")
     
     # Return the category with more matches
     if password_count > hardware_count and password_count > software_count:
@@ -75,26 +186,26 @@ def classify_issue(message):
         # Default to General if no clear match
         return "General"
 
-def get_agent_prompt(issue_type, employee_info, issue_description):
-    """Generate a prompt for the AI model based on issue type with enhanced prompting"""
-    # Ensure employee_info is a dictionary even if None was passed
-    if employee_info is None:
-        employee_info = {}
-    
-    # Get current time for time-appropriate greetings
-    current_hour = datetime.datetime.now().hour
-    time_greeting = "Good morning" if 5 <= current_hour < 12 else "Good afternoon" if 12 <= current_hour < 18 else "Good evening"
-    
-    # Common instructions for all agent types
-    common_instructions = f"""
-You are ME.ai Assistant, an AI helper for enterprise IT support. {time_greeting}!
+# Classification is a pure function of the normalized text, and chat openers repeat a lot
+_classify_message_cached = functools.lru_cache(maxsize=4096)(_classify_message)
 
-USER INFORMATION:
-Name: {employee_info.get('name', 'Anonymous User')}
-Department: {employee_info.get('department', 'Unknown Department')}
-Role: {employee_info.get('role', 'Employee')}
+# Time-of-day greeting, recomputed at most once a minute
+_greeting_cache = {"ts": 0.0, "val": ""}
 
-The user has contacted IT support regarding: "{issue_description}"
+def _time_greeting():
+    """Return the greeting for the current hour, cached for up to 60 seconds"""
+    now = time.monotonic()
+    if not _greeting_cache["val"] or now - _greeting_cache["ts"] > 60:
+        current_hour = datetime.datetime.now().hour
+        _greeting_cache["val"] = "Good morning" if 5 <= current_hour < 12 else "Good afternoon" if 12 <= current_hour < 18 else "Good evening"
+        _greeting_cache["ts"] = now
+    return _greeting_cache["val"]
+
+# Prompt templates per issue type, filled in with str.format_map on each call.
+# Everything that varies per user or per call sits in the trailing context block, so each
+# agent type's instructions form an identical prefix the provider can cache across requests.
+_COMMON_PROMPT_TEMPLATE = """
+You are ME.ai Assistant, an AI helper for enterprise IT support.
 
 YOUR BEHAVIOR GUIDELINES:
 - Be friendly, professional, and empathetic in your responses
@@ -106,8 +217,7 @@ YOUR BEHAVIOR GUIDELINES:
 - Address the user by their first name if available
 """
 
-    if issue_type == "Hardware":
-        return f"""{common_instructions}
+_HARDWARE_PROMPT_TEMPLATE = _COMMON_PROMPT_TEMPLATE + """
 
 YOU ARE: ME.ai TechBot, specializing in hardware and technical support.
 
@@ -123,8 +233,7 @@ ADDITIONAL INSTRUCTIONS:
 - Offer step-by-step instructions with clear indicators of progress
 """
 
-    elif issue_type == "Password":
-        return f"""{common_instructions}
+_PASSWORD_PROMPT_TEMPLATE = _COMMON_PROMPT_TEMPLATE + """
 
 YOU ARE: ME.ai SecurityBot, specializing in password and account issues.
 
@@ -141,8 +250,7 @@ ADDITIONAL INSTRUCTIONS:
 - Be extra clear about security protocols and why they exist
 """
 
-    elif issue_type == "Software":
-        return f"""{common_instructions}
+_SOFTWARE_PROMPT_TEMPLATE = _COMMON_PROMPT_TEMPLATE + """
 
 YOU ARE: ME.ai SoftwareBot, specializing in software and application issues.
 
@@ -159,8 +267,7 @@ ADDITIONAL INSTRUCTIONS:
 - For licensing issues, be clear about company policies and procedures
 """
 
-    else:  # General or default case
-        return f"""{common_instructions}
+_GENERAL_PROMPT_TEMPLATE = _COMMON_PROMPT_TEMPLATE + """
 
 YOU ARE: ME.ai Assistant, a general IT support assistant.
 
@@ -177,88 +284,322 @@ ADDITIONAL INSTRUCTIONS:
 - Check if there are any urgent aspects to their request
 """
 
-def generate_ai_response(prompt, user_message, session, api_key, api_url):
+_CONTEXT_PROMPT_TEMPLATE = """
+USER INFORMATION:
+Greeting for this time of day: {time_greeting}
+Name: {name}
+Department: {department}
+Role: {role}
+
+The user has contacted IT support regarding: "{issue_description}"
+"""
+
+_AGENT_PROMPT_TEMPLATES = {
+    "Hardware": _HARDWARE_PROMPT_TEMPLATE + _CONTEXT_PROMPT_TEMPLATE,
+    "Password": _PASSWORD_PROMPT_TEMPLATE + _CONTEXT_PROMPT_TEMPLATE,
+    "Software": _SOFTWARE_PROMPT_TEMPLATE + _CONTEXT_PROMPT_TEMPLATE,
+    "General": _GENERAL_PROMPT_TEMPLATE + _CONTEXT_PROMPT_TEMPLATE
+}
+
+def get_agent_prompt(issue_type, employee_info, issue_description):
+    """Generate a prompt for the AI model based on issue type with enhanced prompting"""
+    # Ensure employee_info is a dictionary even if None was passed
+    if employee_info is None:
+        employee_info = {}
+    
+    template = _AGENT_PROMPT_TEMPLATES.get(issue_type, _AGENT_PROMPT_TEMPLATES["General"])
+    return template.format_map({
+        # Get current time for time-appropriate greetings
+        "time_greeting": _time_greeting(),
+        "name": employee_info.get('name', 'Anonymous User'),
+        "department": employee_info.get('department', 'Unknown Department'),
+        "role": employee_info.get('role', 'Employee'),
+        "issue_description": issue_description
+    })
+
+# Seconds to wait for the AI API before falling back
+AI_API_TIMEOUT = 30
+
+# Session message roles forwarded to the AI as conversation history
+_HISTORY_ROLES = frozenset(('user', 'assistant'))
+
+@functools.lru_cache(maxsize=4)
+def _ai_headers(api_key):
+    """Request headers for an API key, built once and shared; callers must not mutate them"""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+def _build_ai_request(prompt, user_message, session, api_key):
+    """Build the headers and chat payload for the AI API from the Session's history"""
+    headers = _ai_headers(api_key)
+    
+    # Build conversation history from session: the last 10 entries, oldest first,
+    # read from the end of the deque without copying the rest of it
+    recent_messages = list(itertools.islice(reversed(session.messages), 10))
+    recent_messages.reverse()
+    # Filter out system messages and take the last 6
+    history_messages = [msg for msg in recent_messages if msg.get('role') in _HISTORY_ROLES][-6:]
+    messages = [{"role": "system", "content": prompt}, *history_messages]
+    
+    # Add current user message if not already in session
+    if not session.messages or session.messages[-1]['role'] != 'user' or session.messages[-1]['content'] != user_message:
+        messages.append({"role": "user", "content": user_message})
+    
+    payload = {
+        "model": "deepseek-chat",
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": 1000
+    }
+    
+    logger.info(f"Sending request to AI API for issue: {user_message[:50]}...")
+    # The payload dump is several KB, so only build it when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Full API request payload: {json.dumps(payload, indent=2)}")
+    return headers, payload
+
+def _handle_ai_result(status_code, text, result_loader, user_message, session):
+    """Turn an AI API response into the reply text, falling back on errors or a malformed body"""
+    # Log the response status and first part of the content for debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"API response status: {status_code}")
+        if text:
+            logger.debug(f"API response preview: {text[:200]}...")
+    
+    if status_code == 200:
+        try:
+            result = result_loader()
+            ai_message = result['choices'][0]['message']['content']
+            logger.info(f"Successfully received AI response of length {len(ai_message)}")
+            return ai_message
+        except (KeyError, IndexError) as e:
+            logger.error(f"Invalid response format from AI API: {str(e)}")
+            logger.debug(f"Response content: {text}")
+            return generate_fallback_response(user_message, session, issue_type=session.issue_type)
+    else:
+        logger.error(f"Error from AI API: {status_code} - {text}")
+        # Fall back to fallback response
+        return generate_fallback_response(user_message, session, issue_type=session.issue_type)
+
+class _TokenBucket:
+    """Continuously refilling token bucket used to pace AI API calls"""
+    
+    def __init__(self, capacity, refill_per_sec):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+    
+    async def acquire(self, tokens_needed=1):
+        """Wait until tokens_needed tokens are available and spend them"""
+        # A request larger than the whole bucket could never be served, so cap it
+        tokens_needed = min(tokens_needed, self.capacity)
+        # The budget is process-wide, but an asyncio lock only works on the loop that uses it
+        async with get_loop_local(("token_bucket_lock", id(self)), asyncio.Lock):
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_sec)
+                self.updated_at = now
+                if self.tokens >= tokens_needed:
+                    self.tokens -= tokens_needed
+                    return
+                await asyncio.sleep((tokens_needed - self.tokens) / self.refill_per_sec)
+
+# Client-side request and token budgets; a limit of 0 disables that bucket
+_request_bucket = _TokenBucket(MEAI_RPM, MEAI_RPM / 60) if MEAI_RPM > 0 else None
+_token_bucket = _TokenBucket(MEAI_TPM, MEAI_TPM / 60) if MEAI_TPM > 0 else None
+
+async def _throttle(payload):
+    """Wait for request and token budget before sending payload, instead of retrying after a 429"""
+    if _request_bucket is not None:
+        await _request_bucket.acquire(1)
+    if _token_bucket is not None:
+        # Rough estimate: ~4 characters per prompt token plus the completion budget
+        tokens_needed = len(json.dumps(payload["messages"])) // 4 + payload["max_tokens"]
+        await _token_bucket.acquire(tokens_needed)
+
+# The aiohttp session and concurrency cap are bound to an event loop, so each running loop
+# gets its own, created on first use; a later asyncio.run never sees a closed loop's objects
+
+def _new_ai_session():
+    """Keep-alive aiohttp session for AI API calls"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=128, limit_per_host=64, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(total=AI_API_TIMEOUT)
+    )
+
+def _get_ai_session():
+    """Get the running loop's shared aiohttp session for AI API calls"""
+    session = get_loop_local("ai_session", _new_ai_session)
+    if session.closed:
+        pop_loop_local("ai_session")
+        session = get_loop_local("ai_session", _new_ai_session)
+    return session
+
+def _get_ai_semaphore():
+    """Caps the running loop's in-flight AI API calls so bursts stay under the provider's rate limits"""
+    return get_loop_local("ai_semaphore", lambda: asyncio.Semaphore(MEAI_MAX_CONCURRENT))
+
+async def close_ai_session():
+    """Close the running loop's AI API session, e.g. on application shutdown"""
+    session = pop_loop_local("ai_session")
+    if session is not None and not session.closed:
+        await session.close()
+
+async def generate_ai_response(prompt, user_message, session, api_key, api_url):
     """Generate a response using the DeepSeek API with improved error handling and fallbacks"""
     try:
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Build conversation history from session
-        messages = [{"role": "system", "content": prompt}]
-        
-        # Add conversation history (last 6 messages)
-        if hasattr(session, 'messages'):
-            # Filter out system messages from the history
-            user_assistant_messages = [msg for msg in session.messages[-10:] if msg.get('role') in ['user', 'assistant']]
-            # Take the last 6 messages
-            history_messages = user_assistant_messages[-6:]
-            messages.extend(history_messages)
+        headers, payload = _build_ai_request(prompt, user_message, session, api_key)
         
-        # Add current user message if not already in session
-        if not hasattr(session, 'messages') or not session.messages or session.messages[-1]['role'] != 'user' or session.messages[-1]['content'] != user_message:
-            messages.append({"role": "user", "content": user_message})
-        
-        payload = {
-            "model": "deepseek-chat",
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
-        
-        logger.info(f"Sending request to AI API for issue: {user_message[:50]}...")
-        logger.debug(f"Full API request payload: {json.dumps(payload, indent=2)}")
-        
-        # Set reasonable timeout
-        timeout_seconds = 30
+        if aiohttp is None:
+            async with _get_ai_semaphore():
+                await _throttle(payload)
+                return await asyncio.to_thread(_send_ai_request_sync, api_url, headers, payload, user_message, session)
         
         try:
-            response = requests.post(
-                api_url,
-                headers=headers,
-                json=payload,
-                timeout=timeout_seconds
-            )
-            
-            # Log the response status and first part of the content for debugging
-            logger.debug(f"API response status: {response.status_code}")
-            if response.text:
-                logger.debug(f"API response preview: {response.text[:200]}...")
-            
-            if response.status_code == 200:
-                try:
-                    result = response.json()
-                    ai_message = result['choices'][0]['message']['content']
-                    logger.info(f"Successfully received AI response of length {len(ai_message)}")
-                    return ai_message
-                except (KeyError, IndexError) as e:
-                    logger.error(f"Invalid response format from AI API: {str(e)}")
-                    logger.debug(f"Response content: {response.text}")
-                    return generate_fallback_response(user_message, session, issue_type=getattr(session, 'issue_type', None))
-            else:
-                logger.error(f"Error from AI API: {response.status_code} - {response.text}")
-                # Fall back to fallback response
-                return generate_fallback_response(user_message, session, issue_type=getattr(session, 'issue_type', None))
-        except requests.exceptions.Timeout:
-            logger.error(f"Timeout connecting to AI API after {timeout_seconds} seconds")
-            return generate_fallback_response(user_message, session, issue_type=getattr(session, 'issue_type', None), 
+            async with _get_ai_semaphore():
+                await _throttle(payload)
+                async with _get_ai_session().post(api_url, headers=headers, json=payload) as response:
+                    text = await response.text()
+            return _handle_ai_result(response.status, text, lambda: json.loads(text), user_message, session)
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout connecting to AI API after {AI_API_TIMEOUT} seconds")
+            return generate_fallback_response(user_message, session, issue_type=session.issue_type, 
                                              error_type="timeout")
-        except requests.exceptions.RequestException as e:
+        except aiohttp.ClientError as e:
             logger.error(f"Request error connecting to AI API: {str(e)}")
-            return generate_fallback_response(user_message, session, issue_type=getattr(session, 'issue_type', None))
+            return generate_fallback_response(user_message, session, issue_type=session.issue_type)
             
     except Exception as e:
         logger.error(f"Error generating AI response: {str(e)}", exc_info=True)
         return "I apologize, but I'm experiencing technical difficulties. Please try again later or contact our IT support team directly at support@meai.com if your issue is urgent."
 
+async def generate_ai_responses(items, api_key, api_url):
+    """Generate responses for (prompt, user_message, session) items concurrently, in input order"""
+    return await asyncio.gather(*(
+        generate_ai_response(prompt, user_message, session, api_key, api_url)
+        for prompt, user_message, session in items
+    ))
+
+async def _iter_sse_content(response):
+    """Yield the content deltas of a server-sent-events chat completion stream"""
+    async for raw_line in response.content:
+        line = raw_line.decode('utf-8').strip()
+        if not line.startswith('data:'):
+            continue
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return
+        content = json.loads(data)['choices'][0].get('delta', {}).get('content')
+        if content:
+            yield content
+
+async def stream_ai_response(prompt, user_message, session, api_key, api_url):
+    """Yield the AI response in chunks as the API streams it, falling back to a canned reply on errors"""
+    if aiohttp is None:
+        yield await generate_ai_response(prompt, user_message, session, api_key, api_url)
+        return
+    
+    received = False
+    try:
+        headers, payload = _build_ai_request(prompt, user_message, session, api_key)
+        payload["stream"] = True
+        
+        async with _get_ai_semaphore():
+            await _throttle(payload)
+            # Bound the wait between chunks rather than the whole (possibly long) stream
+            async with _get_ai_session().post(
+                api_url, headers=headers, json=payload,
+                timeout=aiohttp.ClientTimeout(total=None, sock_read=AI_API_TIMEOUT)
+            ) as response:
+                if response.status != 200:
+                    text = await response.text()
+                    yield _handle_ai_result(response.status, text, lambda: json.loads(text), user_message, session)
+                    return
+                async for content in _iter_sse_content(response):
+                    received = True
+                    yield content
+        logger.info("Finished streaming AI response")
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout streaming from AI API after {AI_API_TIMEOUT} seconds")
+        if not received:
+            yield generate_fallback_response(user_message, session, issue_type=session.issue_type, 
+                                             error_type="timeout")
+    except Exception as e:
+        logger.error(f"Error streaming AI response: {str(e)}", exc_info=True)
+        # Once part of the answer has been sent, just end the stream
+        if not received:
+            yield generate_fallback_response(user_message, session, issue_type=session.issue_type)
+
+# Keep-alive session for the blocking path, so each turn reuses a pooled TLS connection
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+_http.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+def _send_ai_request_sync(api_url, headers, payload, user_message, session):
+    """POST a prepared request to the AI API with requests and handle the result"""
+    try:
+        response = _http.post(
+            api_url,
+            headers=headers,
+            json=payload,
+            timeout=AI_API_TIMEOUT
+        )
+        return _handle_ai_result(response.status_code, response.text, response.json, user_message, session)
+    except requests.exceptions.Timeout:
+        logger.error(f"Timeout connecting to AI API after {AI_API_TIMEOUT} seconds")
+        return generate_fallback_response(user_message, session, issue_type=session.issue_type, 
+                                         error_type="timeout")
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request error connecting to AI API: {str(e)}")
+        return generate_fallback_response(user_message, session, issue_type=session.issue_type)
+
+def generate_ai_response_sync(prompt, user_message, session, api_key, api_url):
+    """Blocking variant of generate_ai_response for callers without an event loop"""
+    try:
+        headers, payload = _build_ai_request(prompt, user_message, session, api_key)
+        return _send_ai_request_sync(api_url, headers, payload, user_message, session)
+    except Exception as e:
+        logger.error(f"Error generating AI response: {str(e)}", exc_info=True)
+        return "I apologize, but I'm experiencing technical difficulties. Please try again later or contact our IT support team directly at support@meai.com if your issue is urgent."
+
+# Canned-reply triggers for generate_fallback_response, matched as substrings of the lowercased message
+_SLOW_WORDS = ('slow', 'performance', 'freezing', 'frozen')
+_PRINTER_WORDS = ('printer', 'print', 'scanning')
+_NETWORK_WORDS = ('wifi', 'internet', 'connection', 'network')
+_INSTALL_WORDS = ('install', 'download', 'setup')
+_UPDATE_WORDS = ('update', 'upgrade', 'patch')
+_OFFICE_WORDS = ('office', 'excel', 'word', 'powerpoint', 'outlook')
+
+# Canned replies, appended to the personalized greeting
+_REPLY_TIMEOUT = "I apologize for the delay. Our system is experiencing some momentary slowness. Could you please provide some additional details about your issue so I can assist you better once our systems are back to normal speed?"
+_REPLY_GREETING = "I'm ME.ai Assistant, your IT support specialist. How can I help you today?"
+_REPLY_PASSWORD_RESET = "I understand you need to reset your password. I'd be happy to help with that. For security reasons, I'll need to verify your identity first. Could you please confirm your department and employee ID?"
+_REPLY_ACCOUNT_LOCKED = "I see that your account is locked. This typically happens after multiple incorrect password attempts. Let me help you regain access. First, could you tell me which system or application you're trying to access?"
+_REPLY_PASSWORD = "I understand you're having an issue with authentication or accessing your account. To help you better, could you specify which system or application you're having trouble accessing?"
+_REPLY_SLOW_DEVICE = "I'm sorry to hear your device is running slowly. This could be due to several factors such as low disk space, too many applications running, or outdated software. Could you tell me which operating system you're using, and approximately when you started noticing the issue?"
+_REPLY_PRINTER = "I understand you're having an issue with a printer. Let me help troubleshoot that. First, could you tell me the model of the printer, and whether it's connected via network or USB?"
+_REPLY_NETWORK = "I see you're experiencing network connectivity issues. Let's try to resolve this. Are you having trouble connecting to the WiFi, or is your device connected but you can't access specific websites or services?"
+_REPLY_HARDWARE = "Thank you for reaching out about your hardware issue. To help me troubleshoot effectively, could you tell me which specific device you're having problems with, and what symptoms you're experiencing?"
+_REPLY_INSTALL = "I understand you need help installing software. To assist you better, could you tell me which application you're trying to install, and what error or issue you're encountering during the installation process?"
+_REPLY_UPDATE = "I see you're having issues with a software update. These can sometimes be tricky. Could you let me know which program needs updating, and what happens when you try to update it?"
+_REPLY_OFFICE = "I understand you're experiencing an issue with Microsoft Office. To help you more effectively, could you specify which Office application is giving you trouble, and describe what happens when the problem occurs?"
+_REPLY_SOFTWARE = "I understand you're having a software issue. To help me troubleshoot effectively, could you tell me which specific application you're having problems with, and what error messages or unexpected behaviors you're seeing?"
+_REPLY_GENERAL = "Thank you for reaching out to IT support. I'd like to help with your issue, but I need a bit more information. Could you provide more details about what you're experiencing so I can better assist you?"
+
+def _mentions(message_lower, words):
+    """True if any of words occurs in the lowercased message"""
+    return any(word in message_lower for word in words)
+
 def generate_fallback_response(user_message, session, issue_type=None, error_type=None):
     """Generate a fallback response when AI API is unavailable"""
     logger.info(f"Generating fallback response. Issue type: {issue_type}, Error type: {error_type}")
     
     # Get personalized greeting if we have user information
     greeting = ""
-    if hasattr(session, 'employee_info') and session.employee_info and session.employee_info.get('name'):
+    if session is not None and session.employee_info and session.employee_info.get('name'):
         first_name = session.employee_info.get('name').split()[0]
         greeting = f"Hi {first_name}, "
     else:
@@ -266,58 +607,57 @@ def generate_fallback_response(user_message, session, issue_type=None, error_typ
     
     # If we're having connectivity issues
     if error_type == "timeout":
-        return f"{greeting}I apologize for the delay. Our system is experiencing some momentary slowness. Could you please provide some additional details about your issue so I can assist you better once our systems are back to normal speed?"
+        return greeting + _REPLY_TIMEOUT
     
     # Simple keyword-based response generator based on issue type and message content
     message_lower = user_message.lower()
     
     # If the message appears to be a simple greeting, respond accordingly
-    if message_lower in ['hi', 'hello', 'hey', 'hi there', 'hello there', 'greetings']:
-        return f"{greeting}I'm ME.ai Assistant, your IT support specialist. How can I help you today?"
+    if message_lower in _GREETINGS:
+        return greeting + _REPLY_GREETING
     
     if issue_type == "Password":
         if "reset" in message_lower or "forgot" in message_lower:
-            return f"{greeting}I understand you need to reset your password. I'd be happy to help with that. For security reasons, I'll need to verify your identity first. Could you please confirm your department and employee ID?"
+            return greeting + _REPLY_PASSWORD_RESET
         
-        if "locked" in message_lower or "locked out" in message_lower:
-            return f"{greeting}I see that your account is locked. This typically happens after multiple incorrect password attempts. Let me help you regain access. First, could you tell me which system or application you're trying to access?"
+        if "locked" in message_lower:
+            return greeting + _REPLY_ACCOUNT_LOCKED
         
-        return f"{greeting}I understand you're having an issue with authentication or accessing your account. To help you better, could you specify which system or application you're having trouble accessing?"
+        return greeting + _REPLY_PASSWORD
     
     elif issue_type == "Hardware":
-        if any(word in message_lower for word in ['slow', 'performance', 'freezing', 'frozen']):
-            return f"{greeting}I'm sorry to hear your device is running slowly. This could be due to several factors such as low disk space, too many applications running, or outdated software. Could you tell me which operating system you're using, and approximately when you started noticing the issue?"
+        if _mentions(message_lower, _SLOW_WORDS):
+            return greeting + _REPLY_SLOW_DEVICE
         
-        if any(word in message_lower for word in ['printer', 'print', 'scanning']):
-            return f"{greeting}I understand you're having an issue with a printer. Let me help troubleshoot that. First, could you tell me the model of the printer, and whether it's connected via network or USB?"
+        if _mentions(message_lower, _PRINTER_WORDS):
+            return greeting + _REPLY_PRINTER
         
-        if any(word in message_lower for word in ['wifi', 'internet', 'connection', 'network']):
-            return f"{greeting}I see you're experiencing network connectivity issues. Let's try to resolve this. Are you having trouble connecting to the WiFi, or is your device connected but you can't access specific websites or services?"
+        if _mentions(message_lower, _NETWORK_WORDS):
+            return greeting + _REPLY_NETWORK
         
-        return f"{greeting}Thank you for reaching out about your hardware issue. To help me troubleshoot effectively, could you tell me which specific device you're having problems with, and what symptoms you're experiencing?"
+        return greeting + _REPLY_HARDWARE
     
     elif issue_type == "Software":
-        if any(word in message_lower for word in ['install', 'download', 'setup']):
-            return f"{greeting}I understand you need help installing software. To assist you better, could you tell me which application you're trying to install, and what error or issue you're encountering during the installation process?"
+        if _mentions(message_lower, _INSTALL_WORDS):
+            return greeting + _REPLY_INSTALL
         
-        if any(word in message_lower for word in ['update', 'upgrade', 'patch']):
-            return f"{greeting}I see you're having issues with a software update. These can sometimes be tricky. Could you let me know which program needs updating, and what happens when you try to update it?"
+        if _mentions(message_lower, _UPDATE_WORDS):
+            return greeting + _REPLY_UPDATE
         
-        if any(word in message_lower for word in ['office', 'excel', 'word', 'powerpoint', 'outlook']):
-            return f"{greeting}I understand you're experiencing an issue with Microsoft Office. To help you more effectively, could you specify which Office application is giving you trouble, and describe what happens when the problem occurs?"
+        if _mentions(message_lower, _OFFICE_WORDS):
+            return greeting + _REPLY_OFFICE
         
-        return f"{greeting}I understand you're having a software issue. To help me troubleshoot effectively, could you tell me which specific application you're having problems with, and what error messages or unexpected behaviors you're seeing?"
+        return greeting + _REPLY_SOFTWARE
     
     # Default response for any other issue
-    return f"{greeting}Thank you for reaching out to IT support. I'd like to help with your issue, but I need a bit more information. Could you provide more details about what you're experiencing so I can better assist you?"
+    return greeting + _REPLY_GENERAL
 
 def generate_initial_greeting(session):
     """Generate a personalized initial greeting based on user info"""
-    current_hour = datetime.datetime.now().hour
-    time_greeting = "Good morning" if 5 <= current_hour < 12 else "Good afternoon" if 12 <= current_hour < 18 else "Good evening"
+    time_greeting = _time_greeting()
     
     # Check if we have employee info
-    if hasattr(session, 'employee_info') and session.employee_info:
+    if session is not None and session.employee_info:
         # Use first name for more personal greeting
         employee_name = session.employee_info.get('name', '').split()[0]
         department = session.employee_info.get('department', '')
@@ -2,36 +2,119 @@
 import logging
 import datetime
 import uuid
+import collections
+import dataclasses
+import threading
+import queue
+import time
+import atexit
+import json
 import sys
 import os
+from typing import Any, Deque, Dict, List, Optional
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from .db_service import log_conversation_to_db 
+from cachetools import TTLCache
+from config import SESSION_TTL, MAX_SESSIONS, REDIS_URL
+from .db_service import log_conversations_batch
+
+try:
+    import redis
+except ImportError:
+    redis = None
 
 logger = logging.getLogger('me_agent_orchestrator')
 
+# Messages kept per session; the AI prompt only ever uses the last few
+MAX_SESSION_MESSAGES = 20
+
+# Conversation messages are logged off the request path: add_message only enqueues,
+# and a daemon thread writes up to LOG_BATCH_SIZE records per request
+LOG_BATCH_SIZE = 50
+LOG_FLUSH_INTERVAL = 0.5
+
+_log_queue = queue.Queue()
+_log_worker = None
+_log_worker_lock = threading.Lock()
+
+def _write_log_batch(batch):
+    """Send a batch of queued conversation records to the DB service"""
+    try:
+        log_conversations_batch(batch)
+    except Exception as e:
+        logger.error(f"Error writing conversation log batch: {str(e)}")
+
+def _run_log_worker():
+    """Drain the log queue forever, waiting up to LOG_FLUSH_INTERVAL to fill a batch"""
+    while True:
+        batch = [_log_queue.get()]
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while len(batch) < LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _write_log_batch(batch)
+
+def _enqueue_conversation_log(record):
+    """Queue a conversation record, starting the writer thread on first use"""
+    global _log_worker
+    if _log_worker is None:
+        with _log_worker_lock:
+            if _log_worker is None:
+                _log_worker = threading.Thread(target=_run_log_worker, name="conversation-log-writer", daemon=True)
+                _log_worker.start()
+    _log_queue.put_nowait(record)
+
+def flush_conversation_logs():
+    """Write any still-queued conversation records synchronously"""
+    batch = []
+    while True:
+        try:
+            batch.append(_log_queue.get_nowait())
+        except queue.Empty:
+            break
+        if len(batch) == LOG_BATCH_SIZE:
+            _write_log_batch(batch)
+            batch = []
+    if batch:
+        _write_log_batch(batch)
+
+# The writer is a daemon thread, so push out whatever is left when the process exits
+atexit.register(flush_conversation_logs)
+
 
         
         
+# Slotted: fixed attribute layout, many sessions live in the manager at once; compared by identity
+@dataclasses.dataclass(slots=True, eq=False)
 class Session:
-    def __init__(self, session_id):
-        self.session_id = session_id
-        self.customer_number = None
-        self.customer_email = None
-        self.employee_id = None
-        self.agent_id = None
-        self.employee_info = None  # Store full employee info
-        self.devices = []  # Store employee devices
-        self.conversation_id = str(uuid.uuid4())
-        self.messages = []
-        self.channel_status = {'telephony': False, 'chat': False}
-        self.issue_type = None
-        self.created_at = datetime.datetime.now()
-        self.last_updated = datetime.datetime.now()
-        self.call_data = {}
-        self.asked_about_devices = False  # Track if we've asked about devices
-        self.selected_device = None  # Store which device the user selected
-        self.initial_greeting = None  # Store the initial greeting
+    session_id: str
+    customer_number: Optional[str] = None
+    customer_email: Optional[str] = None
+    employee_id: Optional[Any] = None
+    agent_id: Optional[Any] = None
+    employee_info: Optional[Dict[str, Any]] = None  # Store full employee info
+    first_name: Optional[str] = None  # Taken from employee_info once, when the employee is identified
+    department: Optional[str] = None
+    devices: List[Dict[str, Any]] = dataclasses.field(default_factory=list)  # Store employee devices
+    conversation_id: str = dataclasses.field(default_factory=lambda: uuid.uuid4().hex)
+    messages: Deque[Dict[str, str]] = dataclasses.field(
+        default_factory=lambda: collections.deque(maxlen=MAX_SESSION_MESSAGES))
+    channel_status: Dict[str, bool] = dataclasses.field(
+        default_factory=lambda: {'telephony': False, 'chat': False})
+    issue_type: Optional[str] = None
+    created_at: datetime.datetime = dataclasses.field(default_factory=datetime.datetime.now)
+    last_updated: datetime.datetime = dataclasses.field(default_factory=datetime.datetime.now)
+    call_data: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    asked_about_devices: bool = False  # Track if we've asked about devices
+    selected_device: Optional[Dict[str, Any]] = None  # Store which device the user selected
+    initial_greeting: Optional[str] = None  # Store the initial greeting
+    greeted: bool = False  # Set once the orchestrator has greeted the user
+    language: Optional[str] = None  # Conversation language, when the client provides one
     
     def add_message(self, message, channel_type='chat'):
         self.messages.append(message)
@@ -39,14 +122,14 @@ class Session:
         
         # Log message to database if we have employee and agent IDs
         if self.employee_id and self.agent_id:
-            log_conversation_to_db(
-                self.conversation_id,
-                self.employee_id,
-                self.agent_id,
-                message['content'],
-                "User input" if message['role'] == 'user' else "AI response",
-                "In Progress"
-            )
+            _enqueue_conversation_log({
+                "conversation_id": self.conversation_id,
+                "user_id": self.employee_id,
+                "agent_id": self.agent_id,
+                "message_text": message['content'],
+                "message_type": "User input" if message['role'] == 'user' else "AI response",
+                "issue_status": "In Progress"
+            })
     
     def update_channel_status(self, channel, status):
         self.channel_status[channel] = status
@@ -56,20 +139,213 @@ class Session:
         self.call_data.update(call_data)
         self.last_updated = datetime.datetime.now()
 
+# With REDIS_URL set, sessions are mirrored to one Redis hash each so any worker can serve them
+SESSION_KEY_PREFIX = "meai:session:"
+# Saves are written behind: repeated saves of a session within this many seconds become one Redis write
+SESSION_FLUSH_INTERVAL = 0.2
+_SESSION_FIELDS = frozenset(field.name for field in dataclasses.fields(Session))
+_DATETIME_FIELDS = ("created_at", "last_updated")
+# Hash field holding a fresh token per write, so readers can tell whether their copy is current
+SAVE_TOKEN_FIELD = "_save_token"
+
+def _session_to_hash(session):
+    """Encode a session's fields as JSON strings for HSET"""
+    fields = {}
+    for name in _SESSION_FIELDS:
+        value = getattr(session, name)
+        if name in _DATETIME_FIELDS:
+            value = value.isoformat()
+        elif name == "messages":
+            value = list(value)
+        fields[name] = json.dumps(value)
+    return fields
+
+def _encode_session(session):
+    """Snapshot a session for Redis with _session_to_hash, or None (logged) if it cannot be encoded"""
+    try:
+        return _session_to_hash(session)
+    except Exception as e:
+        logger.error(f"Error encoding session {session.session_id} for Redis: {str(e)}")
+        return None
+
+def _session_from_hash(session_id, fields):
+    """Rebuild a Session from the fields written by _session_to_hash"""
+    return _update_session_from_hash(Session(session_id), fields)
+
+def _update_session_from_hash(session, fields):
+    """Overwrite a session's fields in place with those written by _session_to_hash"""
+    for name, raw in fields.items():
+        if name not in _SESSION_FIELDS or name == "session_id":
+            continue
+        value = json.loads(raw)
+        if name in _DATETIME_FIELDS:
+            value = datetime.datetime.fromisoformat(value)
+        elif name == "messages":
+            value = collections.deque(value, maxlen=MAX_SESSION_MESSAGES)
+        setattr(session, name, value)
+    return session
+
+# Redis client, pending saves and writer thread are shared by every SessionManager in the process,
+# so short-lived managers don't each open a connection pool or start a writer
+_session_store = None
+_session_store_lock = threading.Lock()
+# (encoded fields, save token) pairs saved since the last flush, by ID; a later save replaces an earlier one
+_pending_sessions = {}
+_pending_lock = threading.Lock()
+_session_writer = None
+
+def _get_session_store():
+    """Return the shared Redis client, or None to keep sessions local to this process"""
+    global _session_store
+    if _session_store is None and redis is not None and REDIS_URL:
+        with _session_store_lock:
+            if _session_store is None:
+                _session_store = redis.Redis.from_url(REDIS_URL, decode_responses=True, max_connections=64)
+    return _session_store
+
+def _write_shared_sessions(saves):
+    """Write (session ID, encoded fields, save token) triples to Redis in one pipeline.
+    A session that fails is logged on its own and does not stop the others being written."""
+    try:
+        pipe = _get_session_store().pipeline(transaction=False)
+    except Exception as e:
+        logger.error(f"Error saving sessions to Redis: {str(e)}")
+        return
+    
+    queued = []
+    for session_id, fields, token in saves:
+        try:
+            key = SESSION_KEY_PREFIX + session_id
+            pipe.hset(key, mapping={**fields, SAVE_TOKEN_FIELD: token})
+            pipe.expire(key, SESSION_TTL)
+            queued.append(session_id)
+        except Exception as e:
+            logger.error(f"Error saving session {session_id} to Redis: {str(e)}")
+    if not queued:
+        return
+    
+    try:
+        # Per-command errors come back as results instead of aborting the whole pipeline
+        results = pipe.execute(raise_on_error=False)
+    except Exception as e:
+        logger.error(f"Error saving sessions to Redis: {str(e)}")
+        return
+    for session_id, result in zip(queued, results[::2]):
+        if isinstance(result, Exception):
+            logger.error(f"Error saving session {session_id} to Redis: {str(result)}")
+
+def flush_sessions():
+    """Write every pending session save to Redis now"""
+    global _pending_sessions
+    with _pending_lock:
+        pending, _pending_sessions = _pending_sessions, {}
+    if pending:
+        _write_shared_sessions((session_id, fields, token) for session_id, (fields, token) in pending.items())
+
+def _run_session_writer():
+    """Flush pending session saves every SESSION_FLUSH_INTERVAL seconds"""
+    while True:
+        time.sleep(SESSION_FLUSH_INTERVAL)
+        flush_sessions()
+
+def _queue_session_save(session_id, fields, token):
+    """Queue a write-behind save, starting the writer thread on first use; caller holds _pending_lock"""
+    global _session_writer
+    _pending_sessions[session_id] = (fields, token)
+    if _session_writer is None:
+        _session_writer = threading.Thread(target=_run_session_writer, name="session-writer", daemon=True)
+        _session_writer.start()
+
+# The writer is a daemon thread, so push out whatever is left when the process exits
+atexit.register(flush_sessions)
+
 class SessionManager:
     def __init__(self):
-        self.sessions = {}
+        # Idle sessions expire instead of accumulating until end_session is called
+        self.sessions = TTLCache(maxsize=MAX_SESSIONS, ttl=SESSION_TTL)
+        self._lock = threading.Lock()
+        # Shared session store; None keeps sessions local to this process
+        self._store = _get_session_store()
+        # Save token of the Redis write each cached session reflects, by session ID
+        self._save_tokens = TTLCache(maxsize=MAX_SESSIONS, ttl=SESSION_TTL)
+    
+    def flush_sessions(self):
+        """Write every pending session save to Redis now"""
+        flush_sessions()
+    
+    def _refresh_from_store(self, session_id, session):
+        """Bring the cached session (or None) up to date with Redis; returns the session to use"""
+        key = SESSION_KEY_PREFIX + session_id
+        try:
+            if session is not None:
+                # Only the token is read unless another worker has saved the session since
+                token = self._store.hget(key, SAVE_TOKEN_FIELD)
+                with self._lock:
+                    current = token is None or token == self._save_tokens.get(session_id)
+                if current:
+                    return session
+            fields = self._store.hgetall(key)
+        except Exception as e:
+            logger.error(f"Error loading session {session_id} from Redis: {str(e)}")
+            return session
+        if not fields:
+            return session
+        with self._lock:
+            # Update the cached object in place so every thread keeps working on the same session
+            session = self.sessions.get(session_id) or session
+            if session is None:
+                session = _session_from_hash(session_id, fields)
+            else:
+                _update_session_from_hash(session, fields)
+            self._save_tokens[session_id] = fields.get(SAVE_TOKEN_FIELD)
+        return session
     
     def get_session(self, session_id):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = Session(session_id)
-        return self.sessions[session_id]
+        with self._lock:
+            session = self.sessions.get(session_id)
+        # The in-process object is the source of truth; it is only refreshed when another
+        # worker has saved the session, and never while this process has an unflushed save
+        if self._store is not None:
+            with _pending_lock:
+                unflushed = session_id in _pending_sessions
+            if not unflushed:
+                session = self._refresh_from_store(session_id, session)
+        with self._lock:
+            session = self.sessions.get(session_id) or session
+            if session is None:
+                session = Session(session_id)
+            # Re-insert so the TTL counts from the last access
+            self.sessions[session_id] = session
+            return session
     
-    def save_session(self, session):
-        self.sessions[session.session_id] = session
+    def save_session(self, session, immediate=False):
+        """Save a session; the Redis copy is written behind unless immediate is set"""
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[session.session_id] = session
+            self._save_tokens[session.session_id] = token
+        if self._store is not None:
+            with _pending_lock:
+                # Encode now: the writer thread must not read a session that request threads keep mutating
+                fields = _encode_session(session)
+                if immediate or fields is None:
+                    _pending_sessions.pop(session.session_id, None)
+                else:
+                    _queue_session_save(session.session_id, fields, token)
+            if immediate and fields is not None:
+                _write_shared_sessions([(session.session_id, fields, token)])
         logger.info(f"Session {session.session_id} saved/updated")
     
     def end_session(self, session_id):
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            self._save_tokens.pop(session_id, None)
+        if self._store is not None:
+            with _pending_lock:
+                _pending_sessions.pop(session_id, None)
+            try:
+                self._store.delete(SESSION_KEY_PREFIX + session_id)
+            except Exception as e:
+                logger.error(f"Error removing session {session_id} from Redis: {str(e)}")
+        if session is not None:
             logger.info(f"Session {session_id} ended")
\ No newline at end of file
@@ -3,10 +3,14 @@ import os
 import logging
 import argparse
 import json
+import time
+import asyncio
 from dotenv import load_dotenv
 
 # Import ME.ai enhanced integration
 from me_ai_integration import MEAIEnhancedOrchestrator
+from existing.db_service import close_async_session
+from existing.response_generator import close_ai_session
 
 # Configure logging
 logging.basicConfig(
@@ -117,12 +121,67 @@ def run_interactive_session(orchestrator):
         response = orchestrator.process_message(user_input, session_id, email, phone)
         print(f"\nME.ai: {response}")
 
+async def process_messages_batch(orchestrator, items, max_concurrent=8):
+    """Process a batch of test messages through a bounded pool of workers, returning responses in input order"""
+    queue = asyncio.Queue()
+    for index, item in enumerate(items):
+        queue.put_nowait((index, item))
+    responses = [None] * len(items)
+    
+    async def worker():
+        while True:
+            try:
+                index, item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                # process_message is blocking, so each worker runs it off the event loop
+                responses[index] = await asyncio.to_thread(
+                    orchestrator.process_message,
+                    item["message"],
+                    item.get("session_id") or f"batch-session-{index}",
+                    item.get("email"),
+                    item.get("phone")
+                )
+            except Exception as e:
+                logger.error(f"Error processing batch message {index}: {str(e)}")
+            finally:
+                queue.task_done()
+    
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, min(max_concurrent, len(items))))))
+    finally:
+        # The HTTP sessions opened on this loop would otherwise outlive it unclosed
+        await close_ai_session()
+        await close_async_session()
+    return responses
+
+def run_batch_session(orchestrator, batch_path, max_concurrent):
+    """Run a JSON list of test messages concurrently and report throughput"""
+    try:
+        with open(batch_path, 'r') as f:
+            items = json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading batch file: {str(e)}")
+        return
+    
+    start = time.perf_counter()
+    responses = asyncio.run(process_messages_batch(orchestrator, items, max_concurrent))
+    elapsed = time.perf_counter() - start
+    
+    for item, response in zip(items, responses):
+        print(f"\nYou: {item['message']}\nME.ai: {response}")
+    logger.info(f"Processed {len(items)} messages in {elapsed:.2f}s with max_concurrent={max_concurrent}")
+
 def main():
     """Main function to initialize and optionally test ME.ai enhanced system"""
     parser = argparse.ArgumentParser(description='Initialize ME.ai Enhanced System')
     parser.add_argument('--config', '-c', help='Path to configuration file (JSON)')
     parser.add_argument('--test', '-t', action='store_true', help='Test system components')
     parser.add_argument('--interactive', '-i', action='store_true', help='Run interactive session')
+    parser.add_argument('--batch', '-b', help='Path to a JSON list of test messages to process concurrently')
+    parser.add_argument('--max-concurrent', type=int, default=int(os.environ.get('MEAI_MAX_CONCURRENT', 8)),
+                        help='Concurrent messages in batch mode; tune against the AI provider RPM cap')
     
     args = parser.parse_args()
     
@@ -147,6 +206,10 @@ def main():
     if args.interactive:
         run_interactive_session(orchestrator)
     
+    # Run batch benchmark if requested
+    if args.batch:
+        run_batch_session(orchestrator, args.batch, args.max_concurrent)
+    
     logger.info("ME.ai Enhanced System initialization complete")
 
 if __name__ == "__main__":
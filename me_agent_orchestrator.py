@@ -2,34 +2,44 @@
 import os
 import logging
 import uuid
+import asyncio
+import re
+import atexit
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from botocore.config import Config
+from cachetools import TTLCache
 from typing import Dict, Any, List, Optional
 
 import datetime  # Add this import to fix the error
 
-
-# LangChain imports
-from langchain_aws import ChatBedrock
-from langchain.memory import ConversationBufferMemory
+# LangChain (ChatBedrock, MEConversationChain) is imported where it is first used
 
 # Internal imports
-from agent.orchestrator import AgentOrchestrator
 from agent.hardware_agent import HardwareAgent
 from agent.software_agent import SoftwareAgent
 from agent.password_agent import PasswordAgent
+from agent.base_agent import create_summary_llm
 from existing.session_manager import SessionManager, Session
 from existing.db_service import (
     find_employee_by_contact,
     get_employee_devices,
     find_agent_by_specialization,
-    log_conversation_to_db
+    log_conversation_to_db,
+    afind_employee_by_contact,
+    aget_employee_devices,
+    afind_agent_by_specialization,
+    alog_conversation_to_db,
+    invalidate_employee as _invalidate_employee_lookup
 )
 from existing.response_generator import generate_initial_greeting
-from chains.conversation import MEConversationChain
 from chains.workflow import WorkflowChain
 from memory.session_memory import SessionMemory
 from tools.db_tools import create_db_tools
 from tools.device_tools import create_device_tools
-from prompts.templates import PromptTemplateManager
+from prompts.templates import get_prompt_manager
 
 # Load configuration
 from config import (
@@ -40,11 +50,15 @@ from config import (
     DEEPSEEK_API_URL,
     AWS_REGION, 
     BEDROCK_MODEL_ID, 
+    BEDROCK_LATENCY_MODE,
     MEAI_DB_SERVICE,
     DB_USERNAME, 
     DB_PASSWORD,
     LOG_LEVEL,
-    LOG_FORMAT
+    LOG_FORMAT,
+    SESSION_TTL,
+    MAX_SESSIONS,
+    REDIS_URL
 )
 
 # Configure logging
@@ -54,6 +68,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger('me_agent_orchestrator')
 
+# Whole-word greetings; substring matching treated "this" or "which" as a "hi"
+_GREETING_RE = re.compile(r"\b(hello|hi|hey|good\s+(?:morning|afternoon|evening))\b", re.IGNORECASE)
+# Greetings open a message, so only its start is searched
+GREETING_SCAN_LENGTH = 64
+
+# Connection pool and retry settings for the Bedrock client shared by the orchestrator and its agents
+BEDROCK_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    retries={"max_attempts": 2, "mode": "adaptive"},
+    tcp_keepalive=True
+)
+
+# Model invocations that accept Bedrock's latency tier
+_LATENCY_OPERATIONS = ("InvokeModel", "InvokeModelWithResponseStream")
+
+def _apply_latency_mode(client, latency_mode):
+    """Request the given Bedrock latency tier on every model invocation made through client"""
+    if latency_mode == "standard":
+        return
+    
+    # Older botocore releases reject the parameter outright, so only send it when the service model knows it
+    service_model = client.meta.service_model
+    for operation in _LATENCY_OPERATIONS:
+        if "performanceConfigLatency" not in service_model.operation_model(operation).input_shape.members:
+            logger.warning("Installed botocore does not support Bedrock latency tiers; using standard latency")
+            return
+    
+    def _set_latency(params, **kwargs):
+        params.setdefault("performanceConfigLatency", latency_mode)
+    
+    for operation in _LATENCY_OPERATIONS:
+        client.meta.events.register(f"provide-client-params.bedrock-runtime.{operation}", _set_latency)
+
+# Greetings are a few sentences, so their model gets a small output budget and steadier sampling
+GREETING_MAX_TOKENS = 256
+GREETING_TEMPERATURE = 0.3
+
+# Workflow-chain category keywords to agent type, checked in this (priority) order
+_CATEGORY_TO_AGENT = {
+    "hardware": "Hardware",
+    "device": "Hardware",
+    "software": "Software",
+    "application": "Software",
+    "password": "Password",
+    "access": "Password",
+    "account": "Password",
+}
+
+# Classifications are cached per normalized query; repeated complaints skip the LLM
+_NON_WORD_RE = re.compile(r"\W+")
+CLASSIFY_CACHE_SIZE = 10000
+CLASSIFY_CACHE_TTL = 86400
+
+# DB logging for the sync path runs here so the write stays off the response path; one pool is
+# shared by every orchestrator and drained once at exit
+_log_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dblog")
+atexit.register(_log_executor.shutdown, wait=True)
+
 class MEAgentOrchestrator:
     """Main orchestrator for ME.ai agents using LangChain"""
     
@@ -62,25 +134,37 @@ class MEAgentOrchestrator:
         self.config = config or {
             "aws_region": AWS_REGION,
             "model_id": BEDROCK_MODEL_ID,
+            "latency_mode": BEDROCK_LATENCY_MODE,
             "db_service_url": MEAI_DB_SERVICE,
             "db_username": DB_USERNAME,
             "db_password": DB_PASSWORD
         }
         
+        # One bedrock-runtime client (and connection pool) for every model call
+        self.bedrock_client = boto3.client(
+            "bedrock-runtime",
+            region_name=self.config["aws_region"],
+            config=BEDROCK_CLIENT_CONFIG
+        )
+        _apply_latency_mode(self.bedrock_client, self.config.get("latency_mode", BEDROCK_LATENCY_MODE))
+        
         # Initialize LLM
         self.llm = self._initialize_llm()
+        self.greeting_llm = self._initialize_llm(GREETING_MAX_TOKENS, GREETING_TEMPERATURE)
+        self.summary_llm = create_summary_llm(self.config["aws_region"], self.bedrock_client)
         
         # Initialize session manager
         self.session_manager = SessionManager()
         
         # Initialize prompt template manager
-        self.prompt_manager = PromptTemplateManager()
+        self.prompt_manager = get_prompt_manager()
         
-        # Initialize specialized agents
+        # Initialize specialized agents; they share the orchestrator's client and model wrappers
+        agent_kwargs = {"client": self.bedrock_client, "llm": self.llm, "summary_llm": self.summary_llm}
         self.agents = {
-            "Hardware": HardwareAgent(self.config["aws_region"], self.config["model_id"]),
-            "Software": SoftwareAgent(self.config["aws_region"], self.config["model_id"]),
-            "Password": PasswordAgent(self.config["aws_region"], self.config["model_id"]),
+            "Hardware": HardwareAgent(self.config["aws_region"], self.config["model_id"], **agent_kwargs),
+            "Software": SoftwareAgent(self.config["aws_region"], self.config["model_id"], **agent_kwargs),
+            "Password": PasswordAgent(self.config["aws_region"], self.config["model_id"], **agent_kwargs),
         }
         
         # Initialize workflow chain
@@ -89,65 +173,163 @@ class MEAgentOrchestrator:
         # Default to hardware agent for unclassified issues
         self.default_agent = "Hardware"
         
-        # Session ID to memory mapping
-        self.session_memories = {}
+        # Session ID to memory mapping; idle memories expire along with their sessions
+        self.session_memories = TTLCache(maxsize=MAX_SESSIONS, ttl=SESSION_TTL)
+        self._memories_lock = threading.Lock()
         
         # Tools
         self.db_tools = create_db_tools()
         self.device_tools = create_device_tools()
         
+        # Normalized query to issue type, filled by classify_issue_type
+        self._class_cache = TTLCache(maxsize=CLASSIFY_CACHE_SIZE, ttl=CLASSIFY_CACHE_TTL)
+        self._class_cache_lock = threading.Lock()
+        
+        # Fire-and-forget tasks (e.g. DB logging) started by the async path; held so they aren't collected
+        self._background_tasks = set()
+        
+        # Idle greeting chains; each greeting checks one out so concurrent sessions never share chain memory
+        self._greeting_chains = collections.deque()
+        
         logger.info("ME.ai Agent Orchestrator initialized")
     
-    def _initialize_llm(self):
+    def _initialize_llm(self, max_tokens=1000, temperature=0.7):
         """Initialize the LLM (using AWS Bedrock)"""
+        from langchain_aws import ChatBedrock
         try:
-            logger.info(f"Initializing LLM with model {self.config['model_id']}")
+            logger.info("Initializing LLM with model %s", self.config['model_id'])
             return ChatBedrock(
+                client=self.bedrock_client,
                 model_id=self.config["model_id"],
                 region_name=self.config["aws_region"],
-                model_kwargs={"temperature": 0.7, "max_tokens": 1000}
+                model_kwargs={"temperature": temperature, "max_tokens": max_tokens}
             )
         except Exception as e:
-            logger.error(f"Error initializing LLM: {str(e)}")
+            logger.error("Error initializing LLM: %s", e)
             # This would ideally be a fallback to another provider
             raise e
     
     def _get_or_create_memory(self, session_id):
         """Get or create memory for a session"""
-        if session_id not in self.session_memories:
-            self.session_memories[session_id] = SessionMemory(
-                session_id=session_id,
-                memory_type="buffer",
-                window_size=10,
-                persistence=None  # Could be 'redis' if configured
-            )
-        return self.session_memories[session_id]
+        with self._memories_lock:
+            memory = self.session_memories.get(session_id)
+            if memory is None:
+                memory = SessionMemory(
+                    session_id=session_id,
+                    memory_type="buffer",
+                    window_size=10,
+                    # Chat history lives in Redis when configured so every worker sees it
+                    persistence="redis" if REDIS_URL else None,
+                    redis_url=REDIS_URL,
+                    ttl=SESSION_TTL
+                )
+            # Re-insert so the TTL counts from the last access
+            self.session_memories[session_id] = memory
+            return memory
+    
+    def gc_memories(self):
+        """Drop expired session memories now rather than on the next cache write"""
+        with self._memories_lock:
+            self.session_memories.expire()
     
     def classify_issue_type(self, query):
         """Classify the issue type using the workflow chain"""
+        key = _NON_WORD_RE.sub(" ", query.lower()).strip()[:128]
+        with self._class_cache_lock:
+            issue_type = self._class_cache.get(key)
+        if issue_type is not None:
+            return issue_type
+        
         try:
             # Format the conversation string - simple version for now
             conversation = f"User: {query}"
             
             # Classify using the workflow chain
             classification = self.workflow_chain.classify_issue_detailed(conversation)
-            category = classification["category"]
+            category = classification["category"].lower()
             
             # Map category to agent type
-            if "Hardware" in category or "Device" in category:
-                return "Hardware"
-            elif "Software" in category or "Application" in category:
-                return "Software"
-            elif "Password" in category or "Access" in category or "Account" in category:
-                return "Password"
-            else:
-                return "General"
+            issue_type = next((agent for keyword, agent in _CATEGORY_TO_AGENT.items() if keyword in category), "General")
+            
+            # Only successful classifications are cached
+            with self._class_cache_lock:
+                self._class_cache[key] = issue_type
+            return issue_type
         except Exception as e:
-            logger.error(f"Error classifying issue: {str(e)}")
+            logger.error("Error classifying issue: %s", e)
             return "General"  # Default to General if classification fails
     
+    async def aclassify_issue_type(self, query):
+        """Async variant of classify_issue_type; the workflow chain runs in a worker thread"""
+        return await asyncio.to_thread(self.classify_issue_type, query)
+    
+    def _record_issue_type(self, session, memory, issue_type):
+        """Store a fresh issue classification on the session and in its memory metadata"""
+        session.issue_type = issue_type
+        logger.info("Classified issue as: %s", issue_type)
+        
+        # Add issue classification to session memory metadata
+        memory.add_system_context({
+            "issue_data": {
+                "type": issue_type,
+                "classified_at": str(datetime.datetime.now())
+            }
+        })
+    
+    def _select_agent(self, issue_type):
+        """Pick the specialized agent for an issue type, falling back to the default agent"""
+        if issue_type in self.agents:
+            logger.info("Using %s agent for processing", issue_type)
+            return self.agents[issue_type]
+        logger.info("Using default agent (%s) for processing", self.default_agent)
+        return self.agents[self.default_agent]
+    
+    def _assign_agent_id(self, session, agent_info):
+        """Record the DB agent found for the session's issue type, if any"""
+        if agent_info:
+            session.agent_id = agent_info.get('agent_id')
+            logger.info("Assigned agent ID: %s", session.agent_id)
+    
+    def _spawn(self, coro):
+        """Run a coroutine in the background without awaiting it"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
+    def _log_response(self, conversation_id, employee_id, agent_id, response):
+        """Log an AI response to the database from the log executor"""
+        try:
+            log_conversation_to_db(
+                conversation_id,
+                employee_id,
+                agent_id,
+                response,
+                "AI response",
+                "In Progress"
+            )
+            logger.info("Logged conversation to database: %s", conversation_id)
+        except Exception as e:
+            logger.error("Error logging to database: %s", e)
+    
+    async def _alog_response(self, conversation_id, employee_id, agent_id, response):
+        """Log an AI response to the database from a background task"""
+        try:
+            await alog_conversation_to_db(
+                conversation_id,
+                employee_id,
+                agent_id,
+                response,
+                "AI response",
+                "In Progress"
+            )
+            logger.info("Logged conversation to database: %s", conversation_id)
+        except Exception as e:
+            logger.error("Error logging to database: %s", e)
+    
     def process_query(self, query, session):
         """Process a user query, selecting appropriate agent and returning response"""
+        conversation_id = session.conversation_id
         try:
             # Get session memory
             memory = self._get_or_create_memory(session.session_id)
@@ -158,34 +340,16 @@ class MEAgentOrchestrator:
             # If no issue type in session, classify it
             if not session.issue_type or session.issue_type == "General":
                 issue_type = self.classify_issue_type(query)
-                session.issue_type = issue_type
-                logger.info(f"Classified issue as: {issue_type}")
-                
-                # Add issue classification to session memory metadata
-                memory.add_system_context({
-                    "issue_data": {
-                        "type": issue_type,
-                        "classified_at": str(datetime.datetime.now())
-                    }
-                })
+                self._record_issue_type(session, memory, issue_type)
             else:
                 issue_type = session.issue_type
             
             # Select agent based on issue type
-            if issue_type in self.agents:
-                agent = self.agents[issue_type]
-                logger.info(f"Using {issue_type} agent for processing")
-            else:
-                # Fall back to default agent
-                agent = self.agents[self.default_agent]
-                logger.info(f"Using default agent ({self.default_agent}) for processing")
+            agent = self._select_agent(issue_type)
             
             # If no agent_id set for session yet, try to find one
             if not session.agent_id:
-                agent_info = find_agent_by_specialization(issue_type)
-                if agent_info:
-                    session.agent_id = agent_info.get('agent_id')
-                    logger.info(f"Assigned agent ID: {session.agent_id}")
+                self._assign_agent_id(session, find_agent_by_specialization(issue_type))
             
             # Process query with selected agent
             response = agent.process(query, session)
@@ -193,26 +357,68 @@ class MEAgentOrchestrator:
             # Add AI response to memory
             memory.add_ai_message(response)
             
-            # Log to database if we have user and agent IDs
+            # Log to database in the background if we have user and agent IDs
             if session.employee_id and session.agent_id:
-                try:
-                    conversation_id = getattr(session, 'conversation_id', str(uuid.uuid4()))
-                    log_conversation_to_db(
-                        conversation_id,
-                        session.employee_id,
-                        session.agent_id,
-                        response,
-                        "AI response",
-                        "In Progress"
-                    )
-                    logger.info(f"Logged conversation to database: {conversation_id}")
-                except Exception as e:
-                    logger.error(f"Error logging to database: {str(e)}")
+                _log_executor.submit(
+                    self._log_response,
+                    conversation_id,
+                    session.employee_id,
+                    session.agent_id,
+                    response
+                )
             
             return response
             
         except Exception as e:
-            logger.error(f"Error in orchestrator processing: {str(e)}")
+            logger.error("Error in orchestrator processing: %s", e)
+            # Fallback response
+            from existing.response_generator import generate_fallback_response
+            return generate_fallback_response(query, session)
+    
+    async def aprocess_query(self, query, session):
+        """Async variant of process_query; DB lookups are awaited and response logging runs in the background"""
+        conversation_id = session.conversation_id
+        try:
+            # Session memory may be Redis-backed, so its reads and writes run off the event loop
+            memory = await asyncio.to_thread(self._get_or_create_memory, session.session_id)
+            
+            # Add user message to memory
+            await asyncio.to_thread(memory.add_user_message, query)
+            
+            # If no issue type in session, classify it
+            if not session.issue_type or session.issue_type == "General":
+                issue_type = await self.aclassify_issue_type(query)
+                await asyncio.to_thread(self._record_issue_type, session, memory, issue_type)
+            else:
+                issue_type = session.issue_type
+            
+            # Select agent based on issue type
+            agent = self._select_agent(issue_type)
+            
+            # If no agent_id set for session yet, look one up while the agent works;
+            # it is only needed for logging the response
+            agent_lookup = None
+            if not session.agent_id:
+                agent_lookup = asyncio.create_task(afind_agent_by_specialization(issue_type))
+            
+            # The LangChain agents are synchronous, so run them off the event loop
+            try:
+                response = await asyncio.to_thread(agent.process, query, session)
+            finally:
+                if agent_lookup is not None:
+                    self._assign_agent_id(session, await agent_lookup)
+            
+            # Add AI response to memory
+            await asyncio.to_thread(memory.add_ai_message, response)
+            
+            # Log to database without holding up the reply
+            if session.employee_id and session.agent_id:
+                self._spawn(self._alog_response(conversation_id, session.employee_id, session.agent_id, response))
+            
+            return response
+            
+        except Exception as e:
+            logger.error("Error in orchestrator processing: %s", e)
             # Fallback response
             from existing.response_generator import generate_fallback_response
             return generate_fallback_response(query, session)
@@ -233,49 +439,129 @@ class MEAgentOrchestrator:
                 
                 # Update session if employee found
                 if employee:
-                    session.employee_id = employee.get('employee_id')
-                    session.employee_info = employee
-                    logger.info(f"Identified employee for greeting: {employee.get('name')}")
-                    
-                    # Get employee devices
-                    devices = get_employee_devices(employee)
-                    session.devices = devices
-                    logger.info(f"Found {len(devices)} devices for employee")
-                    
-                    # Add employee info to session memory
-                    memory = self._get_or_create_memory(session.session_id)
-                    memory.add_system_context({
-                        "user_info": employee,
-                        "device_info": devices
-                    })
-            
-            # Use greeting prompt based on employee info
-            if hasattr(session, 'employee_info') and session.employee_info:
-                employee_name = session.employee_info.get('name', '').split()[0]  # First name
-                department = session.employee_info.get('department', 'Unknown Department')
+                    self._identify_employee(session, employee, get_employee_devices(employee))
+            
+            return self._greeting_for(session)
                 
-                # Get appropriate greeting prompt
-                greeting_prompt = self.prompt_manager.get_prompt("greeting", "english")
+        except Exception as e:
+            logger.error("Error generating greeting: %s", e)
+            # Simple fallback greeting
+            return "Hello! I'm ME.ai Assistant, your IT support specialist. How can I help you today?"
+    
+    async def aget_initial_greeting(self, session):
+        """Async variant of get_initial_greeting; email and phone lookups run concurrently"""
+        try:
+            # Update session with employee info if not already present
+            if not session.employee_id and (session.customer_email or session.customer_number):
+                contacts = [('email', session.customer_email), ('phone', session.customer_number)]
+                found = await asyncio.gather(*(
+                    afind_employee_by_contact(contact_type, contact_value)
+                    for contact_type, contact_value in contacts if contact_value
+                ))
+                # Email still wins when both match
+                employee = next((match for match in found if match), None)
                 
-                # Create a basic conversation chain for the greeting
-                greeting_chain = MEConversationChain(self.llm)
+                # Update session if employee found
+                if employee:
+                    devices = await aget_employee_devices(employee)
+                    await asyncio.to_thread(self._identify_employee, session, employee, devices)
+            
+            # The greeting chain is synchronous, so run it off the event loop
+            return await asyncio.to_thread(self._greeting_for, session)
                 
-                # Generate personalized greeting
+        except Exception as e:
+            logger.error("Error generating greeting: %s", e)
+            # Simple fallback greeting
+            return "Hello! I'm ME.ai Assistant, your IT support specialist. How can I help you today?"
+    
+    def _identify_employee(self, session, employee, devices):
+        """Attach an identified employee and their devices to the session and its memory"""
+        session.employee_id = employee.get('employee_id')
+        session.employee_info = employee
+        self._set_greeting_details(session)
+        logger.info("Identified employee for greeting: %s", employee.get('name'))
+        
+        session.devices = devices
+        logger.info("Found %s devices for employee", len(devices))
+        
+        # Add employee info to session memory
+        memory = self._get_or_create_memory(session.session_id)
+        memory.add_system_context({
+            "user_info": employee,
+            "device_info": devices
+        })
+    
+    def _set_greeting_details(self, session):
+        """Store the employee's first name and department on the session for greetings"""
+        session.first_name = (session.employee_info.get('name') or '').split(' ', 1)[0]
+        session.department = session.employee_info.get('department', 'Unknown Department')
+    
+    def _greeting_for(self, session):
+        """Personalized LLM greeting for known employees, the canned greeting otherwise"""
+        # Use greeting prompt based on employee info
+        if session.employee_info:
+            # Callers that set employee_info themselves haven't filled these in yet
+            if session.first_name is None:
+                self._set_greeting_details(session)
+            employee_name = session.first_name
+            department = session.department
+            
+            # Reuse an idle greeting chain, building one only when all are busy
+            try:
+                greeting_chain = self._greeting_chains.pop()
+            except IndexError:
+                from chains.conversation import MEConversationChain
+                greeting_chain = MEConversationChain(self.greeting_llm)
+            
+            # Generate personalized greeting
+            try:
                 greeting = greeting_chain.process(
                     "Hello",
                     {"name": employee_name, "department": department}
                 )
-                
-                logger.info(f"Generated personalized greeting for {employee_name}")
-                return greeting
-            else:
-                # Use existing generator for unknown users
-                return generate_initial_greeting(session)
-                
-        except Exception as e:
-            logger.error(f"Error generating greeting: {str(e)}")
-            # Simple fallback greeting
-            return "Hello! I'm ME.ai Assistant, your IT support specialist. How can I help you today?"
+            finally:
+                # Forget this employee before the chain greets anyone else
+                greeting_chain.memory.clear()
+                self._greeting_chains.append(greeting_chain)
+            
+            logger.info("Generated personalized greeting for %s", employee_name)
+            return greeting
+        else:
+            # Use existing generator for unknown users
+            return generate_initial_greeting(session)
+    
+    def _prepare_session(self, session_id, user_email=None, user_phone=None, language=None):
+        """Get or create the session and apply the contact details and language sent with a message"""
+        # Get or create session
+        session = self.session_manager.get_session(session_id)
+        
+        # Update session contact info if provided
+        if user_email:
+            session.customer_email = user_email
+        if user_phone:
+            session.customer_number = user_phone
+        
+        # Add language to session if provided
+        if language:
+            if session.language is None:
+                session.language = language
+                logger.info("Set session language to: %s", language)
+        
+        return session
+    
+    def _wants_greeting(self, session, message):
+        """True if the message is a greeting and we haven't greeted this session yet"""
+        return not session.greeted and \
+               _GREETING_RE.search(message, 0, GREETING_SCAN_LENGTH) is not None
+    
+    def _record_greeting(self, session, message, greeting):
+        """Mark the session greeted and add the exchange to its memory, which holds the conversation transcript"""
+        session.greeted = True
+        memory = self._get_or_create_memory(session.session_id)
+        memory.add_user_message(message)
+        memory.add_ai_message(greeting)
+        # Persist greeted right away so a restart doesn't greet the user twice
+        self.session_manager.save_session(session, immediate=True)
     
     def process_message(self, message, session_id, user_email=None, user_phone=None, language=None):
         """
@@ -292,73 +578,52 @@ class MEAgentOrchestrator:
             Response text from the appropriate agent
         """
         try:
-            # Get or create session
-            session = self.session_manager.get_session(session_id)
-            
-            # Update session contact info if provided
-            if user_email:
-                session.customer_email = user_email
-            if user_phone:
-                session.customer_number = user_phone
-            
-            # Add language to session if provided
-            if language:
-                if not hasattr(session, 'language'):
-                    setattr(session, 'language', language)
-                    logger.info(f"Set session language to: {language}")
+            session = self._prepare_session(session_id, user_email, user_phone, language)
             
             # If message is a greeting and we haven't greeted yet, send initial greeting
-            if (not hasattr(session, 'greeted') or not session.greeted) and \
-               any(greeting in message.lower() for greeting in ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]):
+            if self._wants_greeting(session, message):
                 greeting = self.get_initial_greeting(session)
-                session.greeted = True
-                
-                # Add greeting to session messages
-                if not hasattr(session, 'messages'):
-                    session.messages = []
-                
-                session.messages.append({
-                    "role": "user",
-                    "content": message
-                })
-                
-                session.messages.append({
-                    "role": "assistant",
-                    "content": greeting
-                })
-                
-                # Save session
-                self.session_manager.save_session(session)
-                
+                self._record_greeting(session, message, greeting)
                 return greeting
             
-            # Add user message to session
-            if not hasattr(session, 'messages'):
-                session.messages = []
-            
-            session.messages.append({
-                "role": "user",
-                "content": message
-            })
-            
             # Process with appropriate agent
+            # process_query records the exchange in the session memory
             response = self.process_query(message, session)
+            self.session_manager.save_session(session)
+            return response
             
-            # Add response to session
-            session.messages.append({
-                "role": "assistant",
-                "content": response
-            })
+        except Exception as e:
+            logger.error("Error processing message: %s", e)
+            return "I apologize, but I'm experiencing technical difficulties. Please try again later or contact our IT support team directly if your issue is urgent."
+    
+    async def aprocess_message(self, message, session_id, user_email=None, user_phone=None, language=None):
+        """Async variant of process_message for callers running inside an event loop"""
+        try:
+            # Session lookups and greeting bookkeeping may hit Redis, so they run off the event loop
+            session = await asyncio.to_thread(self._prepare_session, session_id, user_email, user_phone, language)
             
-            # Save session
-            self.session_manager.save_session(session)
+            # If message is a greeting and we haven't greeted yet, send initial greeting
+            if self._wants_greeting(session, message):
+                greeting = await self.aget_initial_greeting(session)
+                await asyncio.to_thread(self._record_greeting, session, message, greeting)
+                return greeting
             
+            # Process with appropriate agent
+            response = await self.aprocess_query(message, session)
+            await asyncio.to_thread(self.session_manager.save_session, session)
             return response
             
         except Exception as e:
-            logger.error(f"Error processing message: {str(e)}")
+            logger.error("Error processing message: %s", e)
             return "I apologize, but I'm experiencing technical difficulties. Please try again later or contact our IT support team directly if your issue is urgent."
     
+    def invalidate_employee(self, email=None, phone=None):
+        """Forget cached employee lookups so HR updates apply before the cache TTL expires"""
+        if email:
+            _invalidate_employee_lookup('email', email)
+        if phone:
+            _invalidate_employee_lookup('phone', phone)
+    
     def export_conversation(self, session_id):
         """Export the full conversation history with metadata"""
         try:
@@ -369,14 +634,14 @@ class MEAgentOrchestrator:
             export_data = memory.export_session_data()
             
             # Add any session attributes not in memory
-            if hasattr(session, 'issue_type'):
+            if session.issue_type:
                 if 'issue_data' not in export_data:
                     export_data['issue_data'] = {}
                 export_data['issue_data']['type'] = session.issue_type
             
             return export_data
         except Exception as e:
-            logger.error(f"Error exporting conversation: {str(e)}")
+            logger.error("Error exporting conversation: %s", e)
             return {"error": str(e)}
 
 
@@ -1,19 +1,30 @@
 # me_agent_orchestrator_fastapi.py
 import os
 import uuid
-import datetime
 import json
 import logging
 import time
 import asyncio
+import dataclasses
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from types import MappingProxyType
 from typing import Optional, Dict, Any, List
-import requests
 
+import orjson
 import uvicorn
 from fastapi import FastAPI, Request, Response, BackgroundTasks
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,14 +40,21 @@ DB_USERNAME = os.environ.get('DB_USERNAME', 'testadmin')
 DB_PASSWORD = os.environ.get('DB_PASSWORD', 'testpass')
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
+# Worker processes share sessions only when REDIS_URL is set; reload implies a single worker
+UVICORN_WORKERS = int(os.environ.get('UVICORN_WORKERS', 1))
+UVICORN_RELOAD = os.environ.get('UVICORN_RELOAD', 'False').lower() == 'true'
+# Threads for the blocking LangChain agent calls (greetings, process_query) made off the event loop
+AGENT_THREADS = int(os.environ.get('AGENT_THREADS', 64))
 
 # Import existing modules
 from existing.session_manager import SessionManager, Session
+# Async DB service helpers share one pooled aiohttp session, so handlers never block the event loop.
+# Conversation messages are logged by Session.add_message, which queues them for batched writes.
 from existing.db_service import (
-    get_db_service_token, 
-    find_employee_by_contact, 
-    get_employee_devices,
-    log_conversation_to_db
+    afind_employee_by_contact,
+    aget_employee_devices,
+    awarm_db_service,
+    close_async_session
 )
 from existing.response_generator import (
     classify_issue, 
@@ -47,13 +65,32 @@ from existing.response_generator import (
 # Import LangChain components
 from agent.orchestrator import AgentOrchestrator
 
+@asynccontextmanager
+async def lifespan(app):
+    """Size the thread pool for blocking agent calls, warm up the DB service connection, and close it on shutdown"""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=AGENT_THREADS, thread_name_prefix="agent")
+    )
+    # Log in and open the connection pool in the background, so the first caller does not pay for it
+    # and a slow DB service does not hold up startup
+    warm_up = asyncio.create_task(awarm_db_service())
+    yield
+    warm_up.cancel()
+    await close_async_session()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="ME.ai Agent Orchestrator",
     description="An AI agent orchestrator for IT support using LangChain",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson for every JSON reply, matching the bytes the SSE streams emit
+    default_response_class=ORJSONResponse
 )
 
+# Compress JSON replies such as the Teams connector answers, which carry multi-KB troubleshooting text
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
 # Initialize session manager
 session_manager = SessionManager()
 
@@ -63,24 +100,27 @@ agent_orchestrator = AgentOrchestrator(
     model_id=BEDROCK_MODEL_ID
 )
 
-# Pydantic models for request validation
-class Message(BaseModel):
-    role: str
-    content: str
-
-class TelephonyRequest(BaseModel):
+# Chat endpoints read their JSON bodies directly; fields are taken as sent, without validation
+@dataclasses.dataclass(slots=True)
+class TelephonyRequest:
     call: Optional[Dict[str, Any]] = None
     session_id: Optional[str] = None
     phone: Optional[str] = None
     message: Optional[str] = None
-    messages: Optional[List[Message]] = None
+    messages: Optional[List[Dict[str, Any]]] = None
     model: Optional[str] = None
 
-class TeamsRequest(BaseModel):
-    session_id: Optional[str] = None
-    message: Optional[str] = None
-    email: Optional[str] = None
-    phone: Optional[str] = None
+    @classmethod
+    def from_json(cls, data):
+        """Build a request from a parsed JSON body, ignoring unknown keys"""
+        return cls(
+            call=data.get('call'),
+            session_id=data.get('session_id'),
+            phone=data.get('phone'),
+            message=data.get('message'),
+            messages=data.get('messages'),
+            model=data.get('model')
+        )
 
 class HealthResponse(BaseModel):
     status: str
@@ -88,45 +128,9 @@ class HealthResponse(BaseModel):
     framework: str
     version: str
 
-def generate_response(message, session, channel_type):
-    """Generate a response for the user using direct issue handling"""
-    try:
-        # If no employee ID yet, try to identify the user
-        if not session.employee_id:
-            if channel_type == 'telephony' and session.customer_number:
-                employee = find_employee_by_contact('phone', session.customer_number)
-            elif channel_type == 'chat' and session.customer_email:
-                employee = find_employee_by_contact('email', session.customer_email)
-            # Fallback to phone for chat if email didn't work
-            elif channel_type == 'chat' and session.customer_number:
-                employee = find_employee_by_contact('phone', session.customer_number)
-            else:
-                employee = None
-            
-            if employee:
-                session.employee_id = employee.get('employee_id')
-                logger.info(f"Identified employee: {employee.get('name')} ({session.employee_id})")
-                
-                # Get employee devices
-                devices = get_employee_devices(employee)
-                session.devices = devices
-                logger.info(f"Found {len(devices)} devices for employee")
-                
-                # Store employee info in session
-                session.employee_info = employee
-        
-        # Handle initial greeting/welcome message
-        if len(session.messages) <= 1 and any(greeting in message.lower() for greeting in ["hello", "hi", "hey", "greetings"]):
-            greeting = agent_orchestrator.get_initial_greeting(session)
-            logger.info(f"Generated initial greeting: {greeting[:50]}...")
-            return greeting
-        
-        # Direct response handling based on message content
-        message_lower = message.lower()
-        
-        # USB issues
-        if "usb" in message_lower:
-            return """
+# Canned troubleshooting answers for the most common issues, keyed by topic
+_CANNED_RESPONSES = MappingProxyType({
+    "usb": """
 I see you're having USB connection issues. Let's try these troubleshooting steps:
 
 1. Restart your laptop - Sometimes a simple restart can resolve driver issues.
@@ -147,11 +151,8 @@ I see you're having USB connection issues. Let's try these troubleshooting steps
 5. Try the device on another computer if possible to determine if the issue is with the device or your laptop.
 
 Let me know which of these steps you've tried or if any of them help resolve the issue.
-"""
-        
-        # Speaker/audio issues
-        elif any(word in message_lower for word in ["speaker", "audio", "sound"]):
-            return """
+""",
+    "audio": """
 I understand you're having laptop speaker issues. Let's quickly troubleshoot:
 
 1. Check volume settings:
@@ -179,11 +180,8 @@ I understand you're having laptop speaker issues. Let's quickly troubleshoot:
    - Follow the on-screen instructions
 
 Let me know which steps you've tried or if any of them helped.
-"""
-        
-        # Slow laptop issues
-        elif any(word in message_lower for word in ["slow", "speed", "performance", "fast"]):
-            return """
+""",
+    "slow": """
 Here are some steps to help speed up your slow laptop:
 
 1. Close unnecessary programs:
@@ -213,11 +211,8 @@ Here are some steps to help speed up your slow laptop:
    - Adding more RAM or switching to an SSD can dramatically improve performance
 
 Let me know if you need more specific guidance on any of these steps.
-"""
-        
-        # Printer issues
-        elif "printer" in message_lower:
-            return """
+""",
+    "printer": """
 Here's how to troubleshoot your printer connection issues:
 
 1. First, let's check the basics:
@@ -246,11 +241,8 @@ Here's how to troubleshoot your printer connection issues:
    - Sometimes Windows updates can fix printer connection issues
 
 Let me know which of these steps you've tried or if you need more specific guidance.
-"""
-        
-        # Password issues
-        elif any(word in message_lower for word in ["password", "login", "account", "forgot", "reset"]):
-            return """
+""",
+    "password": """
 I understand you're having issues with your password or account access. Here's how I can help:
 
 1. Which system are you trying to access? (Windows login, email, company applications, etc.)
@@ -275,11 +267,8 @@ I understand you're having issues with your password or account access. Here's h
    - Consider using a password manager
 
 For urgent password resets, please contact IT Support at extension 1234 or support@company.com.
-"""
-
-        # Network issues
-        elif any(word in message_lower for word in ["network", "wifi", "internet", "connection"]):
-            return """
+""",
+    "network": """
 Here are troubleshooting steps for your network connection issues:
 
 1. Basic connectivity checks:
@@ -312,11 +301,8 @@ Here are troubleshooting steps for your network connection issues:
    - Try a different port on the router
 
 Let me know which of these steps you've tried and if they help resolve your issue.
-"""
-        
-        # Email issues
-        elif any(word in message_lower for word in ["email", "outlook", "gmail", "mail"]):
-            return """
+""",
+    "email": """
 Let's troubleshoot your email issues:
 
 1. Check your internet connection:
@@ -349,15 +335,11 @@ Let's troubleshoot your email issues:
 
 Let me know which email client you're using and what specific issues you're experiencing for more targeted help.
 """
+})
 
-        # Try using the agent orchestrator for other queries
-        else:
-            try:
-                # Fall back to issue type classifier and direct response
-                issue_type = classify_issue(message)
-                
-                if issue_type == "Hardware":
-                    return """
+# Follow-up questions for messages the classifier places in a broad issue category
+_ISSUE_TYPE_RESPONSES = MappingProxyType({
+    "Hardware": """
 I understand you're experiencing hardware issues. To help you better, I need some specific information:
 
 1. What device are you having trouble with? (laptop, desktop, printer, etc.)
@@ -366,9 +348,8 @@ I understand you're experiencing hardware issues. To help you better, I need som
 4. Have you made any recent changes to your system?
 
 Once you provide these details, I can give you targeted troubleshooting steps.
-"""
-                elif issue_type == "Software":
-                    return """
+""",
+    "Software": """
 I understand you're experiencing software issues. To help you better, I need some specific information:
 
 1. Which application or program is causing problems?
@@ -377,9 +358,8 @@ I understand you're experiencing software issues. To help you better, I need som
 4. Have you installed any updates recently?
 
 Once you provide these details, I can give you targeted troubleshooting steps.
-"""
-                elif issue_type == "Password":
-                    return """
+""",
+    "Password": """
 I understand you're having password or account access issues. To help you better, could you tell me:
 
 1. Which system or application are you trying to access?
@@ -388,15 +368,10 @@ I understand you're having password or account access issues. To help you better
 
 I can then provide specific guidance for your situation.
 """
-                else:
-                    # Process message with the agent orchestrator for general inquiries
-                    # This will likely fail, but we'll handle that in the except block
-                    ai_response = agent_orchestrator.process_query(message, session)
-                    return ai_response
-            except Exception as e:
-                logger.error(f"Error processing with agent orchestrator: {str(e)}")
-                # Return a generic but helpful response
-                return f"""
+})
+
+# Asks for more detail when neither a canned answer nor the agent can help
+_GENERIC_HELP_RESPONSE = """
 I'd be happy to help you with your IT issue. To assist you better, could you provide more specific details about what you're experiencing? Some helpful information would be:
 
 1. What specific device or software is involved?
@@ -406,27 +381,9 @@ I'd be happy to help you with your IT issue. To assist you better, could you pro
 
 The more details you can provide, the better I can assist you in resolving your issue promptly.
 """
-        
-        # Log AI response to DB
-        if session.employee_id and session.agent_id:
-            try:
-                log_conversation_to_db(
-                    getattr(session, 'conversation_id', str(uuid.uuid4())),
-                    session.employee_id,
-                    session.agent_id,
-                    ai_response,
-                    "AI response",
-                    "In Progress"
-                )
-                logger.info("Successfully logged AI response to database")
-            except Exception as e:
-                logger.error(f"Error logging AI response to database: {str(e)}")
-        
-        return ai_response
-        
-    except Exception as e:
-        logger.error(f"Error generating response: {str(e)}", exc_info=True)
-        return """
+
+# Returned when generating a response fails outright
+_TECHNICAL_DIFFICULTIES_RESPONSE = """
 I apologize, but I'm experiencing technical difficulties. Please try one of these options:
 
 1. Try describing your issue again with more details
@@ -434,16 +391,216 @@ I apologize, but I'm experiencing technical difficulties. Please try one of thes
 3. Email support@company.com with details of your issue
 """
 
+# Keywords routed to a canned answer, in priority order; any substring match counts
+_CANNED_TOPIC_KEYWORDS = (
+    ("usb", ("usb",)),
+    ("audio", ("speaker", "audio", "sound")),
+    ("slow", ("slow", "speed", "performance", "fast")),
+    ("printer", ("printer",)),
+    ("password", ("password", "login", "account", "forgot", "reset")),
+    ("network", ("network", "wifi", "internet", "connection")),
+    ("email", ("email", "outlook", "gmail", "mail"))
+)
+_CANNED_KEYWORD_PRIORITY = {
+    keyword: priority
+    for priority, (_, keywords) in enumerate(_CANNED_TOPIC_KEYWORDS)
+    for keyword in keywords
+}
+
+# Zero-width lookahead so overlapping keywords are all visited; longest alternative first
+_CANNED_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_CANNED_KEYWORD_PRIORITY, key=len, reverse=True))) + "))"
+)
+
+def _build_canned_automaton():
+    """Build one Aho-Corasick automaton mapping every canned-answer keyword to its priority"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword, priority in _CANNED_KEYWORD_PRIORITY.items():
+        automaton.add_word(keyword, priority)
+    automaton.make_automaton()
+    return automaton
+
+_canned_automaton = _build_canned_automaton()
+
+def _match_canned_topic(message_lower):
+    """Return the highest-priority canned topic mentioned in the lowercased message, or None"""
+    if _canned_automaton is not None:
+        priorities = (priority for _, priority in _canned_automaton.iter(message_lower))
+    else:
+        priorities = (_CANNED_KEYWORD_PRIORITY[match.group(1)] for match in _CANNED_KEYWORD_RE.finditer(message_lower))
+    best = None
+    for priority in priorities:
+        if best is None or priority < best:
+            best = priority
+            if best == 0:
+                break
+    return None if best is None else _CANNED_TOPIC_KEYWORDS[best][0]
+
+# Opening words that make a first message a greeting
+_GREETINGS = frozenset(("hello", "hi", "hey", "greetings"))
+
+def _is_greeting(message_lower):
+    """Whether the lowercased message starts with a greeting word"""
+    words = message_lower[:16].split(maxsplit=1)
+    return bool(words) and words[0].strip(string.punctuation) in _GREETINGS
+
+async def generate_response(message, session, channel_type):
+    """Generate a response for the user using direct issue handling"""
+    try:
+        # If no employee ID yet, try to identify the user
+        if not session.employee_id:
+            if channel_type == 'telephony' and session.customer_number:
+                employee = await afind_employee_by_contact('phone', session.customer_number)
+            elif channel_type == 'chat' and session.customer_email:
+                employee = await afind_employee_by_contact('email', session.customer_email)
+            # Fallback to phone for chat if email didn't work
+            elif channel_type == 'chat' and session.customer_number:
+                employee = await afind_employee_by_contact('phone', session.customer_number)
+            else:
+                employee = None
+            
+            if employee:
+                session.employee_id = employee.get('employee_id')
+                logger.debug("Identified employee: %s (%s)", employee.get('name'), session.employee_id)
+                
+                # Get employee devices
+                devices = await aget_employee_devices(employee)
+                session.devices = devices
+                logger.debug("Found %d devices for employee", len(devices))
+                
+                # Store employee info in session
+                session.employee_info = employee
+        
+        message_lower = message.lower()
+
+        # Handle initial greeting/welcome message
+        if len(session.messages) <= 1 and _is_greeting(message_lower):
+            greeting = await asyncio.to_thread(agent_orchestrator.get_initial_greeting, session)
+            logger.debug("Generated initial greeting: %.50s...", greeting)
+            return greeting
+        
+        # Canned answers for common issues, routed with a single scan of the message
+        topic = _match_canned_topic(message_lower)
+        if topic is not None:
+            return _CANNED_RESPONSES[topic]
+
+        # Try using the agent orchestrator for other queries
+        try:
+            # Fall back to issue type classifier and direct response
+            issue_type = classify_issue(message)
+            
+            issue_response = _ISSUE_TYPE_RESPONSES.get(issue_type)
+            if issue_response is not None:
+                return issue_response
+
+            # Process message with the agent orchestrator for general inquiries
+            # This will likely fail, but we'll handle that in the except block
+            ai_response = await asyncio.to_thread(agent_orchestrator.process_query, message, session)
+            return ai_response
+        except Exception as e:
+            logger.error(f"Error processing with agent orchestrator: {str(e)}")
+            # Return a generic but helpful response
+            return _GENERIC_HELP_RESPONSE
+        
+    except Exception as e:
+        logger.error(f"Error generating response: {str(e)}", exc_info=True)
+        return _TECHNICAL_DIFFICULTIES_RESPONSE
+
+
+# SSE streams opt out of gzip (an explicit Content-Encoding makes GZipMiddleware pass them through),
+# since compressing would hold events in the gzip buffer instead of sending each one as it is ready
+_SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+    'Content-Encoding': 'identity'
+}
+
+# Every SSE delta event has the same shape; only the JSON-encoded id and content vary
+_SSE_FRAME = b'data: {"id":%b,"choices":[{"delta":{"content":%b}}]}\n\n'
+
+def _sse_frame(event_id, content):
+    """Encode one SSE delta event carrying content"""
+    return _SSE_FRAME % (orjson.dumps(event_id), _ENCODED_ANSWERS.get(content) or orjson.dumps(content))
+
+_SSE_DONE = b"data: [DONE]\n\n"
+
+async def _sse_single(event_id, content):
+    """Stream a single delta event followed by [DONE]"""
+    yield _sse_frame(event_id, content)
+    yield _SSE_DONE
+
+def _sse_response(events):
+    """Wrap an SSE event stream in a StreamingResponse with the shared headers"""
+    return StreamingResponse(events, media_type="text/event-stream", headers=_SSE_HEADERS)
+
+# Telephony replies are streamed in line-aligned pieces of at least this many characters
+STREAM_CHUNK_CHARS = 40
+
+def _response_chunks(text):
+    """Split a reply into consecutive line-aligned pieces that join back into the full text"""
+    piece = ""
+    for line in text.splitlines(keepends=True):
+        piece += line
+        if len(piece) >= STREAM_CHUNK_CHARS:
+            yield piece
+            piece = ""
+    if piece or not text:
+        yield piece
+
+# The fixed answers never change, so their JSON-encoded content (whole, and as stream chunks)
+# is built once here instead of on every reply
+_FIXED_ANSWERS = (
+    *_CANNED_RESPONSES.values(),
+    *_ISSUE_TYPE_RESPONSES.values(),
+    _GENERIC_HELP_RESPONSE,
+    _TECHNICAL_DIFFICULTIES_RESPONSE
+)
+_ENCODED_ANSWERS = {text: orjson.dumps(text) for text in _FIXED_ANSWERS}
+_ENCODED_ANSWER_CHUNKS = {
+    text: tuple(orjson.dumps(chunk) for chunk in _response_chunks(text)) for text in _FIXED_ANSWERS
+}
+
+def _encoded_chunks(text):
+    """JSON-encoded stream chunks of a reply, precomputed for the fixed answers"""
+    chunks = _ENCODED_ANSWER_CHUNKS.get(text)
+    if chunks is None:
+        chunks = [orjson.dumps(chunk) for chunk in _response_chunks(text)]
+    return chunks
+
+def _new_session_id():
+    """Session id for a request that did not bring one (an unformatted random UUID)"""
+    return uuid.uuid4().hex
+
+async def _read_json_object(request):
+    """Parse a request body as a JSON object, or return None if it is not one"""
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def _invalid_body_response():
+    """Reply for chat requests whose body is not a JSON object"""
+    return JSONResponse(status_code=400, content={"detail": "Request body must be a JSON object"})
 
 @app.post("/telephony/chat/completions")
-async def handle_telephony_chat(request: TelephonyRequest):
+async def handle_telephony_chat(request: Request, background_tasks: BackgroundTasks):
     """Handle telephony chat completions with streaming support"""
+    data = await _read_json_object(request)
+    if data is None:
+        return _invalid_body_response()
+    return await _telephony_chat(TelephonyRequest.from_json(data), background_tasks)
+
+async def _telephony_chat(request, background_tasks):
+    """Stream the reply to a parsed telephony request"""
     try:
         # Extract key information
         call_data = request.call or {}
         session_id = call_data.get('id') or request.session_id
         if not session_id:
-            session_id = str(uuid.uuid4())
+            session_id = _new_session_id()
         
         customer_data = call_data.get('customer', {})
         customer_number = customer_data.get('number') or request.phone
@@ -452,34 +609,37 @@ async def handle_telephony_chat(request: TelephonyRequest):
         # For messages sent in array format
         if not user_message and request.messages:
             for msg in request.messages:
-                if msg.role == 'user' and msg.content:
-                    user_message = msg.content
-                    logger.info(f"Found user message: '{user_message}'")
+                if isinstance(msg, dict) and msg.get('role') == 'user' and msg.get('content'):
+                    user_message = msg['content']
+                    logger.debug("Found user message: '%s'", user_message)
                     break
         
-        # Get or create session
-        session = session_manager.get_session(session_id)
+        # Get or create session; with Redis configured this is a network round trip
+        session = await asyncio.to_thread(session_manager.get_session, session_id)
         
         # Update session info
         if customer_number:
             session.customer_number = customer_number
             session.update_channel_status('telephony', True)
         
+        # Save the session after the stream has been sent; the reply does not depend on it
+        background_tasks.add_task(session_manager.save_session, session)
+        
         # Define a streaming response generator in the format your telephony system expects
         async def stream_response():
             try:
                 # Determine the response content
                 if not user_message:
                     # Generate a personalized greeting
-                    response = agent_orchestrator.get_initial_greeting(session)
-                    logger.info(f"Generated greeting: '{response[:30]}...'")
+                    response = await asyncio.to_thread(agent_orchestrator.get_initial_greeting, session)
+                    logger.debug("Generated greeting: '%.30s...'", response)
                     
                     # Add to conversation history
                     session.add_message({
                         "role": "assistant",
                         "content": response
                     }, 'telephony')
-                    logger.info("Added greeting to conversation history")
+                    logger.debug("Added greeting to conversation history")
                 else:
                     # Add user message to session
                     session.add_message({
@@ -488,7 +648,7 @@ async def handle_telephony_chat(request: TelephonyRequest):
                     }, 'telephony')
                     
                     # Generate response using LangChain agent orchestrator
-                    response = generate_response(user_message, session, 'telephony')
+                    response = await generate_response(user_message, session, 'telephony')
                     
                     # Add bot message to session
                     session.add_message({
@@ -496,76 +656,58 @@ async def handle_telephony_chat(request: TelephonyRequest):
                         "content": response
                     }, 'telephony')
                 
-                # Save session
-                session_manager.save_session(session)
-                
                 # Check for end call trigger
                 if user_message:
                     should_end_call = any(word in user_message.lower() for word in ['end', 'bye', 'goodbye', 'quit'])
                     if should_end_call:
                         session.update_channel_status('telephony', False)
-                        session_manager.save_session(session)
                 
-                # Format the response in the exact format expected by the telephony system
-                yield f"data: {json.dumps({
-                    'id': f'chatcmpl-{int(time.time())}',
-                    'choices': [{'delta': {'content': response}}]
-                })}\n\n"
+                # Format the response in the exact format expected by the telephony system,
+                # one delta per chunk so speech can start before the whole answer arrives
+                completion_id = orjson.dumps(f'chatcmpl-{int(time.time())}')
+                for chunk in _encoded_chunks(response):
+                    yield _SSE_FRAME % (completion_id, chunk)
+                    await asyncio.sleep(0)
                 
                 # End the stream
-                yield "data: [DONE]\n\n"
+                yield _SSE_DONE
                 
             except Exception as e:
                 logger.error(f"Error in telephony response stream: {str(e)}")
-                yield f"data: {json.dumps({
-                    'id': session_id,
-                    'choices': [{'delta': {'content': 'I apologize, but there was an error processing your request.'}}]
-                })}\n\n"
-                yield "data: [DONE]\n\n"
+                yield _sse_frame(session_id, 'I apologize, but there was an error processing your request.')
+                yield _SSE_DONE
         
-        return StreamingResponse(
-            stream_response(),
-            media_type="text/event-stream",
-            headers={
-                'Cache-Control': 'no-cache',
-                'X-Accel-Buffering': 'no'
-            }
-        )
+        return _sse_response(stream_response())
         
     except Exception as e:
         logger.error(f"Error handling telephony chat: {str(e)}", exc_info=True)
         
-        async def error_stream():
-            yield f"data: {json.dumps({
-                'id': f'chatcmpl-{int(time.time())}',
-                'choices': [{'delta': {'content': 'I apologize, but I\'m having trouble processing your request. Could you please try again?'}}]
-            })}\n\n"
-            yield "data: [DONE]\n\n"
-        
-        return StreamingResponse(
-            error_stream(),
-            media_type="text/event-stream",
-            headers={
-                'Cache-Control': 'no-cache',
-                'X-Accel-Buffering': 'no'
-            }
-        )
+        return _sse_response(_sse_single(
+            f'chatcmpl-{int(time.time())}',
+            'I apologize, but I\'m having trouble processing your request. Could you please try again?'
+        ))
 
 @app.post("/teams/chat/completions")
-async def handle_teams_chat(request: Request):
+async def handle_teams_chat(request: Request, background_tasks: BackgroundTasks):
     """Handle Teams chat messages with enhanced debugging"""
-    try:
-        # Get raw request data
+    # Get raw request data
+    if logger.isEnabledFor(logging.DEBUG):
         body = await request.body()
-        body_str = body.decode()
-        logger.info(f"Teams request body: {body_str[:100]}...")
-        
-        # Parse request data
-        data = await request.json()
-        logger.info(f"Teams request data keys: {list(data.keys())}")
+        logger.debug("Teams request body: %.100s...", body.decode(errors='replace'))
+
+    # Parse request data
+    data = await _read_json_object(request)
+    if data is None:
+        return {"text": "I apologize, but I'm having trouble processing your request. Please try again.", "type": "message"}
+    return await _teams_chat(data, background_tasks)
+
+async def _teams_chat(data, background_tasks):
+    """Reply to a parsed Teams request body"""
+    try:
+        logger.debug("Teams request data keys: %s", list(data))
         
         # Extract key information with fallbacks
-        session_id = data.get('session_id', str(uuid.uuid4()))
+        session_id = data.get('session_id') or _new_session_id()
         
         # Try multiple possible locations for the message
         message = data.get('message', '')
@@ -591,10 +733,10 @@ async def handle_teams_chat(request: Request):
         
         user_phone = data.get('phone', '')
         
-        logger.info(f"Teams processed: session_id={session_id}, message='{message}', email={user_email}")
+        logger.debug("Teams processed: session_id=%s, message='%s', email=%s", session_id, message, user_email)
         
-        # Get or create session
-        session = session_manager.get_session(session_id)
+        # Get or create session; with Redis configured this is a network round trip
+        session = await asyncio.to_thread(session_manager.get_session, session_id)
         
         # Update session info
         if user_email:
@@ -607,30 +749,30 @@ async def handle_teams_chat(request: Request):
             employee = None
             # Try email first for Teams
             if user_email:
-                employee = find_employee_by_contact('email', user_email)
+                employee = await afind_employee_by_contact('email', user_email)
                 if employee:
-                    logger.info(f"Identified Teams user by email: {employee.get('name')}")
+                    logger.debug("Identified Teams user by email: %s", employee.get('name'))
             
             # Try phone if email didn't work
             if not employee and user_phone:
-                employee = find_employee_by_contact('phone', user_phone)
+                employee = await afind_employee_by_contact('phone', user_phone)
                 if employee:
-                    logger.info(f"Identified Teams user by phone: {employee.get('name')}")
+                    logger.debug("Identified Teams user by phone: %s", employee.get('name'))
             
             # Update session with employee info if found
             if employee:
                 session.employee_id = employee.get('employee_id')
                 session.employee_info = employee
-                logger.info(f"Identified employee: {employee.get('name')} ({session.employee_id})")
+                logger.debug("Identified employee: %s (%s)", employee.get('name'), session.employee_id)
                 
                 # Get employee devices
-                devices = get_employee_devices(employee)
+                devices = await aget_employee_devices(employee)
                 session.devices = devices
-                logger.info(f"Found {len(devices)} devices for employee")
+                logger.debug("Found %d devices for employee", len(devices))
         
         # Process message if provided
         if message:
-            logger.info(f"Processing Teams message: '{message}'")
+            logger.debug("Processing Teams message: '%s'", message)
             
             # Add user message to session
             session.add_message({
@@ -639,8 +781,8 @@ async def handle_teams_chat(request: Request):
             }, 'teams')
             
             # Generate response using agent orchestrator
-            bot_response = generate_response(message, session, 'teams')
-            logger.info(f"Generated Teams response: '{bot_response[:50]}...'")
+            bot_response = await generate_response(message, session, 'teams')
+            logger.debug("Generated Teams response: '%.50s...'", bot_response)
             
             # Add bot response to session
             session.add_message({
@@ -648,8 +790,8 @@ async def handle_teams_chat(request: Request):
                 "content": bot_response
             }, 'teams')
             
-            # Save session
-            session_manager.save_session(session)
+            # Save the session once the reply has been sent
+            background_tasks.add_task(session_manager.save_session, session)
             
             # Try different response formats based on examining the request
             if 'channel' in data and data.get('channel') == 'teams':
@@ -657,25 +799,11 @@ async def handle_teams_chat(request: Request):
                 return {"text": bot_response, "type": "message"}
             else:
                 # Use streaming response format
-                async def stream_response():
-                    yield f"data: {json.dumps({
-                        'id': session_id,
-                        'choices': [{'delta': {'content': bot_response}}]
-                    })}\n\n"
-                    yield "data: [DONE]\n\n"
-                
-                return StreamingResponse(
-                    stream_response(),
-                    media_type="text/event-stream",
-                    headers={
-                        'Cache-Control': 'no-cache',
-                        'X-Accel-Buffering': 'no'
-                    }
-                )
+                return _sse_response(_sse_single(session_id, bot_response))
         else:
             # No message provided, return a greeting
-            greeting = agent_orchestrator.get_initial_greeting(session)
-            logger.info(f"No message, sending greeting: '{greeting[:50]}...'")
+            greeting = await asyncio.to_thread(agent_orchestrator.get_initial_greeting, session)
+            logger.debug("No message, sending greeting: '%.50s...'", greeting)
             
             # Add greeting to session
             session.add_message({
@@ -683,8 +811,8 @@ async def handle_teams_chat(request: Request):
                 "content": greeting
             }, 'teams')
             
-            # Save session
-            session_manager.save_session(session)
+            # Save the session once the reply has been sent
+            background_tasks.add_task(session_manager.save_session, session)
             
             # Try different response formats
             if 'channel' in data and data.get('channel') == 'teams':
@@ -692,21 +820,7 @@ async def handle_teams_chat(request: Request):
                 return {"text": greeting, "type": "message"}
             else:
                 # Use streaming response format
-                async def stream_response():
-                    yield f"data: {json.dumps({
-                        'id': session_id,
-                        'choices': [{'delta': {'content': greeting}}]
-                    })}\n\n"
-                    yield "data: [DONE]\n\n"
-                
-                return StreamingResponse(
-                    stream_response(),
-                    media_type="text/event-stream",
-                    headers={
-                        'Cache-Control': 'no-cache',
-                        'X-Accel-Buffering': 'no'
-                    }
-                )
+                return _sse_response(_sse_single(session_id, greeting))
             
     except Exception as e:
         logger.error(f"Error handling Teams chat: {str(e)}", exc_info=True)
@@ -751,21 +865,25 @@ async def debug_log_request(request: Request):
         logger.error(f"Error in debug endpoint: {str(e)}")
         return {"status": "error", "message": str(e)}
 @app.post("/webhook")
-async def handle_webhook(request: Request):
+async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
     """Legacy webhook handler - redirects to telephony handler"""
-    body = await request.json()
-    return await handle_telephony_chat(TelephonyRequest(**body))
+    body = await _read_json_object(request)
+    if body is None:
+        return _invalid_body_response()
+    return await _telephony_chat(TelephonyRequest.from_json(body), background_tasks)
 
 @app.post("/webhook/chat/completions")
-async def handle_chat(request: Request):
+async def handle_chat(request: Request, background_tasks: BackgroundTasks):
     """Legacy chat completions handler - redirects to the appropriate channel"""
-    body = await request.json()
+    body = await _read_json_object(request)
+    if body is None:
+        return _invalid_body_response()
     channel = body.get('channel', 'chat')
     
     if channel == 'teams':
-        return await handle_teams_chat(TeamsRequest(**body))
+        return await _teams_chat(body, background_tasks)
     else:
-        return await handle_telephony_chat(TelephonyRequest(**body))
+        return await _telephony_chat(TelephonyRequest.from_json(body), background_tasks)
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -778,4 +896,14 @@ async def health_check():
     }
 
 if __name__ == "__main__":
-    uvicorn.run("me_agent_orchestrator_fastapi:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    # uvloop event loop and httptools parser (pip install uvloop httptools); reload is for development only
+    uvicorn.run(
+        "me_agent_orchestrator_fastapi:app",
+        host="127.0.0.1",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=UVICORN_WORKERS,
+        reload=UVICORN_RELOAD,
+        log_level="warning"
+    )
\ No newline at end of file
@@ -1,7 +1,10 @@
 # me_ai_integration.py
 import os
+import functools
 import logging
 import json
+import string
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Tuple
 
 # Import custom components
@@ -17,6 +20,14 @@ from existing.db_service import find_employee_by_contact
 
 logger = logging.getLogger('me_ai_integration')
 
+# Threads for the profile, ontology and knowledge base lookups; each query issues three of them at once
+CONTEXT_FETCH_WORKERS = 16
+_context_executor = ThreadPoolExecutor(max_workers=CONTEXT_FETCH_WORKERS, thread_name_prefix="context")
+
+# Common words ignored when extracting search keywords
+_STOPWORDS = frozenset({"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "with", "by", "about", "like", "through", "over", "before", "between", "after", "since", "without", "under", "within", "along", "following", "across", "behind", "beyond", "plus", "except", "up", "out", "around", "down", "off", "above", "near"})
+_PUNCT_TRANS = str.maketrans('', '', string.punctuation)
+
 class MEAIEnhancedOrchestrator:
     """
     Enhanced ME.ai orchestrator that integrates:
@@ -69,25 +80,24 @@ class MEAIEnhancedOrchestrator:
         
         logger.info("ME.ai Enhanced Orchestrator initialized")
     
-    def _extract_keywords(self, text):
+    @staticmethod
+    @functools.lru_cache(maxsize=2048)
+    def _extract_keywords(text):
         """Extract key terms from the query for searching"""
         # Simple keyword extraction
         # In production, you might want to use NLP techniques or AWS Comprehend
-        common_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "with", "by", "about", "like", "through", "over", "before", "between", "after", "since", "without", "under", "within", "along", "following", "across", "behind", "beyond", "plus", "except", "but", "up", "out", "around", "down", "off", "above", "near"}
-        
-        # Split text into words, lowercase, and remove common words
-        words = [word.lower() for word in text.split() if word.lower() not in common_words and len(word) > 2]
-        
-        # Remove punctuation from words
-        import string
-        translator = str.maketrans('', '', string.punctuation)
-        words = [word.translate(translator) for word in words]
-        
-        # Remove duplicates while preserving order
+        # Strip punctuation before splitting so "slow," and "the," compare cleanly, and stop at 10 keywords
         seen = set()
-        keywords = [word for word in words if not (word in seen or seen.add(word))]
+        keywords = []
+        for word in text.translate(_PUNCT_TRANS).lower().split():
+            if len(word) > 2 and word not in _STOPWORDS and word not in seen:
+                seen.add(word)
+                keywords.append(word)
+                if len(keywords) == 10:
+                    break
         
-        return keywords[:10]  # Return top 10 keywords
+        # Cached, so hand back an immutable result
+        return tuple(keywords)
     
     def _get_user_profile(self, session):
         """Get user semantic profile from session information"""
@@ -107,50 +117,48 @@ class MEAIEnhancedOrchestrator:
         
         return user_profile
     
-    def _enhance_prompt_with_context(self, base_prompt, issue_type, keywords, semantic_profile, query):
+    def _get_ontology_context(self, issue_type, keywords):
+        """Get ontology concepts for the issue, plus troubleshooting steps only when concepts are found"""
+        ontology_concepts = self.ontology_manager.query_concepts_by_issue(issue_type, keywords)
+        if not ontology_concepts:
+            return ontology_concepts, None
+        return ontology_concepts, self.ontology_manager.get_standardized_troubleshooting_steps(issue_type)
+    
+    def _enhance_prompt_with_context(self, base_prompt, issue_type, keywords, session, query):
         """Enhance the prompt with RAG, KG, and semantic profile context"""
-        enhanced_prompt = base_prompt
+        # The profile, ontology and knowledge base lookups are independent round trips, so run them together
+        profile_future = _context_executor.submit(self._get_user_profile, session)
+        ontology_future = _context_executor.submit(self._get_ontology_context, issue_type, keywords)
+        documents_future = _context_executor.submit(self.knowledge_base.get_relevant_documents, query, issue_type)
+        
+        # Context goes after the system instructions but before the user query, or at the end if there is none
+        split_idx = base_prompt.find("User:")
+        if split_idx == -1:
+            head, tail, section_end = base_prompt, "", ""
+        else:
+            head, tail, section_end = base_prompt[:split_idx], base_prompt[split_idx:], "\n\n"
+        sections = []
         
         # Add semantic profile information if available
+        semantic_profile = profile_future.result()
         if semantic_profile:
             profile_section = self.profile_manager.create_profile_prompt_section(semantic_profile)
             profile_instructions = self.profile_manager.get_tailored_instructions(semantic_profile)
-            
-            # Add profile information after system instructions but before user query
-            if "User:" in enhanced_prompt:
-                parts = enhanced_prompt.split("User:")
-                enhanced_prompt = parts[0] + "\n" + profile_section + "\n" + profile_instructions + "\n\nUser:" + parts[1]
-            else:
-                enhanced_prompt += "\n\n" + profile_section + "\n" + profile_instructions
+            sections.append(("\n\n" if split_idx == -1 else "\n") + profile_section + "\n" + profile_instructions)
         
-        # Add ontology information
-        ontology_concepts = self.ontology_manager.query_concepts_by_issue(issue_type, keywords)
+        # Add ontology information with troubleshooting steps
+        ontology_concepts, troubleshooting_steps = ontology_future.result()
         if ontology_concepts:
             ontology_section = self.ontology_manager.format_ontology_for_prompt(ontology_concepts)
-            
-            # Add troubleshooting steps
-            troubleshooting_steps = self.ontology_manager.get_standardized_troubleshooting_steps(issue_type)
-            
-            # Add ontology context after system instructions but before user query
-            if "User:" in enhanced_prompt:
-                parts = enhanced_prompt.split("User:")
-                enhanced_prompt = parts[0] + "\n\nITSM ONTOLOGY CONTEXT:\n" + ontology_section + "\n" + troubleshooting_steps + "\n\nUser:" + parts[1]
-            else:
-                enhanced_prompt += "\n\nITSM ONTOLOGY CONTEXT:\n" + ontology_section + "\n" + troubleshooting_steps
+            sections.append("\n\nITSM ONTOLOGY CONTEXT:\n" + ontology_section + "\n" + troubleshooting_steps)
         
         # Add RAG knowledge base information
-        documents = self.knowledge_base.get_relevant_documents(query, issue_type)
+        documents = documents_future.result()
         if documents:
             kb_section = self.knowledge_base.format_documents_for_prompt(documents)
-            
-            # Add knowledge base context after system instructions but before user query
-            if "User:" in enhanced_prompt:
-                parts = enhanced_prompt.split("User:")
-                enhanced_prompt = parts[0] + "\n\nKNOWLEDGE BASE CONTEXT:\n" + kb_section + "\n\nUser:" + parts[1]
-            else:
-                enhanced_prompt += "\n\nKNOWLEDGE BASE CONTEXT:\n" + kb_section
+            sections.append("\n\nKNOWLEDGE BASE CONTEXT:\n" + kb_section)
         
-        return enhanced_prompt
+        return "".join([head, *(section + section_end for section in sections), tail])
     
     def get_initial_greeting(self, session):
         """Generate an enhanced personalized greeting"""
@@ -168,8 +176,8 @@ class MEAIEnhancedOrchestrator:
                 language = comm_prefs.get('language', 'english').lower()
                 
                 # Update session with language preference
-                if not hasattr(session, 'language'):
-                    setattr(session, 'language', language)
+                if session.language is None:
+                    session.language = language
                 
                 # Get demographic information
                 demographics = {}
@@ -198,9 +206,6 @@ class MEAIEnhancedOrchestrator:
     def process_query(self, query, session):
         """Process a user query with enhanced context from RAG, KG, and semantic profile"""
         try:
-            # Get user profile
-            user_profile = self._get_user_profile(session)
-            
             # Extract keywords for ontology and knowledge base search
             keywords = self._extract_keywords(query)
             
@@ -249,12 +254,12 @@ User: {input}
 ME.ai Assistant:
 """
             
-            # Enhance prompt with contextual information
+            # Enhance prompt with contextual information (fetches the user profile alongside the other context)
             enhanced_prompt = self._enhance_prompt_with_context(
                 base_prompt_text,
                 issue_type,
                 keywords,
-                user_profile,
+                session,
                 query
             )
             
@@ -1,30 +1,96 @@
 # memory/session_memory.py
-from langchain.memory import ConversationBufferMemory, ConversationBufferWindowMemory
+from langchain.memory import ConversationBufferMemory, ConversationBufferWindowMemory, ConversationSummaryBufferMemory
 from langchain.memory.chat_message_histories import RedisChatMessageHistory
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.pydantic_v1 import PrivateAttr
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 import datetime
 import json
 
 logger = logging.getLogger('me_agent_orchestrator')
 
+# Older turns are summarized here, after the reply has gone out, instead of on the request path
+SUMMARY_WORKERS = 4
+_summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="memory-summary")
+
+class BackgroundSummaryBufferMemory(ConversationSummaryBufferMemory):
+    """Summary buffer memory that folds turns past the token limit into the summary in the background"""
+    
+    # One memory per session: _summary_lock runs that session's summaries one at a time, while
+    # _state_lock guards the pending flag and the swap of summary and buffer
+    _summary_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _state_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _summary_pending: bool = PrivateAttr(default=False)
+    
+    def save_context(self, inputs, outputs):
+        """Save the turn and schedule summarization rather than running it inline"""
+        BaseChatMemory.save_context(self, inputs, outputs)
+        self.schedule_prune()
+    
+    def schedule_prune(self):
+        """Queue a summary of the turns past max_token_limit unless one is already queued"""
+        with self._state_lock:
+            if self._summary_pending:
+                return
+            self._summary_pending = True
+        _summary_executor.submit(self._prune_in_background)
+    
+    def _prune_in_background(self):
+        """Summarize the oldest turns, then drop them from the buffer if it has not been cleared meanwhile"""
+        with self._summary_lock:
+            try:
+                with self._state_lock:
+                    self._summary_pending = False
+                    messages = list(self.chat_memory.messages)
+                    existing_summary = self.moving_summary_buffer
+                
+                pruned = 0
+                while pruned < len(messages) and self.llm.get_num_tokens_from_messages(messages[pruned:]) > self.max_token_limit:
+                    pruned += 1
+                if not pruned:
+                    return
+                
+                # Readers keep seeing the full buffer until the model call finishes
+                summary = self.predict_new_summary(messages[:pruned], existing_summary)
+                
+                with self._state_lock:
+                    buffer = self.chat_memory.messages
+                    if buffer[:pruned] == messages[:pruned] and self.moving_summary_buffer == existing_summary:
+                        del buffer[:pruned]
+                        self.moving_summary_buffer = summary
+            except Exception as e:
+                logger.error(f"Error summarizing conversation memory: {str(e)}")
+
 class SessionMemory:
     """Enhanced memory management for ME.ai sessions with persistence options"""
     
-    def __init__(self, session_id, memory_type="buffer", window_size=10, persistence=None):
+    def __init__(self, session_id, memory_type="buffer", window_size=10, persistence=None,
+                 redis_url="redis://localhost:6379/0", ttl=None, llm=None, max_token_limit=800):
         """
         Initialize session memory
         
         Args:
             session_id: Unique identifier for the session
-            memory_type: Type of memory ("buffer" for all history, "window" for limited)
+            memory_type: Type of memory ("buffer" for all history, "window" for limited,
+                "summary_buffer" for recent turns plus a summary of older ones)
             window_size: Number of turns to remember if using window memory
             persistence: Persistence method (None, "redis")
+            redis_url: Redis server holding the chat history when persistence is "redis"
+            ttl: Seconds before an idle Redis chat history expires (None keeps it)
+            llm: Model that writes the summary for "summary_buffer" memory
+            max_token_limit: Tokens of raw history kept by "summary_buffer" memory
         """
         self.session_id = session_id
         self.memory_type = memory_type
         self.window_size = window_size
         self.persistence = persistence
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.llm = llm
+        self.max_token_limit = max_token_limit
         self.session_data = {
             "created_at": datetime.datetime.now().isoformat(),
             "last_updated": datetime.datetime.now().isoformat(),
@@ -46,7 +112,8 @@ class SessionMemory:
                     # This requires Redis to be configured and available
                     chat_history = RedisChatMessageHistory(
                         session_id=self.session_id,
-                        url="redis://localhost:6379/0"  # Should be configurable
+                        url=self.redis_url,
+                        ttl=self.ttl
                     )
                     logger.info(f"Initialized Redis-backed chat history for session {self.session_id}")
                 except Exception as e:
@@ -57,7 +124,17 @@ class SessionMemory:
                 chat_history = None
             
             # Create the appropriate memory type
-            if self.memory_type == "window":
+            if self.memory_type == "summary_buffer" and self.llm is not None:
+                history_kwargs = {"chat_memory": chat_history} if chat_history else {}
+                memory = BackgroundSummaryBufferMemory(
+                    llm=self.llm,
+                    max_token_limit=self.max_token_limit,
+                    memory_key="chat_history",
+                    return_messages=True,
+                    **history_kwargs
+                )
+                logger.info(f"Initialized summary buffer memory with limit {self.max_token_limit} tokens")
+            elif self.memory_type == "window":
                 if chat_history:
                     memory = ConversationBufferWindowMemory(
                         chat_memory=chat_history,
@@ -133,6 +210,9 @@ class SessionMemory:
         """Add an AI message to memory"""
         try:
             self.memory.chat_memory.add_ai_message(message)
+            # Turns added straight to chat_memory skip save_context, so schedule the summary once a turn completes
+            if isinstance(self.memory, BackgroundSummaryBufferMemory):
+                self.memory.schedule_prune()
             self.session_data["last_updated"] = datetime.datetime.now().isoformat()
             logger.info(f"Added AI message to memory")
         except Exception as e:
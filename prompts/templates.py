@@ -2,9 +2,15 @@
 from langchain.prompts import PromptTemplate
 import logging
 import datetime
+import functools
 
 logger = logging.getLogger('me_agent_orchestrator')
 
+@functools.lru_cache(maxsize=None)
+def get_prompt_manager(default_language="english"):
+    """Shared PromptTemplateManager per default language, so the templates are built once per process"""
+    return PromptTemplateManager(default_language)
+
 class PromptTemplateManager:
     """Manager for ME.ai prompt templates with multilingual support"""
     
@@ -0,0 +1,57 @@
+# tests/test_base_agent.py
+from unittest.mock import MagicMock
+
+from langchain.memory import ConversationSummaryBufferMemory
+
+from agent.base_agent import create_summary_llm
+from config import MEMORY_MAX_TOKENS
+
+def test_summary_memory_prunes_long_history_without_tokenizer(monkeypatch):
+    """Pruning past the token limit counts tokens locally instead of importing a tokenizer package"""
+    monkeypatch.setattr(ConversationSummaryBufferMemory, "predict_new_summary",
+                        lambda self, messages, existing_summary: "User's laptop will not boot after an update.")
+    llm = create_summary_llm("us-east-1", client=MagicMock())
+    memory = ConversationSummaryBufferMemory(
+        llm=llm,
+        max_token_limit=MEMORY_MAX_TOKENS,
+        memory_key="chat_history",
+        return_messages=True
+    )
+
+    turn = "My laptop will not boot after last night's Windows update. " * 10
+    for _ in range(10):
+        memory.save_context({"input": turn}, {"output": turn})
+
+    assert memory.moving_summary_buffer
+    assert llm.get_num_tokens_from_messages(memory.chat_memory.messages) <= MEMORY_MAX_TOKENS
+
+def test_background_summary_runs_after_save_context(monkeypatch):
+    """save_context returns without summarizing; the summary is written on the memory executor"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from memory import session_memory
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+    monkeypatch.setattr(session_memory, "_summary_executor", executor)
+
+    calls = []
+    def predict_new_summary(self, messages, existing_summary):
+        calls.append(threading.current_thread().name)
+        return "User's laptop will not boot after an update."
+    monkeypatch.setattr(ConversationSummaryBufferMemory, "predict_new_summary", predict_new_summary)
+    memory = session_memory.BackgroundSummaryBufferMemory(
+        llm=create_summary_llm("us-east-1", client=MagicMock()),
+        max_token_limit=MEMORY_MAX_TOKENS,
+        memory_key="chat_history",
+        return_messages=True
+    )
+
+    turn = "My laptop will not boot after last night's Windows update. " * 10
+    for _ in range(10):
+        memory.save_context({"input": turn}, {"output": turn})
+    executor.shutdown(wait=True)
+
+    assert calls and all(name.startswith("memory-summary") for name in calls)
+    assert memory.moving_summary_buffer
+    assert memory.llm.get_num_tokens_from_messages(memory.chat_memory.messages) <= MEMORY_MAX_TOKENS
@@ -0,0 +1,60 @@
+# tests/test_db_service.py
+from types import SimpleNamespace
+
+import orjson
+
+from existing import db_service
+
+EMPLOYEES = [
+    {"name": "Contained", "phone": "555-1234"},
+    {"name": "Same suffix", "phone": "+44 15 5512 3456"},
+    {"name": "Bare exact", "phone": "1 555 512 3456"},
+    {"name": "Exact", "phone": "+1 (555) 512-3456"},
+]
+
+def _index(monkeypatch, employees):
+    response = SimpleNamespace(status_code=200, content=orjson.dumps(employees), headers={})
+    monkeypatch.setattr(db_service, "_session", SimpleNamespace(get=lambda url, **kwargs: response))
+    return db_service._EmployeeIndex()
+
+def test_index_phone_lookup_matches_list_scan(monkeypatch):
+    """The index picks the same employee as scanning the full list, including list order among matches"""
+    index = _index(monkeypatch, EMPLOYEES)
+    for phone in ["+15555123456", "15555123456", "+4915512345", "555-1234", "+1 999 000 0000"]:
+        expected = db_service._match_employee_by_phone(EMPLOYEES, phone)
+        assert (index.find("phone", phone) or {}).get("name") == (expected or {}).get("name")
+
+def test_index_prefers_earlier_containment_over_suffix_match(monkeypatch):
+    """A containment match earlier in the list wins over a later last-8-digit match"""
+    index = _index(monkeypatch, EMPLOYEES[:2])
+    assert index.find("phone", "+1 555 512 3456")["name"] == "Contained"
+
+def test_invalidate_normalizes_email_and_drops_devices():
+    """invalidate() finds employees cached under a lowercased email and clears their devices"""
+    db_service._cache_put(db_service._employee_cache, ("email", "a@x.com"), {"employee_id": 7})
+    db_service._cache_put(db_service._device_cache, 7, [])
+    db_service.invalidate(("email", "A@x.com"))
+    assert db_service._cache_get(db_service._employee_cache, ("email", "a@x.com")) is None
+    assert db_service._cache_get(db_service._device_cache, 7) is None
+
+def test_batch_lookup_keeps_every_requested_value(monkeypatch):
+    """Values that normalize alike each get an entry, and lookups that fail map to None"""
+    db_service.invalidate()
+    monkeypatch.setattr(db_service, "get_db_service_token", lambda: None)
+    pairs = [("phone", "555-1234"), ("phone", "5551234"), ("email", "A@x.com"), ("email", "a@x.com")]
+    assert db_service.find_employees_by_contacts(pairs) == {value: None for _, value in pairs}
+
+def test_batch_lookup_matches_each_value_that_normalizes_alike(monkeypatch):
+    """Both spellings of one phone number are matched from the shared batch result"""
+    db_service.invalidate()
+    monkeypatch.setattr(db_service, "get_db_service_token", lambda: "token")
+    body = {"phones": {"5551234": [EMPLOYEES[0]]}, "emails": {}}
+    response = SimpleNamespace(status_code=200, content=orjson.dumps(body), text="")
+    monkeypatch.setattr(db_service, "_session", SimpleNamespace(post=lambda url, **kwargs: response))
+    results = db_service.find_employees_by_contacts([("phone", "555-1234"), ("phone", "5551234")])
+    assert {value: employee["name"] for value, employee in results.items()} == {"555-1234": "Contained", "5551234": "Contained"}
+
+def test_normalize_phone_strips_non_ascii_separators():
+    """No-break spaces and Unicode hyphens are dropped like their ASCII counterparts"""
+    assert db_service.normalize_phone("+1\xa0555‑512‑3456") == "+15555123456"
+    assert db_service.normalize_phone("+1 (555) 512-3456") == "+15555123456"
@@ -0,0 +1,36 @@
+# tests/test_response_generator.py
+import pytest
+
+from existing import response_generator
+
+# Long enough to take the long-message keyword path; software keywords outnumber hardware ones
+LONG_SOFTWARE_MESSAGE = ("x" * 260 + " software application install update upgrade microsoft office excel"
+                         " outlook teams; my laptop screen keyboard mouse monitor")
+
+@pytest.mark.parametrize("automaton", [None, response_generator._keyword_automaton])
+def test_long_message_counts_every_category(monkeypatch, automaton):
+    """Hardware keywords come first in the table but must not cut the software count short"""
+    monkeypatch.setattr(response_generator, "_keyword_automaton", automaton)
+    counts = response_generator._count_issue_keywords(LONG_SOFTWARE_MESSAGE.lower())
+    assert counts["Software"] > counts["Hardware"]
+    assert response_generator.classify_issue(LONG_SOFTWARE_MESSAGE) == "Software"
+
+@pytest.mark.parametrize("automaton", [None, response_generator._keyword_automaton])
+def test_first_confident_category_ends_the_scan(monkeypatch, automaton):
+    """In text order, the first category to reach the threshold ends the scan of a long message on every backend"""
+    monkeypatch.setattr(response_generator, "_keyword_automaton", automaton)
+    message = ("i forgot my password, the reset link and login page fail;"
+               " also my laptop screen keyboard mouse monitor are acting up")
+    assert len(message) > response_generator.EARLY_EXIT_MIN_LENGTH
+    counts = response_generator._count_issue_keywords(message)
+    assert counts["Password"] == response_generator.CONFIDENT_KEYWORD_MATCHES
+    assert counts["Hardware"] == 0
+    assert response_generator.classify_issue(message) == "Password"
+
+def test_short_message_is_scored_in_full():
+    """Messages up to the early-exit length always count every keyword"""
+    message = "password reset login laptop screen"
+    assert len(message) <= response_generator.EARLY_EXIT_MIN_LENGTH
+    counts = response_generator._count_issue_keywords(message)
+    assert counts["Password"] == 3
+    assert counts["Hardware"] == 2